@@ -0,0 +1,57 @@
+"""
+Micro benchmark of block encoding and decoding, JSON (the old wire format) against the binary codec
+
+run: python benchmarks/codec_benchmark.py
+"""
+import json
+import sys
+from pathlib import Path
+from timeit import timeit
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from blockchain.block import Block  # noqa: E402
+from blockchain.codec import encode_block, decode_block  # noqa: E402
+from blockchain.transaction import Transaction  # noqa: E402
+from blockchain.wallet import Wallet  # noqa: E402
+
+TRANSACTIONS_PER_BLOCK = 100
+ROUNDS = 200
+
+
+def build_block() -> Block:
+    forger = Wallet(secret_password="forger")
+    sender = Wallet(secret_password="sender")
+    recipient = Wallet(secret_password="recipient")
+    transactions = []
+    for counter in range(1, TRANSACTIONS_PER_BLOCK + 1):
+        transaction = Transaction(sender.address, recipient.address, counter * 1.5, 1, counter)
+        transactions.append(transaction.add_signature(sender.sign(transaction.hash)))
+    block = Block(1, "ab" * 32, 1600000000.5, forger.address, transactions)
+    return block.add_signature(forger.sign(block.hash))
+
+
+def per_round_us(func) -> float:
+    return timeit(func, number=ROUNDS) / ROUNDS * 1e6
+
+
+def main():
+    block = build_block()
+    json_bytes = json.dumps(block.to_dict()).encode()
+    binary_bytes = encode_block(block)
+    assert decode_block(binary_bytes)[0].to_dict() == block.to_dict()
+
+    json_encode = per_round_us(lambda: json.dumps(block.to_dict()).encode())
+    json_decode = per_round_us(lambda: Block.from_dict(json.loads(json_bytes)))
+    binary_encode = per_round_us(lambda: encode_block(block))
+    binary_decode = per_round_us(lambda: decode_block(binary_bytes))
+
+    print(f"transactions per block: {TRANSACTIONS_PER_BLOCK}")
+    print(f"{'':10}{'bytes':>10}{'encode us':>12}{'decode us':>12}")
+    print(f"{'json':10}{len(json_bytes):>10}{json_encode:>12.1f}{json_decode:>12.1f}")
+    print(f"{'binary':10}{len(binary_bytes):>10}{binary_encode:>12.1f}{binary_decode:>12.1f}")
+    print(f"size ratio:             {len(json_bytes) / len(binary_bytes):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
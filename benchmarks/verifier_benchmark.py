@@ -0,0 +1,50 @@
+"""
+Micro benchmark of signature verification with and without the verifying key cache
+
+run: python benchmarks/verifier_benchmark.py
+"""
+import sys
+from base64 import b64decode
+from pathlib import Path
+from timeit import timeit
+
+sys.path.append(str(Path(__file__).parent.parent / "src"))
+
+from blockchain.config import Config  # noqa: E402
+from blockchain.verifier import Verifier, key_cache  # noqa: E402
+from blockchain.wallet import Wallet  # noqa: E402
+
+VERIFICATIONS = 200
+
+
+def verify_without_cache(address: str, signature: str, hash_str: str) -> bool:
+    verifying_key = Verifier.decode_verifying_key(address)
+    return verifying_key.verify(
+        b64decode(signature), hash_str.encode(), hashfunc=Config.hashfunc
+    )
+
+
+def per_verify_us(func, *args) -> float:
+    return timeit(lambda: func(*args), number=VERIFICATIONS) / VERIFICATIONS * 1e6
+
+
+def main():
+    wallet = Wallet(secret_password="benchmark")
+    hash_str = Config.hashfunc(b"benchmark").hexdigest()
+    signature = wallet.sign(hash_str)
+
+    without_cache = per_verify_us(verify_without_cache, wallet.address, signature, hash_str)
+
+    key_cache.clear()
+    key_cache.get(wallet.address)  # first use: decoded and added to probation
+    key_cache.get(wallet.address)  # second use: promoted and precomputed
+    with_cache = per_verify_us(Verifier.is_verified, wallet.address, signature, hash_str)
+
+    print(f"verifications:        {VERIFICATIONS}")
+    print(f"without key cache:    {without_cache:.1f} us/verify")
+    print(f"with hot key cache:   {with_cache:.1f} us/verify")
+    print(f"speedup:              {without_cache / with_cache:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -68,9 +68,8 @@ class Actor:
             tx_counter=self.tx_counter,
         )
         signature = self.wallet.sign(transaction.hash)
-        transaction.add_signature(signature)
         self.tx_counter += 1
-        return transaction
+        return transaction.add_signature(signature)
 
     def forge_block(self) -> Block:
         """
@@ -79,5 +78,4 @@ class Actor:
         """
         block = self.blockchain.create_unsigned_block(self.wallet.address)
         signature = self.wallet.sign(block.hash)
-        block.add_signature(signature)
-        return block
+        return block.add_signature(signature)
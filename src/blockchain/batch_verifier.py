@@ -0,0 +1,120 @@
+"""
+BatchVerifier verify the signatures of many signed objects (e.g: all the signatures of a block) at once
+
+the signatures are split into chunks and verified over a process pool,
+the verification stop on the first invalid signature (chunks that did not start yet are cancelled)
+
+with 0 workers the signatures are verified one after another in the calling process (used by the tests)
+
+signatures found in the signature cache are not verified again,
+and signatures verified by the pool workers are added to the cache of the calling process
+"""
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .config import Config
+from .signed import Signed
+from .signature_cache import signature_cache
+from .verifier import Verifier
+
+
+__all__ = ["BatchVerifier"]
+
+
+def _verify_chunk(chunk: List[Tuple[int, str, str, str]]) -> List[Tuple[int, bool]]:
+    """
+    Verify chunk of signatures (run inside the pool worker process)
+    :param chunk: list of (position, verifying key, signature, hash)
+    :return: list of (position, verified) stopped after the first invalid signature
+    """
+    results = []
+    for position, verifying_key, signature, hash_str in chunk:
+        verified = Verifier.is_verified(verifying_key, signature, hash_str)
+        results.append((position, verified))
+        if not verified:
+            break
+    return results
+
+
+class BatchVerifier:
+    _executors: Dict[int, ProcessPoolExecutor] = {}
+
+    def __init__(self, workers: int = None, chunk_size: int = None):
+        """
+        :param workers: number of worker processes, 0 verify in the calling process (default Config value)
+        :param chunk_size: number of signatures sent to worker at once (default Config value)
+        """
+        self.workers = (
+            Config.signature_verification_workers if workers is None else workers
+        )
+        self.chunk_size = (
+            Config.signature_verification_chunk_size
+            if chunk_size is None
+            else chunk_size
+        )
+
+    @classmethod
+    def _executor(cls, workers: int) -> ProcessPoolExecutor:
+        """
+        The process pools are shared by all the batch verifiers with the same number of workers
+        :param workers: number of worker processes
+        :return: process pool executor
+        """
+        if workers not in cls._executors:
+            cls._executors[workers] = ProcessPoolExecutor(max_workers=workers)
+        return cls._executors[workers]
+
+    def verify(self, signed_objects: Sequence[Signed]) -> List[Optional[bool]]:
+        """
+        Verify the signatures of all the objects
+        :param signed_objects: signed objects (e.g: block and its transactions)
+        :return: list of verification results in the objects order,
+         True / False for verified / unverified signature and None if the verification was stopped before it
+        """
+        results: List[Optional[bool]] = [None] * len(signed_objects)
+        to_verify = []
+        for position, signed in enumerate(signed_objects):
+            if not signed.is_signed:
+                results[position] = False
+                return results
+            item = (position, signed.verifying_key, signed.signature, signed.hash)
+            if signature_cache.lookup(*item[1:]):  # type: ignore
+                results[position] = True
+            else:
+                to_verify.append(item)
+
+        if self.workers <= 0 or len(to_verify) <= self.chunk_size:
+            for position, verifying_key, signature, hash_str in to_verify:
+                verified = Verifier.is_verified(verifying_key, signature, hash_str)
+                results[position] = verified
+                if not verified:
+                    break
+                signature_cache.add(verifying_key, signature, hash_str)
+            return results
+
+        executor = self._executor(self.workers)
+        to_verify_by_position = {item[0]: item for item in to_verify}
+        pending = {
+            executor.submit(_verify_chunk, to_verify[i: i + self.chunk_size])
+            for i in range(0, len(to_verify), self.chunk_size)
+        }
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                for position, verified in future.result():
+                    results[position] = verified
+                    if verified:
+                        signature_cache.add(*to_verify_by_position[position][1:])
+            if False in results:
+                for future in pending:
+                    future.cancel()
+                break
+        return results
+
+    def verify_block(self, block) -> List[Optional[bool]]:
+        """
+        Verify the block signature and all the block transactions signatures
+        :param block: block object
+        :return: verification results, the block result first then the transactions results
+        """
+        return self.verify([block, *block.transactions])
@@ -7,42 +7,93 @@ its contain:
 - block forger wallet public address
 - block transactions
 - block signature (signed by forger wallet)
+
+block object is immutable, the raw bytes and the hash are computed once and cached
 """
 
 
 from hashlib import sha256
+from typing import Any, Dict, Iterable, Optional, Tuple
 
 from .transaction import Transaction
 from .signed import Signed
-from .verifier import Verifier
+from .signature_cache import signature_cache
 
 
 class Block(Signed):
+    __slots__ = (
+        "index",
+        "previous_hash",
+        "timestamp",
+        "forger",
+        "transactions",
+        "signature",
+        "_raw",
+        "_hash",
+    )
+    index: int
+    previous_hash: str
+    timestamp: float
+    forger: str
+    transactions: Tuple[Transaction, ...]
+    _raw: Optional[bytes]
+    _hash: Optional[str]
+
     def __init__(
         self,
         index: int,
         previous_hash: str,
         timestamp: float,
         forger: str,
-        transactions: list = None,
-        signature: str = None,
+        transactions: Iterable[Transaction] = None,
+        signature: Optional[str] = None,
     ):
         if transactions is None:
-            transactions = []
-        self.index = index
-        self.timestamp = timestamp
-        self.previous_hash = previous_hash
-        self.forger = forger
-        self.transactions = transactions
+            transactions = ()
+        object.__setattr__(self, "index", index)
+        object.__setattr__(self, "timestamp", timestamp)
+        object.__setattr__(self, "previous_hash", previous_hash)
+        object.__setattr__(self, "forger", forger)
+        object.__setattr__(self, "transactions", tuple(transactions))
+
+        object.__setattr__(self, "signature", signature)
+        object.__setattr__(self, "_raw", None)
+        object.__setattr__(self, "_hash", None)
 
-        self.signature = signature
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{self.__class__.__name__} object is immutable")
+
+    def __reduce__(self):
+        return self.__class__, (
+            self.index,
+            self.previous_hash,
+            self.timestamp,
+            self.forger,
+            self.transactions,
+            self.signature,
+        )
 
     @property
     def hash(self) -> str:
         """
         :return: Block hash value based on block core data
         """
-        return sha256(self._raw_block().encode()).hexdigest()
+        hash_value = self._hash
+        if hash_value is None:
+            hash_value = sha256(self.raw).hexdigest()
+            object.__setattr__(self, "_hash", hash_value)
+        return hash_value
+
+    @property
+    def raw(self) -> bytes:
+        """
+        :return: canonical bytes encoding of the block core data (used for the hash)
+        """
+        raw = self._raw
+        if raw is None:
+            raw = self._raw_block().encode()
+            object.__setattr__(self, "_raw", raw)
+        return raw
 
     @property
     def is_signed(self) -> bool:
@@ -66,19 +117,39 @@ class Block(Signed):
         """
         return f"{self.index}:{self.previous_hash}:{self.timestamp}:{self.forger}:{[t.to_dict() for t in self.transactions]}"
 
-    def add_signature(self, signature: str):
+    def add_signature(self, signature: str) -> "Block":
         """
-        Add signature to block
+        Create signed block (the signature is not part of the hash so the cached hash is reused)
         :param signature: signature data
-        :return: None
+        :return: new block object with the signature
         """
-        self.signature = signature
+        block = self.replace(signature=signature)
+        object.__setattr__(block, "_raw", self._raw)
+        object.__setattr__(block, "_hash", self._hash)
+        return block
+
+    def replace(self, **changes) -> "Block":
+        """
+        Create new block with some of the block fields changed
+        :param changes: fields to change (e.g: index=1)
+        :return: new block object
+        """
+        fields: Dict[str, Any] = {
+            "index": self.index,
+            "previous_hash": self.previous_hash,
+            "timestamp": self.timestamp,
+            "forger": self.forger,
+            "transactions": self.transactions,
+            "signature": self.signature,
+        }
+        fields.update(changes)
+        return self.__class__(**fields)
 
     def signature_verified(self) -> bool:
         """
         :return: True for verified signature and False for unverified signature
         """
-        return self.is_signed and Verifier.is_verified(
+        return self.is_signed and signature_cache.is_verified(
             self.verifying_key, self.signature, self.hash  # type: ignore
         )
 
@@ -108,5 +179,4 @@ class Block(Signed):
         transactions = [
             Transaction.from_dict(t) for t in block_dict.get("transactions", [])
         ]
-        block_dict["transactions"] = transactions
-        return cls(**block_dict)
+        return cls(**{**block_dict, "transactions": transactions})
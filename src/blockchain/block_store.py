@@ -0,0 +1,463 @@
+"""
+BlockStore is append-only on disk block log, used as the chain blocks list for full nodes
+(only the last block can be removed, when the chain tip is rolled back on reorg)
+
+the blocks are written to segment files (blocks-000000.log, blocks-000001.log, ...)
+every record is header (payload length, codec) followed by the encoded block
+(binary codec, JSON for blocks that can't be encoded with the binary codec)
+
+the index file (blocks.index) contain fixed size entry for every block (segment, offset, length, block hash),
+so block is found by its height with one index read,
+the hash index file (blocks.hashes) is open addressing hash table {block hash: height} (see HashIndex),
+so block is found by its hash with a few reads of the memory mapped table, nothing is kept in memory per block
+
+writes are batched (flushed every Config.block_store_batch_size blocks) and every segment is fsynced when it's full,
+reads go through memory mapped segment files, only the requested blocks are loaded to memory
+
+the store is shared by the chain (appends and roll backs) and the network threads (reads),
+the memory maps are replaced and closed under the store lock
+"""
+import json
+import mmap
+import os
+import struct
+from collections.abc import Sequence
+from functools import wraps
+from threading import RLock
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from .block import Block
+from .codec import CODEC_BINARY, CODEC_JSON, encode_block, decode_block
+from .config import Config
+from .exceptions import CodecError
+
+
+__all__ = ["BlockStore"]
+
+
+RECORD_HEADER = struct.Struct("!IB")  # payload length, codec
+INDEX_ENTRY = struct.Struct("!IQI32s")  # segment number, record offset, record length, block hash
+HASH_SLOT = struct.Struct("!32sQ")  # block hash, block height + 1 (0 for empty slot)
+HASH_INDEX_HEADER = struct.Struct("!QQQ")  # slots count, used slots, count of the blocks that were indexed
+HASH_INDEX_MIN_SLOTS = 1024
+
+
+def encode_record(block: Block) -> Tuple[int, bytes]:
+    """
+    :return: codec and payload of the block record
+    """
+    try:
+        return CODEC_BINARY, encode_block(block)
+    except CodecError:
+        return CODEC_JSON, json.dumps(block.to_dict()).encode()
+
+
+def decode_record(codec: int, payload) -> Block:
+    if codec == CODEC_BINARY:
+        return decode_block(payload)[0]
+    if codec == CODEC_JSON:
+        return Block.from_dict(json.loads(bytes(payload)))
+    raise ValueError(f"unsupported block record codec {codec}")
+
+
+def _locked(method):
+    @wraps(method)
+    def locked_method(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+
+    return locked_method
+
+
+class HashIndex:
+    """
+    On disk open addressing hash table {block hash: height} (linear probing over memory mapped file)
+    the table is rebuilt with more slots when half of the slots are used (see BlockStore._rebuild_hashes),
+    entries are never removed (removed blocks entries are skipped by the store, the heights are checked
+    against the blocks index), the header is written when the table is synced
+    """
+
+    def __init__(self, path: str):
+        """
+        :param path: the table file (created if not exists)
+        :raise ValueError: if the table file is corrupted
+        """
+        self.path = path
+        if not os.path.exists(path):
+            self.create(path, HASH_INDEX_MIN_SLOTS)
+        self._file = open(path, "r+b")
+        if os.path.getsize(path) < HASH_INDEX_HEADER.size:
+            self._file.close()
+            raise ValueError(f"corrupted hash index {path}")
+        self._map = mmap.mmap(self._file.fileno(), 0)
+        self.slots, self.used, self.indexed = HASH_INDEX_HEADER.unpack_from(self._map, 0)
+        if not self.slots or len(self._map) != HASH_INDEX_HEADER.size + self.slots * HASH_SLOT.size:
+            self.close()
+            raise ValueError(f"corrupted hash index {path}")
+
+    @staticmethod
+    def create(path: str, slots: int):
+        """
+        Create empty table file
+        :param slots: number of slots
+        """
+        with open(path, "wb") as table_file:
+            table_file.write(HASH_INDEX_HEADER.pack(slots, 0, 0))
+            table_file.truncate(HASH_INDEX_HEADER.size + slots * HASH_SLOT.size)
+
+    @property
+    def full(self) -> bool:
+        return 2 * (self.used + 1) > self.slots
+
+    def _probe(self, digest: bytes) -> Iterator[Tuple[int, bytes, int]]:
+        """
+        :return: the slots of the digest probe sequence until empty slot (slot position, block hash, height + 1)
+        """
+        slot = int.from_bytes(digest[:8], "big") % self.slots
+        while True:
+            position = HASH_INDEX_HEADER.size + slot * HASH_SLOT.size
+            slot_hash, height = HASH_SLOT.unpack_from(self._map, position)
+            yield position, slot_hash, height
+            if not height:
+                return
+            slot = (slot + 1) % self.slots
+
+    def heights(self, digest: bytes) -> Iterator[int]:
+        """
+        :param digest: block hash bytes
+        :return: the heights of the blocks with this hash (including removed blocks)
+        """
+        for _, slot_hash, height in self._probe(digest):
+            if height and slot_hash == digest:
+                yield height - 1
+
+    def add(self, digest: bytes, height: int):
+        """
+        :param digest: block hash bytes
+        :param height: block height
+        """
+        for position, _, slot_height in self._probe(digest):
+            if not slot_height:
+                HASH_SLOT.pack_into(self._map, position, digest, height + 1)
+                self.used += 1
+                return
+
+    def add_all(self, entries: Iterable[Tuple[bytes, int]]):
+        for digest, height in entries:
+            self.add(digest, height)
+
+    def sync(self, indexed: int):
+        """
+        Write the table to disk
+        :param indexed: count of the blocks that were indexed (the first blocks of the store)
+        """
+        self.indexed = indexed
+        self._map.flush()
+        HASH_INDEX_HEADER.pack_into(self._map, 0, self.slots, self.used, self.indexed)
+        self._map.flush()
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+class BlockStore(Sequence):
+    def __init__(
+        self, directory: str, segment_size: int = None, batch_size: int = None
+    ):
+        """
+        :param directory: directory of the segment files and the index file (created if not exists)
+        :param segment_size: segment file size limit in bytes (default Config value)
+        :param batch_size: number of blocks written together (default Config value)
+        """
+        self.directory = directory
+        self.segment_size = (
+            Config.block_store_segment_size if segment_size is None else segment_size
+        )
+        self.batch_size = (
+            Config.block_store_batch_size if batch_size is None else batch_size
+        )
+        os.makedirs(directory, exist_ok=True)
+
+        self._maps: Dict[int, mmap.mmap] = {}  # {segment number: memory map}
+        self._index_map: Optional[mmap.mmap] = None
+        self._lock = RLock()
+        self._pending: List[Tuple[Block, bytes]] = []  # blocks waiting to be written
+        self._tip: Optional[Block] = None
+
+        self._index_file = open(self._index_path, "a+b")
+        self._flushed_count = self._recover()
+        self._hashes = self._open_hashes()
+        self._segment, self._segment_offset = self._last_segment_position()
+        self._segment_file = open(self._segment_path(self._segment), "ab")
+        if self._flushed_count:
+            self._tip = self._read(self._flushed_count - 1)
+
+    @property
+    def _index_path(self) -> str:
+        return os.path.join(self.directory, "blocks.index")
+
+    @property
+    def _hashes_path(self) -> str:
+        return os.path.join(self.directory, "blocks.hashes")
+
+    def _segment_path(self, segment: int) -> str:
+        return os.path.join(self.directory, f"blocks-{segment:06d}.log")
+
+    def _recover(self) -> int:
+        """
+        Drop partially written index entries and records (after crash)
+        :return: number of blocks in the store
+        """
+        index_size = os.path.getsize(self._index_path)
+        count = index_size // INDEX_ENTRY.size
+        while count:
+            segment, offset, length, _ = self._index_entry(count - 1)
+            segment_path = self._segment_path(segment)
+            if os.path.exists(segment_path) and os.path.getsize(segment_path) >= offset + length:
+                with open(segment_path, "r+b") as segment_file:
+                    segment_file.truncate(offset + length)  # drop records that were not indexed
+                break
+            count -= 1
+        if count * INDEX_ENTRY.size != index_size:
+            self._close_index_map()
+            self._index_file.truncate(count * INDEX_ENTRY.size)
+        if count == 0:
+            for name in os.listdir(self.directory):
+                if name.startswith("blocks-") and name.endswith(".log"):
+                    os.remove(os.path.join(self.directory, name))
+        return count
+
+    def _open_hashes(self) -> HashIndex:
+        """
+        Open the hash index and index the blocks that were not indexed before crash
+        (the hash index is rebuilt from the blocks index if it's corrupted)
+        """
+        try:
+            hashes = HashIndex(self._hashes_path)
+        except ValueError:
+            return self._rebuild_hashes()
+        for height in range(min(hashes.indexed, self._flushed_count), self._flushed_count):
+            digest = self._index_entry(height)[3]
+            if height not in hashes.heights(digest):
+                if hashes.full:
+                    hashes.close()
+                    return self._rebuild_hashes()
+                hashes.add(digest, height)
+        hashes.sync(self._flushed_count)
+        return hashes
+
+    def _rebuild_hashes(self) -> HashIndex:
+        """
+        Build new hash index from the blocks index (the removed blocks entries are dropped),
+        with enough slots to stay less than quarter full
+        :return: the new hash index
+        """
+        slots = max(HASH_INDEX_MIN_SLOTS, 4 * self._flushed_count)
+        path = self._hashes_path + ".new"
+        HashIndex.create(path, slots)
+        hashes = HashIndex(path)
+        hashes.add_all((self._index_entry(height)[3], height) for height in range(self._flushed_count))
+        hashes.sync(self._flushed_count)
+        hashes.close()
+        os.replace(path, self._hashes_path)
+        return HashIndex(self._hashes_path)
+
+    def _index_hash(self, digest: bytes, height: int):
+        """
+        Add flushed block to the hash index (the index is rebuilt with more slots when it's half full)
+        """
+        if self._hashes.full:
+            self._hashes.close()
+            self._hashes = self._rebuild_hashes()
+            return  # the rebuilt index contain all the flushed blocks
+        self._hashes.add(digest, height)
+
+    def _last_segment_position(self) -> Tuple[int, int]:
+        """
+        :return: active segment number and the segment size
+        """
+        if not self._flushed_count:
+            return 0, 0
+        segment, offset, length, _ = self._index_entry(self._flushed_count - 1)
+        return segment, offset + length
+
+    def _close_index_map(self):
+        if self._index_map is not None:
+            self._index_map.close()
+            self._index_map = None
+
+    def _index_entry(self, height: int) -> Tuple[int, int, int, bytes]:
+        """
+        :return: index entry of the block (segment number, record offset, record length, block hash)
+        """
+        end = (height + 1) * INDEX_ENTRY.size
+        if self._index_map is None or len(self._index_map) < end:
+            self._close_index_map()
+            self._index_file.flush()
+            self._index_map = mmap.mmap(
+                self._index_file.fileno(), 0, access=mmap.ACCESS_READ
+            )
+        return INDEX_ENTRY.unpack_from(self._index_map, height * INDEX_ENTRY.size)
+
+    def _segment_map(self, segment: int, end: int) -> mmap.mmap:
+        """
+        :return: memory map of the segment file that contain the range until end
+        """
+        segment_map = self._maps.get(segment)
+        if segment_map is None or len(segment_map) < end:
+            if segment_map is not None:
+                segment_map.close()
+            with open(self._segment_path(segment), "rb") as segment_file:
+                segment_map = mmap.mmap(segment_file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._maps[segment] = segment_map
+        return segment_map
+
+    def _read(self, height: int) -> Block:
+        if height >= self._flushed_count:
+            return self._pending[height - self._flushed_count][0]
+        segment, offset, length, _ = self._index_entry(height)
+        segment_map = self._segment_map(segment, offset + length)
+        payload_length, codec = RECORD_HEADER.unpack_from(segment_map, offset)
+        start = offset + RECORD_HEADER.size
+        with memoryview(segment_map) as view:
+            return decode_record(codec, view[start: start + payload_length])
+
+    @_locked
+    def append(self, block: Block):
+        """
+        Add block to the end of the store (written to disk with the next batch)
+        :param block: block object
+        :return: None
+        """
+        codec, payload = encode_record(block)
+        self._pending.append((block, RECORD_HEADER.pack(len(payload), codec) + payload))
+        self._tip = block
+        if len(self._pending) >= self.batch_size:
+            self.flush()
+
+    @_locked
+    def flush(self):
+        """
+        Write the pending blocks to the segment files and the index file
+        :return: None
+        """
+        if not self._pending:
+            return
+        index_entries = []
+        for block, record in self._pending:
+            if self._segment_offset and self._segment_offset + len(record) > self.segment_size:
+                self._roll_segment()
+            self._segment_file.write(record)
+            digest = bytes.fromhex(block.hash)
+            index_entries.append(
+                INDEX_ENTRY.pack(self._segment, self._segment_offset, len(record), digest)
+            )
+            self._segment_offset += len(record)
+        self._segment_file.flush()
+        self._index_file.seek(0, os.SEEK_END)
+        self._index_file.write(b"".join(index_entries))
+        self._index_file.flush()
+        for height, (block, _) in enumerate(self._pending, self._flushed_count):
+            self._flushed_count = height + 1
+            self._index_hash(bytes.fromhex(block.hash), height)
+        self._pending.clear()
+
+    def _roll_segment(self):
+        """
+        Close the full segment (fsynced) and start new segment
+        """
+        self._segment_file.flush()
+        os.fsync(self._segment_file.fileno())
+        self._segment_file.close()
+        self._segment += 1
+        self._segment_offset = 0
+        self._segment_file = open(self._segment_path(self._segment), "ab")
+
+    @_locked
+    def sync(self):
+        """
+        Flush the pending blocks and fsync the active segment and the index
+        :return: None
+        """
+        self.flush()
+        os.fsync(self._segment_file.fileno())
+        os.fsync(self._index_file.fileno())
+        self._hashes.sync(self._flushed_count)
+
+    @_locked
+    def height_of(self, block_hash: str) -> int:
+        """
+        :param block_hash: block hash
+        :return: block height (-1 if the block is not in the store)
+        """
+        for height in range(len(self) - 1, self._flushed_count - 1, -1):
+            if self._pending[height - self._flushed_count][0].hash == block_hash:
+                return height
+        digest = bytes.fromhex(block_hash)
+        for height in self._hashes.heights(digest):
+            if height < self._flushed_count and self._index_entry(height)[3] == digest:  # not removed block
+                return height
+        return -1
+
+    @_locked
+    def close(self):
+        self.sync()
+        self._segment_file.close()
+        self._close_index_map()
+        self._index_file.close()
+        self._hashes.close()
+        for segment_map in self._maps.values():
+            segment_map.close()
+        self._maps.clear()
+
+    def __len__(self) -> int:
+        return self._flushed_count + len(self._pending)
+
+    @_locked
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self._read(height) for height in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("block index out of range")
+        if i == len(self) - 1:
+            return self._tip
+        return self._read(i)
+
+    @_locked
+    def pop(self, i: int = -1):
+        """
+        Remove the last block (the chain tip is rolled back on reorg), the written record is truncated
+        :param i: only the last block can be removed
+        :return: the removed block
+        """
+        if i not in (-1, len(self) - 1):
+            raise TypeError("Only the last block can be removed from block store")
+        if not len(self):
+            raise IndexError("pop from empty block store")
+        if self._pending:
+            block = self._pending.pop()[0]
+        else:
+            height = self._flushed_count - 1
+            block = self._read(height)
+            segment, offset, _, _ = self._index_entry(height)
+            self._close_index_map()
+            self._index_file.truncate(height * INDEX_ENTRY.size)
+            for segment_number in (segment, self._segment):
+                segment_map = self._maps.pop(segment_number, None)
+                if segment_map is not None:
+                    segment_map.close()
+            if segment != self._segment:  # the active segment is empty, the record is in the previous segment
+                self._segment_file.close()
+                os.remove(self._segment_path(self._segment))
+                self._segment = segment
+                self._segment_file = open(self._segment_path(segment), "ab")
+            self._segment_file.flush()
+            self._segment_file.truncate(offset)
+            self._segment_offset = offset
+            self._flushed_count = height
+            self._hashes.sync(min(self._hashes.indexed, height))  # the removed block may be indexed again
+        self._tip = self._read(len(self) - 1) if len(self) else None
+        return block
@@ -0,0 +1,153 @@
+"""
+BlockTree keep the recent blocks of the chain and of the competing branches keyed by block hash
+
+every linked block has undo record (the wallets values before the block, the wallets that the block created,
+the lottery state and cumulative penalty),
+so the chain can roll back to the fork point and replay only the competing branch (see Chain.reorganize),
+the reorg cost depends on the fork depth and not on the chain length
+
+fork choice: the higher branch win, on the same height the branch with the lower cumulative penalty win
+
+only the last Config.max_reorg_depth blocks are kept (deeper forks are rejected)
+"""
+from typing import Dict, List, Optional, Tuple
+
+from .block import Block
+from .config import Config
+
+
+__all__ = ["BlockTree", "TreeNode", "UndoRecord"]
+
+
+class UndoRecord:
+    __slots__ = ("wallets", "created", "epoch_random", "sum_tree", "penalty", "unsaved_snapshot")
+
+    def __init__(self, epoch_random: float, sum_tree, penalty: float, unsaved_snapshot=None):
+        """
+        :param epoch_random: the epoch random before the block
+        :param sum_tree: the lottery sum tree before the block
+        :param penalty: the chain cumulative penalty before the block
+        :param unsaved_snapshot: the state snapshot that was not saved before the block
+        """
+        self.wallets: Dict[str, Tuple[float, int]] = {}  # {address: (balance, tx_counter) before the block}
+        self.created: List[str] = []  # wallets created by the block (removed on roll back)
+        self.epoch_random = epoch_random
+        self.sum_tree = sum_tree
+        self.penalty = penalty
+        self.unsaved_snapshot = unsaved_snapshot
+
+    def touch(self, wallet):
+        """
+        Record the wallet values before the block changed it (only the first change is recorded)
+        :param wallet: chain wallet
+        """
+        if wallet.address not in self.wallets and wallet.address not in self.created:
+            self.wallets[wallet.address] = (wallet.balance, wallet.tx_counter)
+
+
+class TreeNode:
+    __slots__ = ("block", "cumulative_penalty", "undo")
+
+    def __init__(self, block: Block, cumulative_penalty: Optional[float] = None, undo: Optional[UndoRecord] = None):
+        """
+        :param block: block object
+        :param cumulative_penalty: chain penalty until the block (None if the block was not linked yet)
+        :param undo: undo record (None if the block can't be rolled back)
+        """
+        self.block = block
+        self.cumulative_penalty = cumulative_penalty
+        self.undo = undo
+
+    @property
+    def height(self) -> int:
+        return self.block.index
+
+    def fork_choice_key(self) -> Tuple[int, float]:
+        """
+        :return: key of the linked block branch, the branch with the bigger key win
+        """
+        return self.block.index, -(self.cumulative_penalty or 0.0)
+
+
+class BlockTree:
+    def __init__(self, max_depth: Optional[int] = None):
+        """
+        :param max_depth: number of blocks kept below the tip (default Config value)
+        """
+        self.max_depth = Config.max_reorg_depth if max_depth is None else max_depth
+        self._nodes: Dict[str, TreeNode] = {}  # {block hash: node} in insertion order
+        self.tip: TreeNode = None  # type: ignore  # the chain tip (set when the chain is created)
+
+    def add_linked(self, block: Block, cumulative_penalty: float, undo: Optional[UndoRecord] = None) -> TreeNode:
+        """
+        Add block that was linked to the chain (the block become the tip)
+        :param block: the linked block
+        :param cumulative_penalty: chain penalty including the block
+        :param undo: the block undo record
+        :return: tree node of the block
+        """
+        node = TreeNode(block, cumulative_penalty, undo)
+        self._nodes.pop(block.hash, None)  # re-linked block move to the end of the insertion order
+        self._nodes[block.hash] = node
+        self.tip = node
+        self._prune()
+        return node
+
+    def add_branch(self, block: Block) -> TreeNode:
+        """
+        Add block of competing branch (not linked)
+        :param block: branch block
+        :return: tree node of the block
+        """
+        node = self._nodes.get(block.hash)
+        if node is None:
+            node = self._nodes[block.hash] = TreeNode(block)
+        return node
+
+    def remove(self, block_hash: str):
+        self._nodes.pop(block_hash, None)
+
+    def get(self, block_hash: str) -> Optional[TreeNode]:
+        return self._nodes.get(block_hash)
+
+    def parent(self, node: TreeNode) -> TreeNode:
+        """
+        :param node: node of linked block that can be rolled back
+        :return: the block parent node
+        """
+        return self._nodes[node.block.previous_hash]
+
+    def rollback_path(self, fork_hash: str) -> Optional[List[TreeNode]]:
+        """
+        :param fork_hash: hash of block on the chain
+        :return: the chain nodes after the fork block (tip last),
+         None if the fork block is not on the chain or a block can't be rolled back
+        """
+        path: List[TreeNode] = []
+        node: Optional[TreeNode] = self.tip
+        while node is not None and node.block.hash != fork_hash:
+            if node.undo is None:
+                return None
+            path.append(node)
+            node = self._nodes.get(node.block.previous_hash)
+        if node is None:
+            return None
+        path.reverse()
+        return path
+
+    def _prune(self):
+        """
+        Drop the blocks that are deeper than max depth
+        """
+        min_height = self.tip.height - self.max_depth
+        while self._nodes:
+            block_hash, node = next(iter(self._nodes.items()))
+            if node.height >= min_height:
+                break
+            del self._nodes[block_hash]
+
+    def __contains__(self, block_hash: str) -> bool:
+        return block_hash in self._nodes
+
+    def __len__(self) -> int:
+        return len(self._nodes)
@@ -3,25 +3,40 @@ Chain class is singleton that represent blockchain
 the object contain methods to interact with the blockchain:
 - get chain wallet (get wallet data from the blockchain by wallet address)
 - add block (add block object to candidate blocks)
-- add transaction (add transaction object to transaction pool)
+- add transaction (add transaction object to transaction pool (mempool))
+- add transactions (add batch of transactions to the pool, the signatures are verified together)
 - create unsigned block (create block object with only signature missing)
 - create unsigned transaction (create transaction object with only signature missing)
+- prescreen block (Validate block structure without the signatures, returns bool value)
 - validate block (Validate block data, returns bool value)
 - validate transaction (Validate transaction data, returns bool value)
 - block penalty (Calculate block penalty score based on forger, used by lottery system)
+- branch (create copy-on-write branch of the chain, the branch changes can be committed or discarded)
+- reorganize (switch to competing branch if it's better, only the blocks after the fork point are rolled back)
+
+chain with data directory keep its state in state store (see state_store.py)
+and full chain keep its blocks in on disk block store (see block_store.py),
+on restart the chain state is loaded from the state store and only the blocks after the stored state are replayed
 """
 
-from typing import Dict, List
+from typing import Dict, List, Optional, Set, Tuple, Union
+import os
 import time
 from base64 import b64decode
-from itertools import islice
+from threading import RLock
 from collections import defaultdict
 
 from .block import Block
+from .block_store import BlockStore
+from .block_tree import BlockTree, TreeNode, UndoRecord
+from .state_store import StateStore, StoredState
+from .batch_verifier import BatchVerifier
 from .transaction import Transaction
 from .chain_wallet import ChainWallet
+from .mempool import Mempool
+from .overlay import WalletsOverlay, BlocksOverlay, AddressIndexOverlay, MempoolOverlay
 from .config import Config
-from .consensus import wallet_penalty, SumTree
+from .consensus import LotteryContext, AddressIndex, SumTree
 from .next_block_chooser import NextBlockChooser
 from .hardcoded import GENESIS_BLOCK, developer_address
 
@@ -35,26 +50,44 @@ from .exceptions import (
     InvalidGenesisHashError,
     NonSequentialBlockError,
     InvalidSenderOrRecipient,
+    ForkTooDeepError,
 )
 
 
 class Chain:
-    def __init__(self, save_all_blocks: bool = True):
+    def __init__(self, save_all_blocks: bool = True, data_dir: str = None):
+        """
+        :param save_all_blocks: keep all the chain blocks (full node) or only the last block
+        :param data_dir: directory of the block store and the state store (None keep the chain in memory)
+        """
         self._save_all_blocks: bool = save_all_blocks
+        self._lock = RLock()
         self.blocks: List[Block] = []
-        self.transaction_pool: Dict[
-            str, Transaction
-        ] = {}  # {transaction_hash: transaction object}
+        self.state_store: Optional[StateStore] = None
+        if data_dir is not None:
+            os.makedirs(data_dir, exist_ok=True)
+            self.state_store = StateStore(os.path.join(data_dir, "state.db"))
+            if save_all_blocks:
+                self.blocks = BlockStore(os.path.join(data_dir, "blocks"))  # type: ignore
+        self.mempool: Mempool = Mempool()
         self.chain_wallets: Dict[
             str, ChainWallet
         ] = {}  # {chain wallet address: chain wallet object}
+        self.address_index = AddressIndex()  # chain wallets addresses sorted
 
-        self.penalty: int = 0
+        self.penalty: float = 0.0  # cumulative penalty of the chain blocks (fork choice)
+        self.block_tree = BlockTree()  # recent blocks and competing branches with undo records
+        self._undo: Optional[UndoRecord] = None  # undo record of the block that is linked
         self.sum_tree: SumTree = None  # type: ignore
         self.epoch_random = Config.epoch_initial_random
+        self._lottery: Optional[LotteryContext] = None  # the current slot lottery (see block_penalty)
+        self._unsaved_wallets: Dict[str, ChainWallet] = {}  # wallets changed since the last saved state
+        self._removed_wallets: Set[str] = set()  # wallets removed by rolled back blocks since the last saved state
+        self._unsaved_snapshot = None  # sum tree snapshot that was not saved yet
 
         self.get_chain_wallet(developer_address)
-        self.link_new_block(GENESIS_BLOCK, _i_know_what_i_doing=True)
+        if not self._restore():
+            self.link_new_block(GENESIS_BLOCK, _i_know_what_i_doing=True)
 
         self.next_block_chooser = NextBlockChooser(self)
         self.next_block_chooser.start()
@@ -65,29 +98,18 @@ class Chain:
     def is_empty(self) -> bool:
         return self._last_block_index == 0
 
-    def copy(self):
-        """Create a copy of the chain for testing changes without corupting the chain"""
-        chain_copy = Chain(save_all_blocks=True)
-        chain_copy.blocks = self.blocks.copy()
-        chain_copy.chain_wallets = (
-            self.chain_wallets.copy()
-        )  # TODO: chack copy of dict obj
-        chain_copy.epoch_random = self.epoch_random
-        chain_copy.penalty = self.penalty
-        chain_copy.sum_tree = self.sum_tree  # TODO: copy by value
-        chain_copy.transaction_pool = self.transaction_pool.copy()
-        return chain_copy
-
-    def update_state(self, other_chain):
-        """Update state of chain with other chain state
+    def height(self) -> int:
+        """
+        :return: last block index
+        """
+        return self._last_block_index
+
+    def branch(self) -> "ChainBranch":
+        """Create copy-on-write branch of the chain for testing changes without corupting the chain
         used when downloading the block history and when syncing the state with a better chain
+        :return: chain branch (call commit to apply the branch changes to the chain)
         """
-        self.blocks = other_chain.blocks
-        self.chain_wallets = other_chain.chain_wallets
-        self.epoch_random = other_chain.epoch_random
-        self.penalty = other_chain.penalty
-        self.sum_tree = other_chain.sum_tree
-        self.transaction_pool = other_chain.transaction_pool
+        return ChainBranch(self)
 
     def get_chain_wallet(self, address: str) -> ChainWallet:
         """
@@ -96,19 +118,42 @@ class Chain:
         :return: chain wallet object contain all the wallet data (balance, tx_count, etc...)
         """
         if address not in self.chain_wallets:
-            self.chain_wallets[address] = ChainWallet(
-                address,
-                balance=Config.test_net_wallet_initial_coins if Config.test_net else 0,
-            )
+            self.chain_wallets[address] = self._new_chain_wallet(address)
+            self.address_index.add(address)
+            self._mark_unsaved(self.chain_wallets[address])
+            if self._undo is not None:
+                self._undo.created.append(address)
         return self.chain_wallets[address]
 
-    def add_block(self, block_dict: dict):  # TODO: support block object and block dict
+    def find_chain_wallet(self, address: str) -> ChainWallet:
+        """
+        Get chain wallet object from address without creating it
+        used by the validation (the chain state isn't changed, validation can run outside the chain lock)
+        :param address: wallet address
+        :return: the chain wallet, or new wallet that isn't added to the chain if the address is unknown
+        """
+        if address in self.chain_wallets:
+            return self.chain_wallets[address]
+        return self._new_chain_wallet(address)
+
+    @staticmethod
+    def _new_chain_wallet(address: str) -> ChainWallet:
+        return ChainWallet(
+            address,
+            balance=Config.test_net_wallet_initial_coins if Config.test_net else 0,
+        )
+
+    def add_block(self, block_dict: Union[Block, dict]):
         """
         Add block as next block candidate
-        :param block_dict: block dict representation
+        block of competing branch (its parent is a known block that is not the chain tip) goes to the fork choice
+        :param block_dict: block object or block dict representation
         :return: None
         """
-        block = Block.from_dict(block_dict)
+        block = block_dict if isinstance(block_dict, Block) else Block.from_dict(block_dict)
+        if block.index and block.previous_hash != self._last_block_hash and block.previous_hash in self.block_tree:
+            self.reorganize([block])
+            return
         self.next_block_chooser.scan_block(block)
 
     def link_new_block(self, block: Block, _i_know_what_i_doing: bool = False):
@@ -123,17 +168,132 @@ class Chain:
                 "You can't access this sensitive method without _i_know_what_i_doing argument, "
                 "You are probable not need to access it directly and should call add_block instead."
             )
-        self._process_block(block)
+        with self._lock:
+            self._process_block(block)
+            self._save_state()
+
+    def reorganize(self, blocks: List[Union[Block, dict]]) -> bool:
+        """
+        Switch the chain to competing branch if the branch is better (see block_tree.py for the fork choice)
+        branch that can't win is rejected before the chain is changed (see _branch_can_win),
+        the chain blocks after the fork point are rolled back with their undo records and the branch blocks are linked,
+        if the branch is invalid or not better the chain blocks are linked back
+        :param blocks: the branch blocks (block objects or block dicts), the first block parent is on the chain
+        :raise ForkTooDeepError: if the fork point is not in the block tree or deeper than the undo records
+        :return: True if the chain was switched to the branch else False
+        """
+        branch = [b if isinstance(b, Block) else Block.from_dict(b) for b in blocks]
+        if not branch:
+            return False
+        with self._lock:
+            rollback = self.block_tree.rollback_path(branch[0].previous_hash)
+            if rollback is None:
+                raise ForkTooDeepError(
+                    "Branch fork point is unknown or too deep", fork_hash=branch[0].previous_hash
+                )
+            if not self._branch_can_win(branch, rollback):
+                return False
+            old_tip = self.block_tree.tip
+            for block in branch:
+                self.block_tree.add_branch(block)
+            for node in reversed(rollback):
+                self._undo_block(node)
+
+            linked = 0
+            try:
+                for block in branch:
+                    self._process_block(block)
+                    linked += 1
+            except ValidationError:
+                for block in branch[linked:]:
+                    self.block_tree.remove(block.hash)
+                self._switch_back(branch[:linked], rollback)
+                raise
+            if self.block_tree.tip.fork_choice_key() <= old_tip.fork_choice_key():
+                self._switch_back(branch, rollback)
+                return False
+            self._save_state()
+            self.add_transactions([t for node in rollback for t in node.block.transactions])  # orphaned transactions
+            return True
+
+    def _branch_can_win(self, branch: List[Block], rollback: List[TreeNode]) -> bool:
+        """
+        Fork choice before the chain state is touched
+        the branch height is counted from the fork point (the blocks indexes are checked only when they are linked),
+        shorter branch can't win, competing tip (one block on the tip parent) is scored with the lottery state
+        of the tip parent from the tip undo record, other branches of the same height are scored by linking them
+        :param branch: the branch blocks
+        :param rollback: the chain blocks after the fork point
+        :return: False if the branch can't beat the chain tip
+        """
+        tip = self.block_tree.tip
+        height = tip.height - len(rollback) + len(branch)
+        if height != tip.height:
+            return height > tip.height
+        undo: UndoRecord = tip.undo  # type: ignore  # the rolled back tip has undo record
+        if len(branch) != 1 or undo.created:  # the tip created wallets, the parent addresses index is not available
+            return True
+        lottery = LotteryContext(undo.sum_tree, undo.epoch_random, self.address_index)
+        penalty = undo.penalty + lottery.penalty(branch[0].forger)
+        return TreeNode(branch[0], penalty).fork_choice_key() > tip.fork_choice_key()
+
+    def _switch_back(self, linked: List[Block], rollback: List[TreeNode]):
+        """
+        Roll back the linked branch blocks and link the chain blocks again (they were already validated)
+        :param linked: branch blocks that were linked
+        :param rollback: the chain blocks that were rolled back
+        :return: None
+        """
+        for _ in linked:
+            self._undo_block(self.block_tree.tip)
+        for node in rollback:
+            self._process_block(node.block, validate=False)
+        self._save_state()
+        self.add_transactions([t for block in linked for t in block.transactions])
 
-    def add_transaction(self, transaction_dict: dict):
+    def add_transaction(self, transaction_dict: Union[Transaction, dict]):
         """
         Validate transaction and add transaction to pool
-        :param transaction_dict: dict representation of transaction
+        :param transaction_dict: transaction object or dict representation of transaction
         :return: None
         """
-        transaction = Transaction.from_dict(transaction_dict)
+        transaction = (
+            transaction_dict
+            if isinstance(transaction_dict, Transaction)
+            else Transaction.from_dict(transaction_dict)
+        )
         self.validate_transaction(transaction)
-        self.transaction_pool[transaction.hash] = transaction
+        self.mempool.add(transaction)
+
+    def add_transactions(self, transactions: List[Union[Transaction, dict]]) -> List[Transaction]:
+        """
+        Validate batch of transactions and add the valid transactions to pool
+        the signatures are verified together with the batch verifier,
+        invalid transactions and transactions that are already in the pool are skipped
+        :param transactions: transaction objects or dict representations of transactions
+        :return: the added transactions
+        """
+        new_transactions: Dict[str, Transaction] = {}
+        for transaction_dict in transactions:
+            transaction = (
+                transaction_dict
+                if isinstance(transaction_dict, Transaction)
+                else Transaction.from_dict(transaction_dict)
+            )
+            if transaction.hash not in self.mempool:
+                new_transactions.setdefault(transaction.hash, transaction)
+        to_add = list(new_transactions.values())
+        verified = BatchVerifier().verify(to_add)  # None if the verification stopped before it
+
+        added = []
+        for transaction, signature_verified in zip(to_add, verified):
+            try:
+                self.validate_transaction(transaction, signature_verified=signature_verified)
+                self.mempool.add(transaction)
+            except ValidationError:
+                continue
+            added.append(transaction)
+        return added
 
     def create_unsigned_block(self, forger: str) -> Block:
         """
@@ -176,14 +336,17 @@ class Chain:
         )
         return transaction
 
-    def validate_transaction(self, transaction: Transaction) -> bool:
+    def validate_transaction(
+        self, transaction: Transaction, signature_verified: Optional[bool] = None
+    ) -> bool:
         """
         Validate transaction
         check tx_counter, balance, fee, signature, and prevent self transfer
         :param transaction: transaction object
+        :param signature_verified: signature verification result if already known (e.g: from batch verification)
         :return: True if valid else False
         """
-        sender_wallet = self.get_chain_wallet(transaction.sender)
+        sender_wallet = self.find_chain_wallet(transaction.sender)
         if transaction.tx_counter <= sender_wallet.tx_counter:
             raise LowTransactionCounterError(
                 "Transaction tx_counter is lower then the wallet tx_counter",
@@ -192,7 +355,9 @@ class Chain:
             )
         if transaction.amount < 0 or transaction.fee < Config.min_fee:
             raise ValidationError("Invalid transaction arguments")
-        if not transaction.signature_verified():
+        if signature_verified is None:
+            signature_verified = transaction.signature_verified()
+        if not signature_verified:
             raise InvalidSignatureError("Invalid transaction signature")
         if transaction.amount + transaction.fee > sender_wallet.balance:
             raise InsufficientBalanceError(
@@ -204,13 +369,12 @@ class Chain:
             raise InvalidSenderOrRecipient("Sender is recipient")
         return True
 
-    def validate_block(self, block: Block) -> bool:
+    def prescreen_block(self, block: Block) -> bool:
         """
-        Block object validation
+        Cheap structural block validation (no signatures are verified)
         if genesis check hardcoded hash
         else:
-        check index, previous_hash, signature
-        and validate all the block transactions
+        check index, previous_hash and transactions count
         :param block: block object
         :return: True is valid else False
         """
@@ -230,68 +394,266 @@ class Chain:
             raise NonSequentialBlockError(
                 "Block previous hash isn't matching previous block hash"
             )
-        if not block.signature_verified():
-            raise InvalidSignatureError("Invalid block signature")
         if len(block.transactions) > Config.max_transactions_per_block:
             raise TooMachTransactionInBlockError(
                 "too mach transactions in block",
                 tx_count=len(block.transactions),
                 max_transactions=Config.max_transactions_per_block,
             )
+        return True
+
+    def verify_block_signatures(self, block: Block) -> List[Optional[bool]]:
+        """
+        Verify the block signature and the block transactions signatures
+        the signatures are verified together with the batch verifier (verified signatures are cached)
+        :param block: block object
+        :return: the transactions verification results (None if the verification stopped before the transaction)
+        """
+        if block.index == 0:
+            return []
+        verified = BatchVerifier().verify_block(block)
+        block_verified = verified[0]
+        if block_verified is None:
+            block_verified = block.signature_verified()
+        if not block_verified:
+            raise InvalidSignatureError("Invalid block signature")
+        if False in verified:
+            raise InvalidSignatureError("Invalid transaction signature")
+        return verified[1:]
+
+    def validate_block(self, block: Block) -> bool:
+        """
+        Block object validation
+        prescreen the block (see prescreen_block), check the signatures and validate all the block transactions
+        the chain state isn't changed by the validation
+        :param block: block object
+        :return: True is valid else False
+        """
+        self.prescreen_block(block)
+        if block.index == 0:
+            return True
+        verified = self.verify_block_signatures(block)
 
         block_wallets: Dict[str, float] = defaultdict(float)
-        for transaction in block.transactions:
-            self.validate_transaction(transaction)
+        for transaction, transaction_verified in zip(block.transactions, verified):
+            sender_wallet = self.find_chain_wallet(transaction.sender)
+            self.validate_transaction(transaction, transaction_verified)
             block_wallets[transaction.sender] += transaction.amount + transaction.fee
-            if (
-                block_wallets[transaction.sender]
-                > self.chain_wallets[transaction.sender].balance
-            ):
+            if block_wallets[transaction.sender] > sender_wallet.balance:
                 raise InsufficientBalanceError(
                     "All sender transaction in the block are bigger from his balance",
                     sum_spent=block_wallets[transaction.sender],
-                    current_balance=self.chain_wallets[transaction.sender].balance,
+                    current_balance=sender_wallet.balance,
                 )
         return True
 
     def block_penalty(self, block: Block) -> float:
         """
         Calculate block penalty score (affect lottery winning chances)
+        the slot lottery context is reused for all the slot candidates (O(1) for every candidate)
         :param block: block object
         :return: 0 - number of wallets on the chain
         """
-        return wallet_penalty(
-            self.sum_tree,
-            block.forger,
+        return self._lottery_context().penalty(block.forger)
+
+    def _lottery_context(self) -> LotteryContext:
+        """
+        :return: the lottery context of the current slot (created again if the lottery state was changed)
+        """
+        lottery = self._lottery
+        if lottery is None or not lottery.is_current(self.sum_tree, self.epoch_random, self.address_index):
+            lottery = self._lottery = LotteryContext(self.sum_tree, self.epoch_random, self.address_index)
+        return lottery
+
+    def _process_block(self, block: Block, validate: bool = True):
+        """
+        Update blockchain state with the new block data
+        the state before the block is recorded in undo record, the block is added to the block tree
+        :param block: block object
+        :param validate: validate the block (False for block that was already validated on the same parent)
+        :return: None
+        """
+        undo = UndoRecord(self.epoch_random, self.sum_tree, self.penalty, self._unsaved_snapshot)
+        self._undo = undo
+        try:
+            if validate:
+                self.validate_block(block)
+            if block.index != 0:
+                self.penalty += self.block_penalty(block)
+            self._apply_block(block)
+            self._insert_block_to_chain(block)
+        finally:
+            self._undo = None
+        self._record_block(block, undo)
+
+    def _record_block(self, block: Block, undo: UndoRecord):
+        """
+        Add the linked block to the block tree
+        :param block: the linked block
+        :param undo: the block undo record
+        :return: None
+        """
+        self.block_tree.add_linked(block, self.penalty, undo)
+
+    def _undo_block(self, node: TreeNode):
+        """
+        Roll back the chain tip with its undo record
+        :param node: block tree node of the chain tip
+        :return: None
+        """
+        undo: UndoRecord = node.undo  # type: ignore  # the rolled back nodes always have undo record
+        for address, (balance, tx_counter) in undo.wallets.items():
+            wallet = self.chain_wallets[address]
+            wallet.balance = balance
+            wallet.tx_counter = tx_counter
+            self._mark_unsaved(wallet)
+        for address in reversed(undo.created):  # the wallets created by the block are the last created wallets
+            del self.chain_wallets[address]
+            self.address_index.remove(address)
+            self._unsaved_wallets.pop(address, None)
+            if self.state_store is not None:
+                self._removed_wallets.add(address)
+        self.epoch_random = undo.epoch_random
+        self.sum_tree = undo.sum_tree
+        self.penalty = undo.penalty
+        self._unsaved_snapshot = undo.unsaved_snapshot
+
+        parent = self.block_tree.parent(node)
+        self.blocks.pop()
+        if not self._save_all_blocks:
+            self.blocks.append(parent.block)
+        self.block_tree.tip = parent
+
+    def _touch(self, wallet: ChainWallet) -> ChainWallet:
+        """
+        Record the wallet values in the undo record of the linked block before the wallet is changed
+        :param wallet: chain wallet
+        :return: the wallet
+        """
+        if self._undo is not None:
+            self._undo.touch(wallet)
+        return wallet
+
+    def _restore(self) -> bool:
+        """
+        Restore the chain from the state store and the block store
+        1. load the last saved state, if the block store doesn't contain the state tip (blocks that were not written
+           before crash) load the last snapshot that the block store contain
+        2. replay the stored blocks after the loaded state (the stored blocks were validated before they were saved)
+        :return: True if the chain was restored else False (new chain)
+        """
+        stored_blocks = len(self.blocks)
+        if stored_blocks and self.blocks[0].hash != GENESIS_BLOCK.hash:
+            raise InvalidGenesisHashError("Stored genesis block hash is not hard coded hash")
+        state = None
+        if self.state_store is not None:
+            state = self.state_store.load()
+            if state is not None and self._save_all_blocks and not self._is_stored_block(state.tip):
+                state = self.state_store.load_snapshot(max_height=stored_blocks - 1)
+                if state is not None and not self._is_stored_block(state.tip):
+                    state = None
+                if state is None:
+                    self.state_store.clear()
+                else:
+                    self.state_store.reset(state)
+        if state is not None:
+            self._load_state(state)
+        elif not stored_blocks:
+            return False
+
+        first_block = 0 if state is None else state.height + 1
+        for index in range(first_block, stored_blocks):
+            block = self.blocks[index]
+            if block.index != 0:
+                self.penalty += self.block_penalty(block)
+            self._apply_block(block)
+            self._update_chain_state(block)
+        self.block_tree.add_linked(self._last_block, self.penalty)  # the restored blocks can't be rolled back
+        self._save_state()
+        return True
+
+    def _is_stored_block(self, block_dict: dict) -> bool:
+        """
+        :param block_dict: block dict representation
+        :return: True if the block is in the block store
+        """
+        index = block_dict["index"]
+        return index < len(self.blocks) and self.blocks[index].hash == Block.from_dict(block_dict).hash
+
+    def _load_state(self, state: StoredState):
+        """
+        Load stored state (wallets, lottery sum tree, epoch random and last block)
+        :param state: state loaded from the state store
+        :return: None
+        """
+        self.chain_wallets = {wallet.address: wallet for wallet in state.wallets}
+        self.address_index = AddressIndex(self.chain_wallets)
+        self.epoch_random = state.epoch_random
+        self.penalty = state.penalty
+        self.sum_tree = SumTree(
+            [wallet.balance for wallet in state.sum_tree_wallets],
+            [wallet.address for wallet in state.sum_tree_wallets],
+        )
+        if not self._save_all_blocks:
+            self.blocks.append(Block.from_dict(state.tip))
+        self._unsaved_wallets = {}
+        self._unsaved_snapshot = None
+
+    def _mark_unsaved(self, wallet: ChainWallet):
+        """
+        Track changed wallet until the next saved state
+        :param wallet: new or changed chain wallet
+        :return: None
+        """
+        if self.state_store is not None:
+            self._unsaved_wallets[wallet.address] = wallet
+            self._removed_wallets.discard(wallet.address)
+
+    def _save_state(self):
+        """
+        Save the changed wallets, the chain tip and the sum tree snapshot (if taken) to the state store
+        :return: None
+        """
+        if self.state_store is None:
+            return
+        self.state_store.save(
+            self._last_block.to_dict(),
             self.epoch_random,
-            list(sorted(self.chain_wallets.keys())),
+            self.penalty,
+            self._unsaved_wallets.values(),
+            self._unsaved_snapshot,
+            removed_wallets=self._removed_wallets,
         )
+        self._unsaved_wallets = {}
+        self._removed_wallets = set()
+        self._unsaved_snapshot = None
 
-    def _process_block(self, block: Block):
+    def _apply_block(self, block: Block):
         """
-        Update blockchain state with the new block data
+        Update the chain wallets with the block transactions and fees
         :param block: block object
         :return: None
         """
-        self.validate_block(block)
-        forger_wallet = self.get_chain_wallet(block.forger)
+        forger_wallet = self._touch(self.get_chain_wallet(block.forger))
         fees = 0.0
         for transaction in block.transactions:
-            sender_wallet = self.get_chain_wallet(transaction.sender)
-            recipient_wallet = self.get_chain_wallet(transaction.recipient)
+            sender_wallet = self._touch(self.get_chain_wallet(transaction.sender))
+            recipient_wallet = self._touch(self.get_chain_wallet(transaction.recipient))
             sender_wallet.subtract_coins(transaction.amount)
             sender_wallet.subtract_coins(transaction.fee)
             recipient_wallet.add_coins(transaction.amount)
             fees += transaction.fee
             sender_wallet.update_tx_counter(transaction.tx_counter)
+            self._mark_unsaved(sender_wallet)
+            self._mark_unsaved(recipient_wallet)
         forger_wallet.add_coins(fees)
-        self._insert_block_to_chain(block)
+        self._mark_unsaved(forger_wallet)
 
     def _insert_block_to_chain(self, block: Block):
         """
         Called every time block is added to chain
         1. save block
-        2. remove block transactions from pool
+        2. remove block transactions (and transactions with lower tx_counter of the same senders) from pool
         3. update lottery system is needed
         :param block: new block object
         :return: None
@@ -299,11 +661,20 @@ class Chain:
         self.blocks.append(block)
         if not self._save_all_blocks and len(self.blocks) > 1:
             self.blocks.pop(0)
+        self._update_chain_state(block)
+
+    def _update_chain_state(self, block: Block):
+        """
+        Update the lottery system and the pool after the block was added to chain
+        :param block: new block object
+        :return: None
+        """
         self.epoch_random = self._next_epoch_random(block.forger)
-        for transaction in block.transactions:
-            del self.transaction_pool[transaction.hash]
+        for sender in {transaction.sender for transaction in block.transactions}:
+            self.mempool.remove_stale(sender, self.chain_wallets[sender].tx_counter)
         if self.sum_tree is None or block.index % Config.epoch_size == 0:
             self._build_sum_tree()
+        self._lottery_context()  # find the next slot lottery winner before the candidates arrive
 
     def _next_epoch_random(self, new_block_forger_address: str) -> float:
         """
@@ -320,9 +691,17 @@ class Chain:
         Create sum tree from all the wallets on the block chain
         :return: None
         """
-        self.sum_tree = SumTree.from_dict(
-            {address: wallet.balance for address, wallet in self.chain_wallets.items()}
+        self.sum_tree = SumTree(
+            [wallet.balance for wallet in self.chain_wallets.values()],
+            list(self.chain_wallets.keys()),
         )
+        if self.state_store is not None:
+            self._unsaved_snapshot = (
+                self._last_block.to_dict(),
+                self.epoch_random,
+                self.penalty,
+                [(wallet.address, wallet.balance, wallet.tx_counter) for wallet in self.chain_wallets.values()],
+            )
 
     @property
     def _last_block(self) -> Block:
@@ -349,20 +728,109 @@ class Chain:
         """
         Get the best paying (with fee's) transactions from pool
         :param count: number of transactions wanted
-        :return: sorted list of transactions
-        """
-        count = min(count, len(self.transaction_pool))
-        return sorted(
-            islice(
-                sorted(
-                    self.transaction_pool.values(),
-                    key=lambda transaction: transaction.fee,
-                    reverse=True,
-                ),
-                count,
-            ),
-            key=lambda transaction: transaction.tx_counter,
-        )
+        :return: list of transactions (every sender transactions are sorted by tx_counter)
+        """
+        return self.mempool.best(count)
+
+    def close(self):
+        """
+        Stop choosing blocks and write the stored blocks to disk
+        :return: None
+        """
+        self.next_block_chooser.stop()
+        if isinstance(self.blocks, BlockStore):
+            self.blocks.close()
+        if self.state_store is not None:
+            self.state_store.close()
 
     def __del__(self):
         self.next_block_chooser.stop()
+
+
+class ChainBranch(Chain):
+    """
+    Copy-on-write branch of a chain
+    the branch read the parent chain state and keep its changes in overlays (see overlay.py),
+    creating branch is O(1), commit is proportional to the number of touched wallets and new blocks
+    and discarded branch leave the parent untouched
+    """
+
+    def __init__(self, parent: Chain):
+        # Chain.__init__ is not called, the branch start from the parent state instead of the genesis block
+        self._parent = parent
+        self._save_all_blocks = parent._save_all_blocks
+        self._lock = RLock()
+        self.next_block_chooser = None  # type: ignore  # the parent chain choose the next block
+        self._reset()
+
+    def _reset(self):
+        """
+        Create empty overlays over the parent state
+        :return: None
+        """
+        parent = self._parent
+        self.blocks = BlocksOverlay(parent.blocks)  # type: ignore
+        self.mempool = MempoolOverlay(parent.mempool)  # type: ignore
+        self.chain_wallets = WalletsOverlay(parent.chain_wallets)  # type: ignore
+        self.address_index = AddressIndexOverlay(parent.address_index)
+
+        self.penalty = parent.penalty
+        self.sum_tree = parent.sum_tree
+        self.epoch_random = parent.epoch_random
+        self._lottery = parent._lottery
+        self._undo = None
+        self._removed_wallets = set()
+        self._linked: List[Tuple[Block, float, UndoRecord]] = []  # added to the parent block tree on commit
+
+        self.state_store = parent.state_store  # changes are tracked here and saved by the parent on commit
+        self._unsaved_wallets = {}
+        self._unsaved_snapshot = None
+
+    def _save_state(self):
+        pass
+
+    def add_block(self, block_dict: Union[Block, dict]):
+        raise RuntimeError("Chain branch can't choose blocks, link them with link_new_block")
+
+    def reorganize(self, blocks: List[Union[Block, dict]]) -> bool:
+        raise RuntimeError("Chain branch can't switch branches, reorganize the parent chain")
+
+    def _record_block(self, block: Block, undo: UndoRecord):
+        self._linked.append((block, self.penalty, undo))
+
+    def commit(self):
+        """
+        Apply the branch changes to the parent chain
+        :raise StaleBranchError: if blocks were added to the parent after the branch was created
+        :return: None
+        """
+        parent = self._parent
+        with parent._lock:
+            self.blocks.check_base()  # type: ignore
+            self.blocks.commit()  # type: ignore
+            self.chain_wallets.commit()  # type: ignore
+            self.address_index.commit()
+            self.mempool.commit()  # type: ignore
+            parent.penalty = self.penalty
+            parent.sum_tree = self.sum_tree
+            parent.epoch_random = self.epoch_random
+            for block, penalty, undo in self._linked:
+                parent.block_tree.add_linked(block, penalty, undo)
+            self._linked = []
+            for address in self._unsaved_wallets:
+                parent._mark_unsaved(parent.chain_wallets[address])
+            if self._unsaved_snapshot is not None:
+                parent._unsaved_snapshot = self._unsaved_snapshot
+            parent._save_state()
+            self._unsaved_wallets = {}
+            self._unsaved_snapshot = None
+
+    def discard(self):
+        """
+        Drop the branch changes (the parent chain is never changed by the branch before commit)
+        :return: None
+        """
+        self._reset()
+
+    def __del__(self):
+        pass
@@ -9,6 +9,7 @@ the object expose methods for updating the wallet data:
 add_coins (add coins amount to balance)
 subtract_coins (subtract coins amount from balance)
 update_tx_counter (update number of transactions made with the wallet)
+copy (create copy of the wallet, used by chain branches)
 """
 
 
@@ -26,3 +27,6 @@ class ChainWallet:
 
     def update_tx_counter(self, update_tx_counter: int):
         self.tx_counter = update_tx_counter
+
+    def copy(self) -> "ChainWallet":
+        return ChainWallet(self.address, self.balance, self.tx_counter)
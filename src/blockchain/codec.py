@@ -0,0 +1,243 @@
+"""
+Compact binary codec for transactions and blocks (used on the wire and in the block store)
+
+transaction layout (fixed size):
+sender (33 bytes compressed key), recipient (33 bytes), amount (number), fee (number), tx_counter (8 bytes),
+signature flag (1 byte) and signature (64 bytes raw signature)
+
+block layout: fixed size header followed by the transactions
+index (8 bytes), previous hash (1 byte length + 32 bytes), timestamp (number), forger (33 bytes),
+signature flag and signature, transactions count (4 bytes)
+
+number is type byte (int or float) followed by 8 bytes (signed int or double),
+the python type is kept because the hash is calculated over the number text (1 and 1.0 have different hashes),
+values that can't be encoded (e.g: non base64 address) raise CodecError and the JSON encoding should be used instead
+"""
+import struct
+from binascii import Error as Base64Error, a2b_base64, b2a_base64
+from functools import lru_cache
+from typing import Optional, Tuple, Union
+
+from .block import Block
+from .exceptions import CodecError
+from .transaction import Transaction
+
+__all__ = [
+    "CODEC_JSON",
+    "CODEC_BINARY",
+    "encode_transaction",
+    "decode_transaction",
+    "encode_block",
+    "decode_block",
+]
+
+CODEC_JSON = 0
+CODEC_BINARY = 1
+
+Buffer = Union[bytes, bytearray, memoryview]
+
+KEY_SIZE = 33
+SIGNATURE_SIZE = 64
+HASH_SIZE = 32
+HASH_DIGEST = 255  # previous hash length byte of sha256 hex digest (the other values are text length)
+
+INT = 0
+FLOAT = 1
+_NUMBER_INT = struct.Struct("!Bq")
+_NUMBER_FLOAT = struct.Struct("!Bd")
+_NUMBER_SIZE = _NUMBER_INT.size
+_NUMBERS = {int: (INT, _NUMBER_INT), float: (FLOAT, _NUMBER_FLOAT)}  # bool is not a number field
+
+TRANSACTION = struct.Struct(f"!{KEY_SIZE}s{KEY_SIZE}s{_NUMBER_SIZE}s{_NUMBER_SIZE}sqB{SIGNATURE_SIZE}s")
+BLOCK_HEADER = struct.Struct(f"!qB{HASH_SIZE}s{_NUMBER_SIZE}s{KEY_SIZE}sB{SIGNATURE_SIZE}sI")
+
+
+def _encode_number(value) -> bytes:
+    number = _NUMBERS.get(type(value))
+    if number is None:
+        raise CodecError("number field is not int or float", value=value)
+    number_type, number_struct = number
+    try:
+        return number_struct.pack(number_type, value)
+    except struct.error:
+        raise CodecError("number is out of range", value=value)
+
+
+def _decode_number(data: bytes):
+    if data[0] == INT:
+        return _NUMBER_INT.unpack(data)[1]
+    if data[0] == FLOAT:
+        return _NUMBER_FLOAT.unpack(data)[1]
+    raise CodecError("invalid number type", number_type=data[0])
+
+
+def _encode_base64(value: Optional[str], size: int) -> bytes:
+    """
+    :return: the raw bytes of canonical base64 string (address or signature)
+    """
+    if not isinstance(value, str):
+        raise CodecError("field is not base64 string", value=value)
+    try:
+        raw = a2b_base64(value)
+    except (Base64Error, ValueError):
+        raise CodecError("field is not base64", value=value)
+    if len(raw) != size or _to_base64(raw) != value:  # only canonical base64 is decoded back to the same string
+        raise CodecError("field size is invalid", value=value, size=size)
+    return raw
+
+
+def _to_base64(raw: bytes) -> str:
+    return b2a_base64(raw, newline=False).decode()
+
+
+def _encode_address(address: str) -> bytes:
+    if not isinstance(address, str):
+        raise CodecError("address is not string", address=address)
+    return _encode_cached_address(address)
+
+
+@lru_cache(maxsize=4096)
+def _encode_cached_address(address: str) -> bytes:
+    return _encode_base64(address, KEY_SIZE)
+
+
+@lru_cache(maxsize=4096)
+def _decode_address(raw: bytes) -> str:
+    return _to_base64(raw)
+
+
+def _encode_signature(signature: Optional[str]) -> Tuple[int, bytes]:
+    if signature is None:
+        return 0, bytes(SIGNATURE_SIZE)
+    return 1, _encode_base64(signature, SIGNATURE_SIZE)
+
+
+def _decode_signature(flag: int, raw: bytes) -> Optional[str]:
+    return _to_base64(raw) if flag else None
+
+
+def _encode_hash(value: str) -> Tuple[int, bytes]:
+    if not isinstance(value, str):
+        raise CodecError("hash is not string", value=value)
+    if len(value) == HASH_SIZE * 2:
+        try:
+            raw = bytes.fromhex(value)
+            if raw.hex() == value:
+                return HASH_DIGEST, raw
+        except ValueError:
+            pass
+    text = value.encode()
+    if len(text) > HASH_SIZE:
+        raise CodecError("hash is too long", value=value)
+    return len(text), text
+
+
+def _decode_hash(length: int, raw: bytes) -> str:
+    if length == HASH_DIGEST:
+        return raw.hex()
+    try:
+        return raw[:length].decode()
+    except UnicodeDecodeError:
+        raise CodecError("hash text is not utf-8")
+
+
+def encode_transaction(transaction: Transaction) -> bytes:
+    """
+    :param transaction: transaction object
+    :return: binary transaction (TRANSACTION.size bytes)
+    """
+    if isinstance(transaction.tx_counter, bool) or not isinstance(transaction.tx_counter, int):
+        raise CodecError("tx_counter is not int", tx_counter=transaction.tx_counter)
+    signature_flag, signature = _encode_signature(transaction.signature)
+    try:
+        return TRANSACTION.pack(
+            _encode_address(transaction.sender),
+            _encode_address(transaction.recipient),
+            _encode_number(transaction.amount),
+            _encode_number(transaction.fee),
+            transaction.tx_counter,
+            signature_flag,
+            signature,
+        )
+    except struct.error:
+        raise CodecError("tx_counter is out of range", tx_counter=transaction.tx_counter)
+
+
+def decode_transaction(data: Buffer, offset: int = 0) -> Transaction:
+    """
+    :param data: buffer that contain binary transaction
+    :param offset: transaction position in the buffer
+    :return: transaction object
+    """
+    try:
+        sender, recipient, amount, fee, tx_counter, signature_flag, signature = TRANSACTION.unpack_from(data, offset)
+    except struct.error:
+        raise CodecError("transaction is truncated")
+    return Transaction(
+        sender=_decode_address(sender),
+        recipient=_decode_address(recipient),
+        amount=_decode_number(amount),
+        fee=_decode_number(fee),
+        tx_counter=tx_counter,
+        signature=_decode_signature(signature_flag, signature),
+    )
+
+
+def encode_block(block: Block) -> bytes:
+    """
+    :param block: block object
+    :return: binary block
+    """
+    if isinstance(block.index, bool) or not isinstance(block.index, int):
+        raise CodecError("block index is not int", index=block.index)
+    hash_length, previous_hash = _encode_hash(block.previous_hash)
+    signature_flag, signature = _encode_signature(block.signature)
+    try:
+        header = BLOCK_HEADER.pack(
+            block.index,
+            hash_length,
+            previous_hash,
+            _encode_number(block.timestamp),
+            _encode_address(block.forger),
+            signature_flag,
+            signature,
+            len(block.transactions),
+        )
+    except struct.error:
+        raise CodecError("block index is out of range", index=block.index)
+    return b"".join([header, *(encode_transaction(t) for t in block.transactions)])
+
+
+def decode_block(data: Buffer, offset: int = 0) -> Tuple[Block, int]:
+    """
+    :param data: buffer that contain binary block
+    :param offset: block position in the buffer
+    :return: block object and the position after the block
+    """
+    try:
+        (
+            index,
+            hash_length,
+            previous_hash,
+            timestamp,
+            forger,
+            signature_flag,
+            signature,
+            transactions_count,
+        ) = BLOCK_HEADER.unpack_from(data, offset)
+    except struct.error:
+        raise CodecError("block is truncated")
+    offset += BLOCK_HEADER.size
+    end = offset + transactions_count * TRANSACTION.size
+    if end > len(data):
+        raise CodecError("block transactions are truncated", transactions_count=transactions_count)
+    transactions = [decode_transaction(data, position) for position in range(offset, end, TRANSACTION.size)]
+    block = Block(
+        index=index,
+        previous_hash=_decode_hash(hash_length, previous_hash),
+        timestamp=_decode_number(timestamp),
+        forger=_decode_address(forger),
+        transactions=transactions,
+        signature=_decode_signature(signature_flag, signature),
+    )
+    return block, end
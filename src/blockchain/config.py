@@ -19,7 +19,22 @@ class Config:
     min_fee = 1
     max_transactions_per_block = 100
 
+    mempool_max_transactions = 50000
+    mempool_max_bytes = 32 * 1024 * 1024
+
     test_net = False
     test_net_wallet_initial_coins = 100
 
     new_block_interval = 60  # Seconds
+    max_reorg_depth = 100  # blocks that can be rolled back to switch to competing branch
+    candidate_validation_workers = 2  # candidate blocks that are validated at once (best candidates first)
+
+    signature_verification_workers = 0  # 0 verify signatures in the calling process
+    signature_verification_chunk_size = 16
+    signature_cache_size = 50000
+    verifying_key_cache_size = 4096
+
+    block_store_segment_size = 64 * 1024 * 1024  # Bytes
+    block_store_batch_size = 16  # blocks written to disk together
+
+    state_snapshots_kept = 3  # sum tree snapshots kept in the state store (taken every epoch)
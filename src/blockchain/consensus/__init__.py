@@ -1,4 +1,5 @@
-from .lottery import wallet_penalty
+from .address_index import AddressIndex
+from .lottery import wallet_penalty, LotteryContext
 from .sum_tree import SumTree
 
-__all__ = ["SumTree", "wallet_penalty"]
+__all__ = ["AddressIndex", "SumTree", "wallet_penalty", "LotteryContext"]
@@ -0,0 +1,72 @@
+"""
+AddressIndex keep the chain wallets addresses sorted
+used by the lottery to find wallet rank (wallet position in the sorted addresses)
+
+the index is updated when new wallet is created, instead of sorting all the addresses for every block,
+the index version is changed on every update (the lottery context check it to know if the ranks changed)
+"""
+from bisect import bisect_left
+from collections.abc import Sequence
+from typing import Iterable, List
+
+
+class AddressIndex(Sequence):
+    def __init__(self, addresses: Iterable[str] = ()):
+        self._addresses: List[str] = sorted(set(addresses))
+        self._version = 0  # incremented when address is added or removed
+
+    @property
+    def version(self) -> int:
+        """
+        :return: number of the index updates (changed when address is added or removed)
+        """
+        return self._version
+
+    def add(self, address: str):
+        """Add address to index (O(log n) search, the insert is a memory move of the list)
+        :param address: wallet address
+        """
+        i = bisect_left(self._addresses, address)
+        if i == len(self._addresses) or self._addresses[i] != address:
+            self._addresses.insert(i, address)
+            self._version += 1
+
+    def remove(self, address: str):
+        """Remove address from index (the wallet was created by rolled back block)
+        :param address: wallet address
+        """
+        i = self.rank(address)
+        if i != -1:
+            del self._addresses[i]
+            self._version += 1
+
+    def rank(self, address: str) -> int:
+        """
+        :param address: wallet address
+        :return: address position in the sorted addresses (-1 if the address is not in the index)
+        """
+        i = bisect_left(self._addresses, address)
+        if i != len(self._addresses) and self._addresses[i] == address:
+            return i
+        return -1
+
+    def address(self, rank: int) -> str:
+        """
+        :param rank: address position in the sorted addresses
+        :return: wallet address
+        """
+        return self._addresses[rank]
+
+    def copy(self) -> "AddressIndex":
+        index = AddressIndex()
+        index._addresses = self._addresses.copy()
+        return index
+
+    def __getitem__(self, rank):
+        return self._addresses[rank]
+
+    def __len__(self) -> int:
+        return len(self._addresses)
+
+    def __contains__(self, address) -> bool:
+        return self.rank(address) != -1
@@ -1,10 +1,23 @@
 from bisect import bisect_left
 from functools import lru_cache
+from typing import Dict, Optional, Sequence
 
+from .address_index import AddressIndex
 from .sum_tree import SumTree
 
 
+def _index_version(array) -> int:
+    """
+    :return: version of the sorted addresses (the length for plain sorted list)
+    """
+    if isinstance(array, AddressIndex):
+        return array.version
+    return len(array)
+
+
 def _binary_search(array, element):
+    if isinstance(array, AddressIndex):
+        return array.rank(element)
     i = bisect_left(array, element)
     if i != len(array) and array[i] == element:
         return i
@@ -39,10 +52,67 @@ def wallet_penalty(
     root: SumTree,
     wallet_address: str,
     lottery_number: float,
-    wallets_sorted_by_address: list,
+    wallets_sorted_by_address: Sequence[str],
 ) -> float:
     wallets_count = len(wallets_sorted_by_address)
     winner_address = _find_lottery_winner(root, lottery_number)
     winner_index = _binary_search(wallets_sorted_by_address, winner_address)
     wallet_index = _binary_search(wallets_sorted_by_address, wallet_address)
     return _wallet_distance(winner_index, wallet_index, wallets_count)
+
+
+class LotteryContext:
+    """
+    The lottery state of one slot, everything except the candidate forger is fixed in the slot
+    so the winner rank is found once and the candidate penalty is a dict lookup
+    (the address ranks are mapped on the second lookup)
+
+    the context is created again when the address index is changed (wallet created or removed),
+    so mapping the ranks (O(n)) is paid again when wallets are created in the slot (e.g: by linked block),
+    the penalty is O(1) only while the index doesn't change
+    """
+
+    def __init__(self, root: SumTree, lottery_number: float, wallets_sorted_by_address: Sequence[str]):
+        """
+        :param root: the root node of the sum tree
+        :param lottery_number: float number in range of 0 to 1 (the epoch random)
+        :param wallets_sorted_by_address: the chain wallets addresses sorted (AddressIndex)
+        """
+        self.root = root
+        self.lottery_number = lottery_number
+        self.wallets = wallets_sorted_by_address
+        self.wallets_count = len(wallets_sorted_by_address)
+        self.wallets_version = _index_version(wallets_sorted_by_address)
+        self.winner_rank = _binary_search(wallets_sorted_by_address, _find_lottery_winner(root, lottery_number))
+        self._ranks: Optional[Dict[str, int]] = None  # {address: rank}
+        self._looked_up = False
+
+    def is_current(self, root: SumTree, lottery_number: float, wallets_sorted_by_address: Sequence[str]) -> bool:
+        """
+        :return: True if the context was created for this lottery state
+        """
+        return (
+            self.root is root
+            and self.lottery_number == lottery_number
+            and self.wallets is wallets_sorted_by_address
+            and self.wallets_version == _index_version(wallets_sorted_by_address)
+        )
+
+    def rank(self, wallet_address: str) -> int:
+        """
+        :param wallet_address: wallet address
+        :return: wallet position in the sorted addresses (-1 if the wallet is not in the chain)
+        """
+        if self._ranks is None:
+            if not self._looked_up:  # one lookup (e.g: linking block) doesn't pay for mapping all the addresses
+                self._looked_up = True
+                return _binary_search(self.wallets, wallet_address)
+            self._ranks = {address: rank for rank, address in enumerate(self.wallets[:])}
+        return self._ranks.get(wallet_address, -1)
+
+    def penalty(self, wallet_address: str) -> float:
+        """
+        :param wallet_address: candidate block forger address
+        :return: the forger distance from the lottery winner (same as wallet_penalty)
+        """
+        return _wallet_distance(self.winner_rank, self.rank(wallet_address), self.wallets_count)
@@ -1,48 +1,79 @@
+"""
+SumTree is array backed binary tree, every node value is the sum of its children values
+used by the lottery to find the wallet that own the lottery number (wallet chances are proportional to its balance)
+
+the tree is stored in flat list (node i children are 2i and 2i + 1, the leafs are at the end of the list),
+the number of leafs is padded with zeros to power of two
+"""
+from operator import add
+from typing import Any, Dict, List, Sequence
+
+
 class SumTree:
-    def __init__(self, left=None, right=None, value=None, data=None):
-        """SumTree node
-        :param left: left node object
-        :param right: right node object
-        :param value: node value
-        :param data: node data
+    def __init__(self, values: Sequence[float], data: Sequence[Any]):
+        """Build the tree level by level from the leafs values
+        :param values: leafs values (values that are summed)
+        :param data: leafs data (data returned on search)
         """
-        self._left = left
-        self._right = right
-
-        self._value = value
-        self._data = data
-        if left:
-            self.sum = self._left.sum + self._right.sum
-        else:
-            self.sum = self._value
-
-    def search(self, value: int, offset: int = 0):
-        if self._value is not None:
-            return self._data
-        if self._left.sum + offset > value:
-            return self._left.search(value, offset=offset)
-        return self._right.search(value, offset=offset + self._left.sum)
+        self._size = len(values)
+        self._capacity = 1 << max(self._size - 1, 0).bit_length()
+        self._data: List[Any] = list(data)
 
-    @classmethod
-    def _build_tree(cls, arr: list):
-        n_arr = []
-        for i in range(0, len(arr), 2):
-            if i + 1 < len(arr):
-                n_arr.append(cls(left=arr[i], right=arr[i + 1]))
+        tree: List[float] = [0] * self._capacity
+        tree.extend(values)
+        tree.extend([0] * (self._capacity - self._size))
+        level_start = self._capacity
+        while level_start > 1:
+            level_end = level_start * 2
+            parents_start = level_start // 2
+            tree[parents_start:level_start] = map(
+                add, tree[level_start:level_end:2], tree[level_start + 1: level_end: 2]
+            )
+            level_start = parents_start
+        self._tree = tree
+
+    @property
+    def sum(self) -> float:
+        return self._tree[1]
+
+    def search(self, value: float):
+        """Find the leaf that the value fall in its range
+        :param value: number between 0 and the tree sum
+        :return: leaf data (None if the value is out of the tree range)
+        """
+        tree = self._tree
+        node = 1
+        offset = 0.0
+        while node < self._capacity:
+            left = node * 2
+            if tree[left] + offset > value:
+                node = left
             else:
-                n_arr.append(cls(left=arr[i], right=cls(value=0)))
-        if len(n_arr) > 1:
-            return cls._build_tree(n_arr)
-        else:
-            return n_arr[0]
+                offset += tree[left]
+                node = left + 1
+        index = node - self._capacity
+        return self._data[index] if index < self._size else None
+
+    def update(self, index: int, value: float):
+        """Update leaf value and its parents sums
+        :param index: leaf index
+        :param value: new leaf value
+        """
+        tree = self._tree
+        node = self._capacity + index
+        tree[node] = value
+        node //= 2
+        while node >= 1:
+            tree[node] = tree[node * 2] + tree[node * 2 + 1]
+            node //= 2
+
+    def __len__(self) -> int:
+        return self._size
 
     @classmethod
-    def from_dict(cls, k_v_data: dict):
+    def from_dict(cls, k_v_data: Dict[Any, float]):
         """Create SumTree from dict
         value: value that is sumed
         data:  data returned on search
         """
-        arr = [cls(value=v, data=d) for d, v in k_v_data.items()]
-        if len(arr) == 1:
-            return arr[0]
-        return cls._build_tree(arr)
+        return cls(list(k_v_data.values()), list(k_v_data.keys()))
@@ -12,6 +12,10 @@ __all__ = [
     "TooMachTransactionInBlockError",
     "InsufficientBalanceError",
     "InvalidSenderOrRecipient",
+    "MempoolFullError",
+    "StaleBranchError",
+    "ForkTooDeepError",
+    "CodecError",
 ]
 
 
@@ -54,3 +58,19 @@ class InsufficientBalanceError(ValidationError):
 
 class InvalidSenderOrRecipient(ValidationError):
     pass
+
+
+class MempoolFullError(ValidationError):
+    pass
+
+
+class StaleBranchError(ValidationError):
+    pass
+
+
+class ForkTooDeepError(ValidationError):
+    pass
+
+
+class CodecError(ValidationError):
+    pass
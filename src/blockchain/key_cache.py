@@ -0,0 +1,112 @@
+"""
+KeyCache is a bounded cache of decoded verifying keys (segmented LRU)
+
+new keys enter the probation segment, key that is used again is promoted to the protected segment,
+keys evicted from the protected segment go back to the probation segment.
+a flood of one time addresses can only evict keys from the probation segment,
+so the keys that are used all the time (e.g: forgers and busy senders) stay in the cache
+
+promoted keys get a precomputed multiplication table, its make the verification of their signatures faster
+"""
+from collections import OrderedDict
+from threading import Lock
+from typing import Callable
+
+from ecdsa.ellipticcurve import PointJacobi  # type: ignore
+from ecdsa.keys import VerifyingKey  # type: ignore
+
+from .config import Config
+
+
+__all__ = ["KeyCache"]
+
+
+class KeyCache:
+    def __init__(
+        self,
+        max_size: int,
+        loader: Callable[[str], VerifyingKey],
+        protected_ratio: float = 0.8,
+    ):
+        """
+        :param max_size: maximum number of cached keys
+        :param loader: function that decode verifying key string to verifying key object
+        :param protected_ratio: part of the cache used for keys that used more then once
+        """
+        self.max_size = max_size
+        self.protected_size = int(max_size * protected_ratio)
+        self.loader = loader
+        self.hits = 0
+        self.misses = 0
+        self._probation: OrderedDict = OrderedDict()  # {key string: (verifying key, precomputed)}
+        self._protected: OrderedDict = OrderedDict()  # {key string: verifying key} (always precomputed)
+        self._lock = Lock()
+
+    def get(self, verifying_key_str: str) -> VerifyingKey:
+        """
+        Get decoded verifying key
+        :param verifying_key_str: verifying key string (wallet address)
+        :return: verifying key object
+        """
+        with self._lock:
+            if verifying_key_str in self._protected:
+                self._protected.move_to_end(verifying_key_str)
+                self.hits += 1
+                return self._protected[verifying_key_str]
+            if verifying_key_str in self._probation:
+                verifying_key, precomputed = self._probation.pop(verifying_key_str)
+                self.hits += 1
+                self._promote(verifying_key_str, verifying_key, precomputed)
+                return verifying_key
+            self.misses += 1
+
+        verifying_key = self.loader(verifying_key_str)
+        with self._lock:
+            self._probation[verifying_key_str] = (verifying_key, False)
+            self._evict()
+        return verifying_key
+
+    def _promote(
+        self, verifying_key_str: str, verifying_key: VerifyingKey, precomputed: bool
+    ):
+        """
+        Move key to protected segment (the least recently used protected key move back to probation)
+        """
+        if not precomputed:
+            self._precompute(verifying_key)
+        self._protected[verifying_key_str] = verifying_key
+        if len(self._protected) > self.protected_size:
+            demoted_str, demoted = self._protected.popitem(last=False)
+            self._probation[demoted_str] = (demoted, True)
+        self._evict()
+
+    def _evict(self):
+        """
+        Remove the least recently used probation keys while the cache is full
+        """
+        while self._probation and len(self._probation) + len(self._protected) > self.max_size:
+            self._probation.popitem(last=False)
+
+    @staticmethod
+    def _precompute(verifying_key: VerifyingKey):
+        """
+        Precompute the public point multiplication table
+        (the same as VerifyingKey.precompute, but keeps the curve order that is missing on decoded points)
+        """
+        point = verifying_key.pubkey.point
+        verifying_key.pubkey.point = PointJacobi(
+            Config.curve.curve, point.x(), point.y(), 1, Config.curve.order, generator=True
+        )
+
+    def clear(self):
+        with self._lock:
+            self._probation.clear()
+            self._protected.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __contains__(self, verifying_key_str: str) -> bool:
+        return verifying_key_str in self._protected or verifying_key_str in self._probation
+
+    def __len__(self) -> int:
+        return len(self._probation) + len(self._protected)
@@ -0,0 +1,245 @@
+"""
+Mempool is the pool of valid transactions waiting to be added to a block
+
+the pool keep:
+- transactions by hash
+- per sender queue ordered by tx_counter (sender transactions are added to block by tx_counter order,
+  so a transaction is never added before a transaction of the same sender with lower tx_counter)
+- max fee heap of the sender queues heads (used to choose the best transactions for a new block)
+- min fee rate heap (used to evict the cheapest transactions when the pool is full)
+
+heap entries are removed lazily, an entry is skipped if its transaction is no longer in the pool
+"""
+from bisect import bisect_left, insort
+from heapq import heappush, heappop, heapify
+from itertools import count
+from typing import Dict, Iterator, List, Optional
+
+from .config import Config
+from .exceptions import MempoolFullError, ValidationError
+from .transaction import Transaction
+
+
+__all__ = ["Mempool"]
+
+
+class _SenderQueue:
+    def __init__(self):
+        self.counters: List[int] = []  # sorted sender tx counters
+        self.transactions: Dict[int, Transaction] = {}  # {tx_counter: transaction}
+
+    @property
+    def head(self) -> Transaction:
+        return self.transactions[self.counters[0]]
+
+    def add(self, transaction: Transaction):
+        insort(self.counters, transaction.tx_counter)
+        self.transactions[transaction.tx_counter] = transaction
+
+    def remove(self, transaction: Transaction):
+        del self.counters[bisect_left(self.counters, transaction.tx_counter)]
+        del self.transactions[transaction.tx_counter]
+
+
+class Mempool:
+    def __init__(self, max_transactions: int = None, max_bytes: int = None):
+        """
+        :param max_transactions: maximum number of transactions in pool (default Config value)
+        :param max_bytes: maximum size of all the pool transactions (default Config value)
+        """
+        self.max_transactions = (
+            Config.mempool_max_transactions
+            if max_transactions is None
+            else max_transactions
+        )
+        self.max_bytes = Config.mempool_max_bytes if max_bytes is None else max_bytes
+        self.size_bytes = 0
+
+        self._transactions: Dict[str, Transaction] = {}  # {transaction hash: transaction}
+        self._senders: Dict[str, _SenderQueue] = {}  # {sender address: sender queue}
+        self._heads: list = []  # [(-fee, entry id, sender, transaction hash)]
+        self._head_entries: Dict[str, int] = {}  # {sender address: current head entry id}
+        self._cheapest: list = []  # [(fee rate, entry id, transaction hash)]
+        self._entry_ids = count()
+
+    @staticmethod
+    def transaction_size(transaction: Transaction) -> int:
+        """
+        :return: approximated transaction size in bytes
+        """
+        return len(transaction.raw) + len(transaction.signature or "")
+
+    def add(self, transaction: Transaction):
+        """
+        Add transaction to pool
+        transaction with the same sender and tx_counter of pool transaction replace it only if it pays higher fee,
+        transaction that is evicted (the pool is full) leave the pool as it was before
+        :param transaction: validated transaction object
+        :return: None
+        """
+        if transaction.hash in self._transactions:
+            return
+        queue = self._senders.get(transaction.sender)
+        replaced = None
+        if queue is not None and transaction.tx_counter in queue.transactions:
+            replaced = queue.transactions[transaction.tx_counter]
+            if transaction.fee <= replaced.fee:
+                raise ValidationError(
+                    "Transaction with the same tx_counter and same or higher fee is in the pool",
+                    tx_counter=transaction.tx_counter,
+                    fee=replaced.fee,
+                )
+            self.remove(replaced.hash)
+
+        self._insert(transaction)
+        evicted = self._evict()
+        if transaction.hash not in self._transactions:
+            # the pool fit before the transaction was added, so the evicted transactions are put back
+            for evicted_transaction in evicted:
+                if evicted_transaction is not transaction:
+                    self._insert(evicted_transaction)
+            if replaced is not None:
+                self._insert(replaced)
+            raise MempoolFullError(
+                "Transaction pool is full and the transaction fee is too low",
+                fee=transaction.fee,
+            )
+
+    def _insert(self, transaction: Transaction):
+        """
+        Add transaction to the pool indexes (without eviction)
+        """
+        queue = self._senders.get(transaction.sender)
+        if queue is None:
+            queue = self._senders[transaction.sender] = _SenderQueue()
+        self._transactions[transaction.hash] = transaction
+        queue.add(transaction)
+        size = self.transaction_size(transaction)
+        self.size_bytes += size
+        heappush(
+            self._cheapest, (transaction.fee / size, next(self._entry_ids), transaction.hash)
+        )
+        if queue.head is transaction:
+            self._push_head(transaction)
+
+    def remove(self, transaction_hash: str) -> Optional[Transaction]:
+        """
+        Remove transaction from pool (transaction that is not in the pool is ignored)
+        :param transaction_hash: transaction hash
+        :return: the removed transaction or None
+        """
+        transaction = self._transactions.pop(transaction_hash, None)
+        if transaction is None:
+            return None
+        queue = self._senders[transaction.sender]
+        was_head = queue.head is transaction
+        queue.remove(transaction)
+        self.size_bytes -= self.transaction_size(transaction)
+        if not queue.counters:
+            del self._senders[transaction.sender]
+            del self._head_entries[transaction.sender]
+        elif was_head:
+            self._push_head(queue.head)
+        self._compact()
+        return transaction
+
+    def remove_stale(self, sender: str, tx_counter: int):
+        """
+        Remove all the sender transactions that can't be added to the chain anymore
+        :param sender: sender wallet address
+        :param tx_counter: sender wallet tx_counter on the chain
+        :return: None
+        """
+        queue = self._senders.get(sender)
+        while queue is not None and queue.counters and queue.counters[0] <= tx_counter:
+            self.remove(queue.head.hash)
+            queue = self._senders.get(sender)
+
+    def best(self, count: int) -> List[Transaction]:
+        """
+        Get the best paying (with fee's) transactions, every sender transactions are ordered by tx_counter
+        :param count: number of transactions wanted
+        :return: list of transactions
+        """
+        selected: List[Transaction] = []
+        popped: list = []
+        successors: list = []  # [(-fee, entry id, sender, transaction hash, position in sender queue)]
+        while len(selected) < count:
+            self._drop_invalid_heads()
+            if self._heads and (not successors or self._heads[0] < successors[0]):
+                entry = heappop(self._heads)
+                popped.append(entry)
+                sender, transaction_hash, position = entry[2], entry[3], 0
+            elif successors:
+                _, _, sender, transaction_hash, position = heappop(successors)
+            else:
+                break
+            selected.append(self._transactions[transaction_hash])
+            queue = self._senders[sender]
+            if position + 1 < len(queue.counters):
+                successor = queue.transactions[queue.counters[position + 1]]
+                heappush(
+                    successors,
+                    (-successor.fee, next(self._entry_ids), sender, successor.hash, position + 1),
+                )
+        for entry in popped:
+            heappush(self._heads, entry)
+        return selected
+
+    def _push_head(self, transaction: Transaction):
+        entry_id = next(self._entry_ids)
+        self._head_entries[transaction.sender] = entry_id
+        heappush(self._heads, (-transaction.fee, entry_id, transaction.sender, transaction.hash))
+
+    def _drop_invalid_heads(self):
+        while self._heads and self._head_entries.get(self._heads[0][2]) != self._heads[0][1]:
+            heappop(self._heads)
+
+    def _evict(self) -> List[Transaction]:
+        """
+        Remove the lowest fee rate transactions while the pool is full
+        :return: the evicted transactions
+        """
+        evicted = []
+        while self._transactions and (
+            len(self._transactions) > self.max_transactions
+            or self.size_bytes > self.max_bytes
+        ):
+            _, _, transaction_hash = heappop(self._cheapest)
+            transaction = self.remove(transaction_hash)
+            if transaction is not None:
+                evicted.append(transaction)
+        return evicted
+
+    def _compact(self):
+        """
+        Rebuild the heaps when most of their entries were removed
+        """
+        if len(self._cheapest) > 2 * len(self._transactions) + 64:
+            self._cheapest = [
+                entry for entry in self._cheapest if entry[2] in self._transactions
+            ]
+            heapify(self._cheapest)
+        if len(self._heads) > 2 * len(self._senders) + 64:
+            self._heads = [
+                entry for entry in self._heads if self._head_entries.get(entry[2]) == entry[1]
+            ]
+            heapify(self._heads)
+
+    def copy(self) -> "Mempool":
+        mempool = Mempool(self.max_transactions, self.max_bytes)
+        for transaction in self._transactions.values():
+            mempool.add(transaction)
+        return mempool
+
+    def get(self, transaction_hash: str) -> Optional[Transaction]:
+        return self._transactions.get(transaction_hash)
+
+    def __contains__(self, transaction_hash: str) -> bool:
+        return transaction_hash in self._transactions
+
+    def __len__(self) -> int:
+        return len(self._transactions)
+
+    def __iter__(self) -> Iterator[Transaction]:
+        return iter(self._transactions.values())
@@ -6,13 +6,29 @@ after winning the forger wallet cant win again for some number of blocks
 
 The NextBlockChooser check all the candidate block and choose the block with the least penalty score
 block is added every fixed interval of seconds
+
+candidate block is prescreened and scored when it arrives (in the thread that scan it),
+the structure (index, previous hash, transactions count) and the signatures are checked before scan_block return
+(so block with invalid signature raise and isn't relayed) and candidate that can't beat the best
+validated candidate is dropped, the other candidates transactions are validated against the chain state
+in worker threads (the validation doesn't change the chain state), lower penalty first,
+so usually only the slot winner is fully validated,
+the chooser thread sleep until the slot deadline and then link the best block of the slot
+(candidates that were not validated yet and can beat the best candidate are validated by the chooser before linking),
+the slots are aligned to the wall clock (so all the nodes share them) once,
+then every deadline is the previous deadline plus the interval on the monotonic clock (clock changes are ignored),
+the time between the deadline and the chooser wake up is kept as the slot jitter metric
 """
-from threading import Thread
-from time import time
-from queue import Queue, Empty
+from concurrent.futures import ThreadPoolExecutor
+from heapq import heappush, heappop
+from itertools import count
+from threading import Thread, Condition
+from time import time, monotonic
+from typing import Dict, List, Optional, Set, Tuple
 
 from .config import Config
 from .block import Block
+from .exceptions import ValidationError
 
 
 class NextBlockChooser(Thread):
@@ -20,45 +36,194 @@ class NextBlockChooser(Thread):
         super().__init__(daemon=True)
         self.chain = chain
 
-        self.blocks_queue = Queue()
+        self._condition = Condition()  # guard the candidates, notified only to stop the chooser
+        self._executor = ThreadPoolExecutor(
+            max_workers=Config.candidate_validation_workers, thread_name_prefix="candidate-validator"
+        )
 
-        self.__current_best_block = None
-        self.__best_block_penalty = None
+        self.__current_best_block: Optional[Block] = None  # the best validated candidate
+        self.__best_block_penalty: Optional[float] = None
+        self._candidates: List[Tuple[float, int, Block]] = []  # heap of (penalty, arrival, block) to validate
+        self._validating: Dict[str, Tuple[float, int, Block]] = {}  # {block hash: candidate}
+        self._scanned: Set[str] = set()  # slot candidates hashes
+        self._arrivals = count()
+        self._slot = 0
         self.__stop = False
 
+        self.dropped_candidates = 0  # candidates that could not beat the best candidate
+        self.validated_candidates = 0
+
+        self.slots = 0  # slots that ended
+        self.missed_slots = 0  # slots that ended while the chooser was still busy with an older slot
+        self.last_jitter = 0.0  # Seconds, the last slot wake up delay
+        self.max_jitter = 0.0
+        self._jitter_sum = 0.0
+
     def scan_block(self, block: Block):
-        self.chain.validate_block(block)
-        self.blocks_queue.put(item=block)
+        """
+        Prescreen and score candidate block of the current slot, candidate that can win is validated in the background
+        the block structure and signatures are checked before returning (invalid block raise ValidationError)
+        :param block: candidate block object
+        :return: None
+        """
+        self.chain.prescreen_block(block)
+        self.chain.verify_block_signatures(block)
+        block_penalty = self.chain.block_penalty(block)
+        with self._condition:
+            if block.hash in self._scanned:
+                return
+            self._scanned.add(block.hash)
+            if not self._can_win(block_penalty):
+                self.dropped_candidates += 1
+                return
+            heappush(self._candidates, (block_penalty, next(self._arrivals), block))
+            self._validate_candidates()
 
-    def _check_block(self):
+    def _can_win(self, block_penalty: float) -> bool:
+        return self.__best_block_penalty is None or block_penalty < self.__best_block_penalty
+
+    def _validate_candidates(self):
+        """
+        Start validating the best candidates (called with the condition lock)
+        """
+        while self._candidates and len(self._validating) < Config.candidate_validation_workers:
+            candidate = heappop(self._candidates)
+            if not self._can_win(candidate[0]):
+                self.dropped_candidates += len(self._candidates) + 1
+                self._candidates = []
+                return
+            self._validating[candidate[2].hash] = candidate
+            try:
+                self._executor.submit(self._validate_candidate, self._slot, candidate)
+            except RuntimeError:
+                return  # the chooser was stopped
+
+    def _validate_candidate(self, slot: int, candidate: Tuple[float, int, Block]):
+        """
+        Validate candidate in worker thread, valid candidate become the best candidate if it's still better
+        :param slot: the candidate slot (the result is ignored if the slot ended)
+        :param candidate: (penalty, arrival, block)
+        """
+        block_penalty, _, block = candidate
+        valid = False
         try:
-            block: Block = self.blocks_queue.get(timeout=1)
-        except Empty:
-            return
-        block_penalty = self.chain.block_penalty(block)
-        if (
-            self.__best_block_penalty is None
-            or block_penalty < self.__best_block_penalty
-        ):
-            self.__current_best_block = block
-            self.__best_block_penalty = block_penalty
-
-    def _reset(self):
+            valid = self._validate(block)
+        finally:
+            with self._condition:
+                if slot == self._slot:
+                    self._validating.pop(block.hash, None)
+                    if valid and self._can_win(block_penalty):
+                        self.__current_best_block = block
+                        self.__best_block_penalty = block_penalty
+                    self._validate_candidates()
+
+    def _validate(self, block: Block) -> bool:
+        try:
+            self.chain.validate_block(block)
+        except ValidationError:
+            return False
+        with self._condition:
+            self.validated_candidates += 1
+        return True
+
+    @staticmethod
+    def first_deadline() -> float:
+        """
+        :return: monotonic time of the next slot boundary (wall clock time divisible by the interval)
+        """
+        return monotonic() + Config.new_block_interval - time() % Config.new_block_interval
+
+    def _next_deadline(self, deadline: float) -> float:
+        """
+        :param deadline: the slot deadline that passed
+        :return: the next slot deadline (slots that already passed are counted as missed)
+        """
+        deadline += Config.new_block_interval
+        now = monotonic()
+        while deadline <= now:
+            deadline += Config.new_block_interval
+            self.missed_slots += 1
+        return deadline
+
+    def _record_jitter(self, jitter: float):
+        self.slots += 1
+        self.last_jitter = jitter
+        self.max_jitter = max(self.max_jitter, jitter)
+        self._jitter_sum += jitter
+
+    def _end_slot(self) -> Tuple[Optional[Block], List[Tuple[float, int, Block]]]:
+        """
+        Start new slot (called with the condition lock)
+        :return: the best validated block and the candidates that were not validated yet
+        """
+        best_block = self.__current_best_block
+        not_validated = [*self._candidates, *self._validating.values()]
+        if self.__best_block_penalty is not None:
+            not_validated = [c for c in not_validated if c[0] < self.__best_block_penalty]
         self.__current_best_block = None
         self.__best_block_penalty = None
+        self._candidates = []
+        self._validating = {}
+        self._scanned = set()
+        self._slot += 1
+        return best_block, sorted(not_validated)
 
-    def _add_new_block(self):
-        if self.__current_best_block is not None:
-            self.chain.link_new_block(
-                self.__current_best_block, _i_know_what_i_doing=True
-            )
-        self._reset()
+    def _choose(self, best_block: Optional[Block], not_validated: List[Tuple[float, int, Block]]) -> Optional[Block]:
+        """
+        :param best_block: the best validated block of the slot
+        :param not_validated: candidates with lower penalty that were not validated yet (sorted by penalty)
+        :return: the slot winner
+        """
+        for _, _, block in not_validated:
+            if self._validate(block):
+                return block
+        return best_block
+
+    def _add_new_block(self, block: Optional[Block]):
+        """
+        Link the slot winner (the block is validated again against the current chain before it's linked)
+        """
+        if block is None:
+            return
+        try:
+            self.chain.link_new_block(block, _i_know_what_i_doing=True)
+        except ValidationError as e:
+            print("The slot block is no longer valid", e)
+
+    def _wait_for(self, deadline: float) -> bool:
+        """
+        Sleep until the deadline (woken up early only to stop)
+        :return: False if the chooser was stopped
+        """
+        with self._condition:
+            remaining = deadline - monotonic()
+            while not self.__stop and remaining > 0:
+                self._condition.wait(remaining)
+                remaining = deadline - monotonic()
+            return not self.__stop
 
     def run(self):
-        while not self.__stop:
-            self._check_block()
-            if int(time()) % Config.new_block_interval == 0:
-                self._add_new_block()
+        deadline = self.first_deadline()
+        while self._wait_for(deadline):
+            self._record_jitter(monotonic() - deadline)
+            with self._condition:
+                best_block, not_validated = self._end_slot()
+            self._add_new_block(self._choose(best_block, not_validated))
+            deadline = self._next_deadline(deadline)
+
+    def metrics(self) -> Dict[str, float]:
+        return {
+            "slots": self.slots,
+            "missed_slots": self.missed_slots,
+            "last_jitter": self.last_jitter,
+            "max_jitter": self.max_jitter,
+            "mean_jitter": self._jitter_sum / self.slots if self.slots else 0.0,
+            "dropped_candidates": self.dropped_candidates,
+            "validated_candidates": self.validated_candidates,
+        }
 
     def stop(self):
-        self.__stop = True
+        with self._condition:
+            self.__stop = True
+            self._condition.notify_all()
+        self._executor.shutdown(wait=False)
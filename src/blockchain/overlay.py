@@ -0,0 +1,252 @@
+"""
+Copy-on-write overlays of the chain state, used by chain branches (see Chain.branch)
+
+every overlay read from its parent container and keep its changes in a local journal:
+- WalletsOverlay (copy of the wallet is made the first time the branch access it)
+- BlocksOverlay (new blocks are appended to local list)
+- AddressIndexOverlay (new addresses are kept in local list)
+- MempoolOverlay (pool changes are recorded and replayed on commit)
+
+commit apply the journal to the parent (proportional to the number of changes),
+discarding the overlay leave the parent untouched
+"""
+from collections.abc import MutableMapping, Sequence
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from .chain_wallet import ChainWallet
+from .consensus import AddressIndex
+from .exceptions import StaleBranchError, ValidationError
+
+
+__all__ = ["WalletsOverlay", "BlocksOverlay", "AddressIndexOverlay", "MempoolOverlay"]
+
+
+class WalletsOverlay(MutableMapping):
+    def __init__(self, parent):
+        """
+        :param parent: parent wallets mapping {chain wallet address: chain wallet object}
+        """
+        self._parent = parent
+        self._local: Dict[str, ChainWallet] = {}  # touched and new wallets
+        self._new_count = 0
+
+    def __getitem__(self, address: str) -> ChainWallet:
+        if address not in self._local:
+            self._local[address] = self._parent[address].copy()
+        return self._local[address]
+
+    def __setitem__(self, address: str, wallet: ChainWallet):
+        if address not in self._local and address not in self._parent:
+            self._new_count += 1
+        self._local[address] = wallet
+
+    def __delitem__(self, address: str):
+        raise TypeError("Chain wallets can't be removed")
+
+    def __contains__(self, address) -> bool:
+        return address in self._local or address in self._parent
+
+    def __iter__(self) -> Iterator[str]:
+        yield from self._parent
+        for address in self._local:
+            if address not in self._parent:
+                yield address
+
+    def __len__(self) -> int:
+        return len(self._parent) + self._new_count
+
+    def _peek(self, address: str) -> ChainWallet:
+        """
+        :return: wallet without copying it (read only access)
+        """
+        wallet = self._local.get(address)
+        if wallet is None:
+            parent = self._parent
+            wallet = parent._peek(address) if isinstance(parent, WalletsOverlay) else parent[address]
+        return wallet
+
+    def values(self) -> Iterator[ChainWallet]:  # type: ignore
+        return (self._peek(address) for address in self)
+
+    def items(self) -> Iterator[Tuple[str, ChainWallet]]:  # type: ignore
+        return ((address, self._peek(address)) for address in self)
+
+    def commit(self):
+        """
+        Apply the touched wallets to the parent
+        """
+        for address, wallet in self._local.items():
+            if address in self._parent:
+                parent_wallet = self._parent[address]
+                parent_wallet.balance = wallet.balance
+                parent_wallet.tx_counter = wallet.tx_counter
+            else:
+                self._parent[address] = wallet
+        self._local = {}
+        self._new_count = 0
+
+
+class BlocksOverlay(Sequence):
+    def __init__(self, parent):
+        """
+        :param parent: parent blocks sequence
+        """
+        self._parent = parent
+        self._base_length = len(parent)
+        self._base_tip = parent[-1] if self._base_length else None
+        self._dropped = 0  # blocks removed from the beginning (pruned chain)
+        self._local: list = []
+
+    def __len__(self) -> int:
+        return self._base_length - self._dropped + len(self._local)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("block index out of range")
+        parent_length = self._base_length - self._dropped
+        if i < parent_length:
+            return self._parent[i + self._dropped]
+        return self._local[i - parent_length]
+
+    def append(self, block):
+        self._local.append(block)
+
+    def pop(self, i: int = -1):
+        if i != 0:
+            raise TypeError("Only the first block can be removed from branch")
+        block = self[0]
+        if self._dropped < self._base_length:
+            self._dropped += 1
+        else:
+            self._local.pop(0)
+        return block
+
+    def check_base(self):
+        """
+        Raise error if blocks were added to the parent after the branch was created
+        """
+        tip = self._parent[-1] if len(self._parent) else None
+        if len(self._parent) != self._base_length or tip is not self._base_tip:
+            raise StaleBranchError(
+                "Parent chain was changed after the branch was created",
+                branch_base_length=self._base_length,
+                parent_length=len(self._parent),
+            )
+
+    def commit(self):
+        """
+        Apply the new blocks to the parent
+        """
+        self.check_base()
+        for _ in range(self._dropped):
+            self._parent.pop(0)
+        for block in self._local:
+            self._parent.append(block)
+        self._base_length = len(self._parent)
+        self._base_tip = self._parent[-1] if self._base_length else None
+        self._dropped = 0
+        self._local = []
+
+
+class AddressIndexOverlay(AddressIndex):
+    def __init__(self, parent: AddressIndex):
+        """
+        :param parent: parent address index
+        """
+        super().__init__()
+        self._parent = parent
+        self._added: List[str] = []
+        self._merged: Optional[AddressIndex] = None
+
+    @property
+    def version(self) -> int:
+        return self._parent.version + len(self._added)
+
+    def _view(self) -> AddressIndex:
+        """
+        :return: the parent index if no address was added else merged copy (created once)
+        """
+        if not self._added:
+            return self._parent
+        if self._merged is None:
+            self._merged = self._parent.copy()
+            for address in self._added:
+                self._merged.add(address)
+        return self._merged
+
+    def add(self, address: str):
+        if address in self._parent or address in self._added:
+            return
+        self._added.append(address)
+        if self._merged is not None:
+            self._merged.add(address)
+
+    def rank(self, address: str) -> int:
+        return self._view().rank(address)
+
+    def address(self, rank: int) -> str:
+        return self._view().address(rank)
+
+    def copy(self) -> AddressIndex:
+        return self._view().copy()
+
+    def __getitem__(self, rank):
+        return self._view()[rank]
+
+    def __len__(self) -> int:
+        return len(self._parent) + len(self._added)
+
+    def __contains__(self, address) -> bool:
+        return address in self._added or address in self._parent
+
+    def commit(self):
+        """
+        Add the new addresses to the parent
+        """
+        for address in self._added:
+            self._parent.add(address)
+        self._added = []
+        self._merged = None
+
+
+class MempoolOverlay:
+    def __init__(self, parent):
+        """
+        :param parent: parent mempool
+        the branch see the parent pool, changes are recorded and applied to the parent on commit
+        """
+        self._parent = parent
+        self._journal: list = []  # [(method name, arguments)]
+
+    def add(self, transaction):
+        self._journal.append(("add", (transaction,)))
+
+    def remove_stale(self, sender: str, tx_counter: int):
+        self._journal.append(("remove_stale", (sender, tx_counter)))
+
+    def best(self, count: int) -> list:
+        return self._parent.best(count)
+
+    def get(self, transaction_hash: str):
+        return self._parent.get(transaction_hash)
+
+    def __contains__(self, transaction_hash: str) -> bool:
+        return transaction_hash in self._parent
+
+    def __len__(self) -> int:
+        return len(self._parent)
+
+    def commit(self):
+        """
+        Replay the recorded changes on the parent
+        """
+        for method, arguments in self._journal:
+            try:
+                getattr(self._parent, method)(*arguments)
+            except ValidationError:
+                pass  # transaction is no longer valid for the parent pool
+        self._journal = []
@@ -0,0 +1,79 @@
+"""
+SignatureCache is a bounded LRU cache of verified signatures
+
+the same signature is verified when the transaction enter the transaction pool,
+when the candidate block is scanned and again when the winning block is linked,
+the cache keep the verified (hash, signature, verifying key) triplets so the signature is verified only once
+
+only valid signatures are cached, invalid signatures are verified every time
+"""
+from collections import OrderedDict
+from threading import Lock
+
+from .config import Config
+from .verifier import Verifier
+
+
+__all__ = ["SignatureCache", "signature_cache"]
+
+
+class SignatureCache:
+    def __init__(self, max_size: int):
+        """
+        :param max_size: maximum number of cached signatures
+        """
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._cache: OrderedDict = OrderedDict()
+        self._lock = Lock()
+
+    def lookup(self, verifying_key: str, signature: str, hash_str: str) -> bool:
+        """
+        Check if the signature was already verified
+        :return: True if the signature is cached
+        """
+        key = (hash_str, signature, verifying_key)
+        with self._lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return True
+            self.misses += 1
+            return False
+
+    def add(self, verifying_key: str, signature: str, hash_str: str):
+        """
+        Add verified signature to cache (remove the least recently used signature if the cache is full)
+        :return: None
+        """
+        key = (hash_str, signature, verifying_key)
+        with self._lock:
+            self._cache[key] = True
+            self._cache.move_to_end(key)
+            if len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+
+    def is_verified(self, verifying_key: str, signature: str, hash_str: str) -> bool:
+        """
+        Verify signature, cached signatures are not verified again
+        :return: True for verified signature and False for unverified signature
+        """
+        if self.lookup(verifying_key, signature, hash_str):
+            return True
+        verified = Verifier.is_verified(verifying_key, signature, hash_str)
+        if verified:
+            self.add(verifying_key, signature, hash_str)
+        return verified
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+
+signature_cache = SignatureCache(Config.signature_cache_size)
@@ -1,10 +1,14 @@
 """
 Signed is interface for signed objects on the chain (e.g: block, transaction)
+signed objects are immutable, add_signature returns new signed object
 """
 from abc import ABC, abstractmethod
 
 
 class Signed(ABC):
+    __slots__ = ()
+    signature: str  # None for unsigned object
+
     @property
     @abstractmethod
     def verifying_key(self) -> str:
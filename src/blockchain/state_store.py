@@ -0,0 +1,209 @@
+"""
+StateStore is persistent (sqlite) store of the chain state, used to restart node without replaying the chain
+
+the store contain:
+- chain wallets (balance and tx counter by address, ordered by wallet creation like the chain wallets dict)
+- chain tip (height, last block, epoch random and the chain cumulative penalty)
+- snapshots taken when the lottery sum tree is built (every epoch),
+  snapshot contain all the wallets at that height (the sum tree inputs), the epoch random and the penalty
+
+the state is updated in one transaction for every linked block, so the stored state always match a chain height
+"""
+import json
+import sqlite3
+from threading import Lock
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+
+from .chain_wallet import ChainWallet
+from .config import Config
+
+
+__all__ = ["StateStore", "StoredState"]
+
+
+WalletRow = Tuple[str, float, int]  # address, balance, tx counter
+
+
+class StoredState(NamedTuple):
+    height: int
+    tip: dict  # last block dict
+    epoch_random: float
+    penalty: float  # the chain cumulative penalty (fork choice)
+    wallets: List[ChainWallet]  # ordered by creation
+    sum_tree_wallets: List[ChainWallet]  # wallets of the last epoch sum tree
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS wallets (address TEXT PRIMARY KEY, balance, tx_counter INTEGER);
+CREATE TABLE IF NOT EXISTS tip (
+    id INTEGER PRIMARY KEY CHECK (id = 0), height INTEGER, block TEXT, epoch_random REAL, penalty REAL DEFAULT 0
+);
+CREATE TABLE IF NOT EXISTS snapshots (height INTEGER PRIMARY KEY, block TEXT, epoch_random REAL, penalty REAL DEFAULT 0);
+CREATE TABLE IF NOT EXISTS snapshot_wallets (
+    height INTEGER, position INTEGER, address TEXT, balance, tx_counter INTEGER, PRIMARY KEY (height, position)
+);
+"""  # balance column has no type so int and float balances are loaded with the same type
+ADDED_COLUMNS = [("tip", "penalty REAL DEFAULT 0"), ("snapshots", "penalty REAL DEFAULT 0")]  # stores of older nodes
+
+
+def _wallets(rows: Iterable[WalletRow]) -> List[ChainWallet]:
+    return [ChainWallet(address, balance, tx_counter) for address, balance, tx_counter in rows]
+
+
+class StateStore:
+    def __init__(self, path: str, snapshots_kept: int = None):
+        """
+        :param path: database file path
+        :param snapshots_kept: number of last snapshots kept (default Config value)
+        """
+        self.path = path
+        self.snapshots_kept = (
+            Config.state_snapshots_kept if snapshots_kept is None else snapshots_kept
+        )
+        self._lock = Lock()
+        # the chain link blocks from the block chooser thread, access is serialized with the lock
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.executescript(SCHEMA)
+        self._add_columns()
+
+    def _add_columns(self):
+        """
+        Add the columns that are missing in store created by older version
+        """
+        with self._connection as connection:
+            for table, column in ADDED_COLUMNS:
+                columns = [row[1] for row in connection.execute(f"PRAGMA table_info({table})")]
+                if column.split()[0] not in columns:
+                    connection.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+
+    def save(
+        self,
+        tip: dict,
+        epoch_random: float,
+        penalty: float,
+        wallets: Iterable[ChainWallet],
+        snapshot: Optional[Tuple[dict, float, float, List[WalletRow]]] = None,
+        removed_wallets: Iterable[str] = (),
+    ):
+        """
+        Save the chain state changes in one transaction
+        :param tip: last block dict
+        :param epoch_random: current epoch random
+        :param penalty: the chain cumulative penalty
+        :param wallets: new and changed wallets (new wallets ordered by creation)
+        :param snapshot: snapshot taken when the sum tree was built (block dict, epoch random, penalty, wallets rows)
+        :param removed_wallets: addresses of wallets that were created by rolled back blocks
+        :return: None
+        """
+        rows = [(wallet.balance, wallet.tx_counter, wallet.address) for wallet in wallets]
+        with self._lock, self._connection as connection:
+            connection.executemany("DELETE FROM wallets WHERE address = ?", ((a,) for a in removed_wallets))
+            # update then insert the new wallets (upsert syntax needs newer sqlite than the python 3.6 builds)
+            connection.executemany("UPDATE wallets SET balance = ?, tx_counter = ? WHERE address = ?", rows)
+            connection.executemany(
+                "INSERT OR IGNORE INTO wallets (balance, tx_counter, address) VALUES (?, ?, ?)", rows
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO tip (id, height, block, epoch_random, penalty) VALUES (0, ?, ?, ?, ?)",
+                (tip["index"], json.dumps(tip), epoch_random, penalty),
+            )
+            if snapshot is not None:
+                self._save_snapshot(connection, *snapshot)
+
+    def _save_snapshot(self, connection, block: dict, epoch_random: float, penalty: float, rows: List[WalletRow]):
+        height = block["index"]
+        connection.execute("DELETE FROM snapshot_wallets WHERE height = ?", (height,))
+        connection.execute(
+            "INSERT OR REPLACE INTO snapshots (height, block, epoch_random, penalty) VALUES (?, ?, ?, ?)",
+            (height, json.dumps(block), epoch_random, penalty),
+        )
+        connection.executemany(
+            "INSERT INTO snapshot_wallets (height, position, address, balance, tx_counter) VALUES (?, ?, ?, ?, ?)",
+            ((height, position, *row) for position, row in enumerate(rows)),
+        )
+        old_heights = connection.execute(
+            "SELECT height FROM snapshots ORDER BY height DESC LIMIT -1 OFFSET ?",
+            (self.snapshots_kept,),
+        ).fetchall()
+        connection.executemany("DELETE FROM snapshots WHERE height = ?", old_heights)
+        connection.executemany("DELETE FROM snapshot_wallets WHERE height = ?", old_heights)
+
+    def _snapshot_wallets(self, height: int) -> List[ChainWallet]:
+        return _wallets(
+            self._connection.execute(
+                "SELECT address, balance, tx_counter FROM snapshot_wallets WHERE height = ? ORDER BY position",
+                (height,),
+            )
+        )
+
+    def load(self) -> Optional[StoredState]:
+        """
+        :return: the last saved state (None if nothing was saved)
+        """
+        with self._lock:
+            tip = self._connection.execute("SELECT height, block, epoch_random, penalty FROM tip").fetchone()
+            if tip is None:
+                return None
+            height, block, epoch_random, penalty = tip
+            snapshot = self._connection.execute(
+                "SELECT MAX(height) FROM snapshots WHERE height <= ?", (height,)
+            ).fetchone()[0]
+            if snapshot is None:
+                return None
+            wallets = _wallets(
+                self._connection.execute(
+                    "SELECT address, balance, tx_counter FROM wallets ORDER BY rowid"
+                )
+            )
+            return StoredState(
+                height, json.loads(block), epoch_random, penalty, wallets, self._snapshot_wallets(snapshot)
+            )
+
+    def load_snapshot(self, max_height: int) -> Optional[StoredState]:
+        """
+        :param max_height: maximum snapshot height
+        :return: the last snapshot state with height lower or equal to max_height (None if there is no such snapshot)
+        """
+        with self._lock:
+            snapshot = self._connection.execute(
+                "SELECT height, block, epoch_random, penalty FROM snapshots WHERE height <= ? "
+                "ORDER BY height DESC LIMIT 1",
+                (max_height,),
+            ).fetchone()
+            if snapshot is None:
+                return None
+            height, block, epoch_random, penalty = snapshot
+            wallets = self._snapshot_wallets(height)
+            return StoredState(height, json.loads(block), epoch_random, penalty, wallets, wallets)
+
+    def reset(self, state: StoredState):
+        """
+        Replace the stored wallets and tip with the given state (used after restoring older snapshot)
+        :param state: restored state
+        :return: None
+        """
+        self._delete(after_height=state.height)
+        self.save(state.tip, state.epoch_random, state.penalty, state.wallets)
+
+    def clear(self):
+        """
+        Delete all the stored state
+        :return: None
+        """
+        self._delete(after_height=-1)
+
+    def _delete(self, after_height: int):
+        """
+        Delete the wallets, the tip and the snapshots taken after the given height
+        """
+        with self._lock, self._connection as connection:
+            connection.execute("DELETE FROM wallets")
+            connection.execute("DELETE FROM tip")
+            connection.execute("DELETE FROM snapshots WHERE height > ?", (after_height,))
+            connection.execute("DELETE FROM snapshot_wallets WHERE height > ?", (after_height,))
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
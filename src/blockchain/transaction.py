@@ -8,14 +8,35 @@ amount (amount of coins to send)
 fee (coins to transfer to the block forger, more fee result faster transaction processing) minimum value is required
 tx_counter (number of transactions the sender wallet has made in the past)
 signature (signature on the transaction data created with the sender private key)
+
+transaction object is immutable, the raw bytes and the hash are computed once and cached
 """
 from hashlib import sha256
+from typing import Optional
 
 from .signed import Signed
-from .verifier import Verifier
+from .signature_cache import signature_cache
 
 
 class Transaction(Signed):
+    __slots__ = (
+        "sender",
+        "recipient",
+        "amount",
+        "fee",
+        "tx_counter",
+        "signature",
+        "_raw",
+        "_hash",
+    )
+    sender: str
+    recipient: str
+    amount: float
+    fee: float
+    tx_counter: int
+    _raw: Optional[bytes]
+    _hash: Optional[str]
+
     def __init__(
         self,
         sender: str,
@@ -23,18 +44,47 @@ class Transaction(Signed):
         amount: float,
         fee: float,
         tx_counter: int,
-        signature: str = None,
+        signature: Optional[str] = None,
     ):
-        self.sender = sender
-        self.recipient = recipient
-        self.amount = amount
-        self.fee = fee
-        self.tx_counter = tx_counter
+        object.__setattr__(self, "sender", sender)
+        object.__setattr__(self, "recipient", recipient)
+        object.__setattr__(self, "amount", amount)
+        object.__setattr__(self, "fee", fee)
+        object.__setattr__(self, "tx_counter", tx_counter)
+
+        object.__setattr__(self, "signature", signature)
+        object.__setattr__(self, "_raw", None)
+        object.__setattr__(self, "_hash", None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{self.__class__.__name__} object is immutable")
 
-        self.signature = signature
+    def __reduce__(self):
+        return self.__class__, (
+            self.sender,
+            self.recipient,
+            self.amount,
+            self.fee,
+            self.tx_counter,
+            self.signature,
+        )
+
+    def add_signature(self, signature: str) -> "Transaction":
+        """
+        :return: new transaction object with the signature (the cached hash is reused)
+        """
+        transaction = self.replace(signature=signature)
+        object.__setattr__(transaction, "_raw", self._raw)
+        object.__setattr__(transaction, "_hash", self._hash)
+        return transaction
 
-    def add_signature(self, signature):
-        self.signature = signature
+    def replace(self, **changes) -> "Transaction":
+        """
+        :return: new transaction object with the changed fields
+        """
+        fields = self.to_dict()
+        fields.update(changes)
+        return self.__class__(**fields)
 
     @property
     def verifying_key(self) -> str:
@@ -46,7 +96,22 @@ class Transaction(Signed):
 
     @property
     def hash(self) -> str:
-        return sha256(self._raw_transaction().encode()).hexdigest()
+        hash_value = self._hash
+        if hash_value is None:
+            hash_value = sha256(self.raw).hexdigest()
+            object.__setattr__(self, "_hash", hash_value)
+        return hash_value
+
+    @property
+    def raw(self) -> bytes:
+        """
+        :return: canonical bytes encoding of the transaction core data (used for the hash)
+        """
+        raw = self._raw
+        if raw is None:
+            raw = self._raw_transaction().encode()
+            object.__setattr__(self, "_raw", raw)
+        return raw
 
     def _raw_transaction(self) -> str:
         return (
@@ -54,7 +119,7 @@ class Transaction(Signed):
         )
 
     def signature_verified(self) -> bool:
-        return self.is_signed and Verifier.is_verified(
+        return self.is_signed and signature_cache.is_verified(
             self.verifying_key, self.signature, self.hash  # type: ignore
         )
 
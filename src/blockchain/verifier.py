@@ -1,5 +1,7 @@
 """
 Helper class helping to validate signature's of objects that inherit from Signed (signed.py)
+
+decoded verifying keys are kept in a key cache (key_cache.py)
 """
 
 from base64 import b64decode
@@ -7,14 +9,19 @@ from base64 import b64decode
 from ecdsa.keys import VerifyingKey, BadSignatureError  # type: ignore
 
 from .config import Config
+from .key_cache import KeyCache
 
 
 class Verifier:
     @staticmethod
-    def is_verified(verifying_key_str: str, signature: str, hash_str: str) -> bool:
-        verifying_key = VerifyingKey.from_string(
+    def decode_verifying_key(verifying_key_str: str) -> VerifyingKey:
+        return VerifyingKey.from_string(
             b64decode(verifying_key_str), curve=Config.curve, hashfunc=Config.hashfunc
         )
+
+    @staticmethod
+    def is_verified(verifying_key_str: str, signature: str, hash_str: str) -> bool:
+        verifying_key = key_cache.get(verifying_key_str)
         try:
             verifying_key.verify(
                 b64decode(signature), hash_str.encode(), hashfunc=Config.hashfunc
@@ -23,3 +30,8 @@ class Verifier:
             return False
         else:
             return True
+
+
+key_cache = KeyCache(
+    Config.verifying_key_cache_size, loader=Verifier.decode_verifying_key
+)
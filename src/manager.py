@@ -2,25 +2,44 @@ import os
 from time import sleep
 
 from blockchain import Chain, Config, Actor
-from netp2p import Node, messages
+from netp2p import Node
+
+NODE_STOP_TIMEOUT = 10  # Seconds, the chain is closed even if the node didn't stop
 
 
 class Manager:
     def __init__(self, port: int = 1875) -> None:
-        self.blockchain = Chain()
+        Config.signature_verification_workers = int(
+            os.getenv("SIGNATURE_VERIFICATION_WORKERS", os.cpu_count() or 0)
+        )
+        self.blockchain = Chain(
+            data_dir=os.getenv(
+                "DATA_DIR", os.path.join(os.path.expanduser("~"), ".yoyocoin", str(port))
+            )
+        )
         self.actor = Actor(
             os.getenv("WALLET_SECRET_KEY", f"test-{port}"), blockchain=self.blockchain
         )
         self.node = Node(self.blockchain, os.getenv("PORT", port))
 
     def run(self):
-        if self.blockchain.is_empty():
-            self.node.load_history(from_index=0)
+        self.node.load_history(from_index=self.blockchain.height() + 1)
 
         self.node.start()
-        while True:
-            sleep(Config.new_block_interval)
+        try:
+            while True:
+                sleep(Config.new_block_interval)
+
+                block = self.actor.forge_block()
+                self.blockchain.add_block(block)
+                self.node.broadcast_block(block)
+        finally:
+            self.close()
 
-            block = self.actor.forge_block()
-            self.blockchain.add_block(block.to_dict())
-            self.node.broadcast(messages.NewBlock(block.to_dict()))
+    def close(self):
+        """
+        Stop the node and write the blocks that were not flushed and the chain state to disk
+        """
+        self.node.stop()
+        self.node.join(timeout=NODE_STOP_TIMEOUT)
+        self.blockchain.close()
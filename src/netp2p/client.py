@@ -1,51 +1,92 @@
-from typing import Tuple, Union
-from threading import Thread
-from socket import socket
+import asyncio
+from concurrent.futures import Executor
+from typing import Optional, Tuple
 
 from .processor import Processor
 from .messages.message import Message
-from .config import MESSAGE_DELIMITER, CLIENT_RECV_BATCH
+from blockchain.exceptions import BlockChainError
 
+from .frame import FrameError
+from .session import Session
 
-class Client(Thread):
+
+class Client:
     def __init__(
         self,
         addr: Tuple[str, int],
         initial_message: Message,
         processor: Processor,
         server_port: int,
+        executor: Optional[Executor] = None,
     ) -> None:
+        """
+        Outbound connection, run as task on the node event loop
+        the connection stays open after the initial message (relayed messages and requests in both directions)
+        :param addr: peer address
+        :param initial_message: message sent when connected (request or peer info)
+        :param processor: messages processor (called in the executor)
+        :param server_port: the node server port
+        :param executor: executor of the messages processing (None for the loop default executor)
+        """
         self.server_port = server_port
         self.addr = addr
         self.initial_msg = initial_message
-        self.sock: Union[socket, None] = None
-        self.__stop = False
         self.processor = processor
+        self.executor = executor
+        self.session: Optional[Session] = None
+        self.task: Optional[asyncio.Task] = None
+        self._connected: Optional[asyncio.Future] = None  # result is the session (None if connecting failed)
+
+    def start(self) -> asyncio.Task:
+        """
+        Start the client task (must be called from the event loop)
+        """
+        self._connected = asyncio.get_event_loop().create_future()
+        self.task = asyncio.ensure_future(self.run())
+        return self.task
 
-        super().__init__(name=f"client to {addr}", daemon=True)
+    def is_alive(self) -> bool:
+        """
+        :return: False when the connection is closed (client waiting to be started is alive)
+        """
+        return self.task is None or not self.task.done()
 
-    def connect(self):
-        self.sock = socket()
-        self.sock.connect(self.addr)
+    async def connected(self) -> Session:
+        """
+        Wait until the client is connected (the client must be started)
+        :return: the peer session
+        :raise ConnectionError: if the client couldn't connect or the connection is closed
+        """
+        session = await asyncio.shield(self._connected)  # type: ignore
+        if session is None or session.closed:
+            raise ConnectionError(f"not connected to {self.addr}")
+        return session
 
-    def run(self) -> None:
+    async def run(self) -> None:
         try:
-            self.connect()
-        except ConnectionError:
+            reader, writer = await asyncio.open_connection(*self.addr)
+        except OSError:
             print(f"ERROR when connecting to {self.addr}")
+            self._set_connected(None)
             return
-        self.sock.send(self.initial_msg.to_bytes())  # type: ignore
-        while True:
-            msg_batch = self.sock.recv(CLIENT_RECV_BATCH)  # type: ignore
-            if msg_batch == b"" or self.__stop:
-                break
-            messages = msg_batch.split(MESSAGE_DELIMITER)
-            for msg in messages:
-                if not msg:
-                    continue
-                self.processor.process(msg)
+        self.session = Session(reader, writer, self.processor, self.executor)
+        self.session.send([self.initial_msg])
+        self._set_connected(self.session)
+        try:
+            await self.session.run()
+        except FrameError as e:
+            print(f"invalid frame from {self.addr}: {e}")
+        except BlockChainError as e:
+            print(f"invalid message from {self.addr}: {e}")
+        except ConnectionError:
+            pass
         print(f"closing connection with {self.addr}")
 
+    def _set_connected(self, session: Optional[Session]):
+        if self._connected is not None and not self._connected.done():
+            self._connected.set_result(session)
+
     def stop(self):
-        self.__stop = True
-        self.sock.settimeout(1)
+        if self.task is not None:
+            self.task.cancel()
+        self._set_connected(None)
@@ -0,0 +1,82 @@
+"""
+Compact block relay
+
+new block is relayed as the block header and short ids of its transactions (CompactBlock message),
+the peers already received most of the transactions (NewTransaction gossip) and rebuild the block from their mempool,
+missing transactions are requested from the peer that sent the compact block (GetBlockTransactions),
+the peer reply with the transactions (BlockTransactions) and the block is completed
+
+short id is keyed hash (6 bytes) of the transaction hash, the key is random nonce of the compact block message
+so short ids collisions can't be prepared in advance,
+the rebuilt block is accepted only if its hash is the compact block hash (collision is resolved by requesting
+all the block transactions)
+
+CompactBlocks keep the recent full blocks (to serve the missing transactions requests)
+and the compact blocks that wait for missing transactions
+"""
+from collections import OrderedDict
+from hashlib import blake2b
+from threading import Lock
+from typing import List, Optional, Tuple
+
+from blockchain.block import Block
+from blockchain.transaction import Transaction
+
+from .config import COMPACT_BLOCKS_KEPT
+
+__all__ = ["short_id", "CompactBlocks", "SHORT_ID_SIZE", "NONCE_SIZE"]
+
+SHORT_ID_SIZE = 6
+NONCE_SIZE = 8
+
+
+def short_id(nonce: bytes, transaction_hash: str) -> bytes:
+    """
+    :param nonce: compact block nonce
+    :param transaction_hash: transaction hash (hex digest)
+    :return: transaction short id
+    """
+    return blake2b(bytes.fromhex(transaction_hash), key=nonce, digest_size=SHORT_ID_SIZE).digest()
+
+
+class CompactBlocks:
+    def __init__(self, max_blocks: int = COMPACT_BLOCKS_KEPT):
+        """
+        :param max_blocks: number of recent blocks (and of pending compact blocks) that are kept
+        """
+        self.max_blocks = max_blocks
+        self._blocks: OrderedDict = OrderedDict()  # {block hash: block}
+        self._pending: OrderedDict = OrderedDict()  # {block hash: (compact block, transactions with None for missing)}
+        self._lock = Lock()
+
+    def add_block(self, block: Block):
+        """
+        Keep full block to serve its transactions
+        """
+        with self._lock:
+            self._blocks[block.hash] = block
+            self._blocks.move_to_end(block.hash)
+            if len(self._blocks) > self.max_blocks:
+                self._blocks.popitem(last=False)
+
+    def get_block(self, block_hash: str) -> Optional[Block]:
+        with self._lock:
+            return self._blocks.get(block_hash)
+
+    def add_pending(self, compact_block, transactions: List[Optional[Transaction]]):
+        """
+        Keep compact block until the missing transactions are received
+        :param compact_block: CompactBlock message
+        :param transactions: the block transactions that were found (None for missing transaction)
+        """
+        with self._lock:
+            self._pending[compact_block.block_hash] = (compact_block, transactions)
+            if len(self._pending) > self.max_blocks:
+                self._pending.popitem(last=False)
+
+    def pop_pending(self, block_hash: str) -> Optional[Tuple]:
+        """
+        :return: (compact block, transactions) that wait for missing transactions (None if there is no such block)
+        """
+        with self._lock:
+            return self._pending.pop(block_hash, None)
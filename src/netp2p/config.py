@@ -1,14 +1,41 @@
 from pathlib import Path
 
+from blockchain.codec import CODEC_BINARY, CODEC_JSON
 
-HEARTBEAT_RATE = 1  # Seconds
 
-CONNECT_EVERY_X_HEARBEATS = 10
-BROADCAST_ADDR_EVERY_X_HEARTBEATS = 20
+RELAY_FLUSH_INTERVAL = 0.005  # Seconds, messages that arrive while sending are coalesced to the next send
+
+CONNECT_INTERVAL = 10  # Seconds
+BROADCAST_ADDR_INTERVAL = 20  # Seconds
 
 ROOT = Path(__file__).parent.parent
 BOOTSTRAP_LIST = str(ROOT / "config" / "bootstrap.list")
 
-CLIENT_RECV_BATCH = 50000
-SERVER_RECV_BATCH = 2048
-MESSAGE_DELIMITER = b"%99"
+MAX_FRAME_SIZE = 32 * 1024 * 1024  # Bytes
+READ_BUFFER_SIZE = 64 * 1024  # Bytes
+DROP = "drop"
+DISCONNECT = "disconnect"
+PEER_QUEUE_MAX_BYTES = 4 * 1024 * 1024  # Bytes waiting to be sent to peer
+PEER_OVERFLOW_POLICY = DROP  # DROP new messages or DISCONNECT the peer when its queue is full
+PEER_STALL_TIMEOUT = 30  # Seconds, peer that didn't read pending messages is disconnected
+SEEN_CACHE_SIZE = 100000  # gossip messages remembered to drop duplicates
+SEEN_CACHE_TTL = 600  # Seconds, message is forgotten when it wasn't seen for ttl seconds
+SEEN_CACHE_FALSE_POSITIVE_RATE = 0.01  # seen cache bloom filter false positive rate
+COMPACT_BLOCK_RELAY = True  # relay new blocks as header and transactions short ids
+COMPACT_BLOCKS_KEPT = 64  # recent blocks kept to serve the missing transactions of compact blocks
+MAX_TRANSACTIONS_PER_BATCH = 1024  # transactions relayed together in one NewTransactions message
+
+SESSION_INBOUND_FRAMES = 16  # received frames waiting to be processed before the session stop reading
+SESSION_MAX_INVALID_MESSAGES = 10  # invalid messages before the peer is disconnected
+PROCESS_WORKERS = 1  # messages are processed in order, off the event loop
+CODECS = [CODEC_BINARY, CODEC_JSON]  # supported payload codecs ordered by preference
+
+MAX_BLOCKS_PER_RESPONSE = 512  # blocks request range is capped so a response is never the whole chain
+SYNC_CHUNK_SIZE = 128  # blocks per request in the initial block download
+SYNC_WINDOW = 16  # chunks requested ahead of the applied height (bounds the downloaded blocks in memory)
+SYNC_REQUESTS_PER_PEER = 2  # concurrent chunk requests to one peer
+SYNC_TIMEOUT = 10  # Seconds, chunk request timeout
+SYNC_RETRIES = 3  # failed requests before a peer is dropped (and before a chunk fails the download)
+SYNC_HEADERS_FIRST = True  # download and link check the headers chain before the blocks bodies
+MAX_HEADERS_PER_RESPONSE = 2048  # headers request range cap
+SYNC_HEADERS_CHUNK_SIZE = 1024  # headers per request in the headers first sync
@@ -0,0 +1,138 @@
+"""
+Wire framing of the p2p messages
+
+every message is sent as frame: fixed size header followed by the message payload
+header: protocol version (1 byte), payload codec (1 byte), message type id (1 byte), ttl (1 byte),
+flags (1 byte), request id (4 bytes), payload length (4 bytes)
+
+request frame has non zero request id, the reply frame has the same request id and the response flag,
+so many requests and the relayed messages (request id 0) share one connection (see session.py)
+
+the payload codec is negotiated per connection (Hello message), every frame has its codec
+so a message that can't be encoded with the binary codec is sent as JSON frame
+
+the ttl is in the header so message can be relayed (ttl - 1) without decoding and encoding the payload again,
+FrameDecoder is incremental decoder, the received data is appended to one reusable buffer
+and the frames payloads are memoryview slices of that buffer (no copy)
+"""
+import asyncio
+import struct
+from typing import NamedTuple, Optional, Union
+
+from .config import MAX_FRAME_SIZE, READ_BUFFER_SIZE
+
+PROTOCOL_VERSION = 3
+FRAME_HEADER = struct.Struct("!BBBBBII")  # version, codec, message type id, ttl, flags, request id, payload length
+FLAG_RESPONSE = 1
+
+Payload = Union[bytes, memoryview]
+
+
+class FrameError(Exception):
+    pass
+
+
+class Frame(NamedTuple):
+    codec: int  # payload codec (blockchain.codec CODEC_JSON or CODEC_BINARY)
+    typ_id: int  # message type id
+    ttl: int
+    payload: Payload  # view of the decoder buffer (the decoder leave the buffer to the view while it's referenced)
+    request_id: int = 0  # 0 for message that isn't request or response
+    flags: int = 0
+
+
+def encode_frame(codec: int, typ_id: int, ttl: int, payload: Payload, request_id: int = 0, flags: int = 0) -> bytes:
+    """
+    :param codec: payload codec
+    :param typ_id: message type id
+    :param ttl: message time to live (number of relays)
+    :param payload: encoded message
+    :param request_id: request id of request or response frame
+    :param flags: frame flags (FLAG_RESPONSE)
+    :return: frame bytes
+    """
+    if len(payload) > MAX_FRAME_SIZE:
+        raise FrameError(f"frame payload is too big ({len(payload)} bytes)")
+    header = FRAME_HEADER.pack(PROTOCOL_VERSION, codec, typ_id, max(ttl, 0), flags, request_id, len(payload))
+    return header + payload
+
+
+def reframe(frame: bytes, request_id: int, flags: int = 0) -> bytes:
+    """
+    :param frame: encoded frame
+    :return: the frame with other request id and flags (the payload isn't encoded again)
+    """
+    version, codec, typ_id, ttl, _, _, length = FRAME_HEADER.unpack_from(frame)
+    header = FRAME_HEADER.pack(version, codec, typ_id, ttl, flags, request_id, length)
+    return b"".join((header, memoryview(frame)[FRAME_HEADER.size:]))
+
+
+class FrameDecoder:
+    def __init__(self, max_frame_size: int = MAX_FRAME_SIZE):
+        """
+        :param max_frame_size: maximum payload size, bigger frame raise FrameError (the peer should be disconnected)
+        """
+        self.max_frame_size = max_frame_size
+        self._buffer = bytearray()
+        self._start = 0  # start of the data that wasn't decoded yet
+
+    def feed(self, data: bytes):
+        """
+        Add received data (buffer that is still referenced by payload view is left to the view)
+        :param data: received bytes
+        """
+        try:
+            del self._buffer[: self._start]
+            self._buffer += data
+        except BufferError:  # old payload view is still referenced, leave the old buffer to it
+            self._buffer = self._buffer[self._start:] + data
+        self._start = 0
+
+    @property
+    def pending(self) -> int:
+        """
+        :return: number of buffered bytes that were not decoded yet
+        """
+        return len(self._buffer) - self._start
+
+    def __iter__(self):
+        return self
+
+    def __next__(self) -> Frame:
+        frame = self.next_frame()
+        if frame is None:
+            raise StopIteration
+        return frame
+
+    def next_frame(self) -> Optional[Frame]:
+        """
+        :return: the next complete frame (None if more data is needed)
+        """
+        if self.pending < FRAME_HEADER.size:
+            return None
+        version, codec, typ_id, ttl, flags, request_id, length = FRAME_HEADER.unpack_from(self._buffer, self._start)
+        if version != PROTOCOL_VERSION:
+            raise FrameError(f"unsupported protocol version {version}")
+        if length > self.max_frame_size:
+            raise FrameError(f"frame payload is too big ({length} bytes)")
+        end = self._start + FRAME_HEADER.size + length
+        if len(self._buffer) < end:
+            return None
+        payload = memoryview(self._buffer)[self._start + FRAME_HEADER.size: end]
+        self._start = end
+        return Frame(codec, typ_id, ttl, payload, request_id, flags)
+
+
+async def read_frame(reader: asyncio.StreamReader, decoder: FrameDecoder) -> Optional[Frame]:
+    """
+    Read from the stream until complete frame is decoded
+    :return: frame (None if the connection was closed)
+    """
+    frame = decoder.next_frame()
+    while frame is None:
+        data = await reader.read(READ_BUFFER_SIZE)
+        if not data:
+            return None
+        decoder.feed(data)
+        frame = decoder.next_frame()
+    return frame
@@ -1,7 +1,27 @@
 from .new_block import NewBlock
 from .new_transaction import NewTransaction
+from .new_transactions import NewTransactions
 from .peer_info import PeerInfo
 from .blocks_request import BlocksRequest
 from .blocks_response import BlocksResponse
+from .hello import Hello
+from .compact_block import CompactBlock
+from .get_block_transactions import GetBlockTransactions
+from .block_transactions import BlockTransactions
+from .headers_request import HeadersRequest
+from .headers_response import HeadersResponse
 
-__all__ = ["NewBlock", "NewTransaction", "PeerInfo", "BlocksRequest", "BlocksResponse"]
+__all__ = [
+    "NewBlock",
+    "NewTransaction",
+    "NewTransactions",
+    "PeerInfo",
+    "BlocksRequest",
+    "BlocksResponse",
+    "Hello",
+    "CompactBlock",
+    "GetBlockTransactions",
+    "BlockTransactions",
+    "HeadersRequest",
+    "HeadersResponse",
+]
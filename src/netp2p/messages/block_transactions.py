@@ -0,0 +1,87 @@
+import struct
+
+from blockchain.codec import encode_transaction, decode_transaction, TRANSACTION
+from blockchain.exceptions import CodecError
+from blockchain.transaction import Transaction
+
+from .message import Message
+
+HASH_SIZE = 32
+HEADER = struct.Struct(f"!{HASH_SIZE}sI")  # block hash, transactions count
+
+
+class BlockTransactions(Message):
+    """
+    Reply with the compact block missing transactions (in the requested order)
+    """
+
+    typ = "block-transactions"
+    typ_id = 9
+
+    def __init__(self, block_hash: str, transactions, **kwargs) -> None:
+        """
+        :block_hash: the compact block hash
+        :transactions: list of transactions (transaction objects or transactions dicts)
+        """
+        self.block_hash = block_hash
+        self.transactions = [t if isinstance(t, Transaction) else Transaction.from_dict(t) for t in transactions]
+        super().__init__(self.__class__.typ, ttl=1)
+
+    def process(self, blockchain, node):
+        """
+        Complete the pending compact block and relay it
+        """
+        pending = node.compact_blocks.pop_pending(self.block_hash)
+        if pending is None:
+            return None
+        compact_block, transactions = pending
+        missing = [index for index, t in enumerate(transactions) if t is None]
+        if len(missing) != len(self.transactions):
+            print("Invalid compact block transactions")
+            return None
+        for index, transaction in zip(missing, self.transactions):
+            transactions[index] = transaction
+        block = compact_block.rebuild(transactions)
+        if block is None:
+            print("Invalid compact block transactions (the block hash is not matching)")
+            return None
+        print("Adding candidate compact block")
+        node.compact_blocks.add_block(block)
+        blockchain.add_block(block)
+        if compact_block.ttl > 1:
+            compact_block.ttl -= 1
+            node.broadcast(compact_block)
+        return None
+
+    def to_dict(self) -> dict:
+        return {
+            "msg": super().to_dict(),
+            "block_hash": self.block_hash,
+            "transactions": [t.to_dict() for t in self.transactions],
+        }
+
+    def to_binary(self) -> bytes:
+        try:
+            header = HEADER.pack(bytes.fromhex(self.block_hash), len(self.transactions))
+        except (ValueError, struct.error):
+            raise CodecError("invalid block transactions", block_hash=self.block_hash)
+        return b"".join([header, *(encode_transaction(t) for t in self.transactions)])
+
+    @classmethod
+    def from_binary(cls, payload):
+        try:
+            block_hash, count = HEADER.unpack_from(payload)
+        except struct.error:
+            raise CodecError("invalid block transactions")
+        offsets = range(HEADER.size, HEADER.size + count * TRANSACTION.size, TRANSACTION.size)
+        return cls(block_hash.hex(), [decode_transaction(payload, offset) for offset in offsets])
+
+    @classmethod
+    def from_dict(cls, dict_: dict):
+        msg_typ = dict_["msg"]["typ"]
+        if msg_typ != cls.typ:
+            raise TypeError(f"invalid message type '{msg_typ}' required '{cls.typ}'")
+        return cls(dict_["block_hash"], dict_["transactions"], **dict_["msg"])
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}('block_hash': {self.block_hash}, 'transactions': {len(self.transactions)})"
@@ -1,9 +1,17 @@
+import struct
+
+from blockchain.exceptions import CodecError
+
 from .message import Message
 from .blocks_response import BlocksResponse
+from ..config import MAX_BLOCKS_PER_RESPONSE
+
+RANGE = struct.Struct("!qq")  # start index, end index (-1 for None)
 
 
 class BlocksRequest(Message):
     typ = "blocks-request"
+    typ_id = 4
 
     def __init__(self, start_index, end_index, **kwargs) -> None:
         self.start_index = start_index
@@ -17,18 +25,39 @@ class BlocksRequest(Message):
             "end_index": self.end_index,
         }
 
+    def to_binary(self) -> bytes:
+        try:
+            return RANGE.pack(
+                -1 if self.start_index is None else self.start_index,
+                -1 if self.end_index is None else self.end_index,
+            )
+        except struct.error:
+            raise CodecError("invalid blocks range", start=self.start_index, end=self.end_index)
+
     def process(self, blockchain, node):
+        """
+        Reply with the requested blocks range (at most MAX_BLOCKS_PER_RESPONSE blocks,
+        the requester ask for the next range when the response is full)
+        """
         print("Sending blocks")
-        if blockchain.is_full():
-            response = BlocksResponse(
-                blocks=[
-                    b.to_dict()
-                    for b in blockchain.blocks[self.start_index: self.end_index]
-                ]
-            ).to_bytes()
-        else:
-            response = b""
-        return response
+        if not blockchain.is_full():
+            return BlocksResponse(blocks=[])
+        start_index = self.start_index or 0
+        end_index = start_index + MAX_BLOCKS_PER_RESPONSE
+        if self.end_index is not None:
+            end_index = min(end_index, self.end_index)
+        return BlocksResponse(blocks=blockchain.blocks[start_index:end_index])
+
+    @classmethod
+    def from_binary(cls, payload):
+        try:
+            start_index, end_index = RANGE.unpack_from(payload)
+        except struct.error:
+            raise CodecError("invalid blocks request")
+        return cls(
+            None if start_index == -1 else start_index,
+            None if end_index == -1 else end_index,
+        )
 
     @classmethod
     def from_dict(cls, dict_: dict):
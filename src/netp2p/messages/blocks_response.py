@@ -1,32 +1,73 @@
-from blockchain import Chain, exceptions
+import struct
+
+from blockchain import exceptions
+from blockchain.chain import ChainBranch
 from blockchain.block import Block
+from blockchain.codec import encode_block, decode_block
 
 from .message import Message
 
+COUNT = struct.Struct("!I")
+
 
 class BlocksResponse(Message):
     typ = "blocks-response"
+    typ_id = 5
 
     def __init__(self, blocks, **kwargs) -> None:
         """
-        :blocks: list of dict (blocks in a dict representaion)
+        :blocks: list of blocks (block objects or blocks in a dict representaion)
         """
         self.blocks = blocks
         super().__init__(self.__class__.typ, ttl=1)
 
     def to_dict(self) -> dict:
-        return {"msg": super().to_dict(), "blocks": self.blocks}
+        blocks = [b.to_dict() if isinstance(b, Block) else b for b in self.blocks]
+        return {"msg": super().to_dict(), "blocks": blocks}
+
+    def to_binary(self) -> bytes:
+        blocks = [b if isinstance(b, Block) else Block.from_dict(b) for b in self.blocks]
+        return b"".join([COUNT.pack(len(blocks)), *(encode_block(b) for b in blocks)])
 
     def process(self, blockchain, node):
         print("Recving blocks and updating blockchain")
-        update_branch: Chain = blockchain.copy()
+        self.apply(blockchain)
+
+    def apply(self, blockchain) -> bool:
+        """
+        Link the blocks to the chain, all of them or none (the blocks are linked on a branch),
+        blocks of competing branch (the first block parent is not the chain tip) are passed to the fork choice
+        :param blockchain: chain to update
+        :return: True if the blocks were added, False if the update is invalid or not better than the chain
+        """
+        blocks = [b if isinstance(b, Block) else Block.from_dict(b) for b in self.blocks]
+        if blocks and blocks[0].index and blocks[0].previous_hash != blockchain.blocks[-1].hash:
+            try:
+                return blockchain.reorganize(blocks)
+            except exceptions.BlockChainError:
+                return False
+        update_branch: ChainBranch = blockchain.branch()
         try:
-            for new_b_d in self.blocks:
-                b = Block.from_dict(new_b_d)
+            for b in blocks:
                 update_branch.link_new_block(b, _i_know_what_i_doing=True)
+            update_branch.commit()
         except exceptions.BlockChainError:
-            return  # The new update is invalid
-        blockchain.update_state(update_branch)
+            update_branch.discard()
+            return False  # The new update is invalid
+        return True
+
+    @classmethod
+    def from_binary(cls, payload):
+        try:
+            (count,) = COUNT.unpack_from(payload)
+        except struct.error:
+            raise exceptions.CodecError("invalid blocks response")
+        blocks = []
+        offset = COUNT.size
+        for _ in range(count):
+            block, offset = decode_block(payload, offset)
+            blocks.append(block)
+        return cls(blocks)
 
     @classmethod
     def from_dict(cls, dict_: dict):
@@ -36,4 +77,4 @@ class BlocksResponse(Message):
         return cls(dict_["blocks"], **dict_["msg"])
 
     def __str__(self) -> str:
-        return f"{self.__class__.__name__}('ttl'={self.ttl}, 'blocks': {self.blocks})"
+        return f"{self.__class__.__name__}('ttl'={self.ttl}, 'blocks': {len(self.blocks)})"
@@ -0,0 +1,134 @@
+import os
+import struct
+from typing import Dict, List, Optional
+
+from blockchain.block import Block
+from blockchain.codec import encode_block, decode_block
+from blockchain.exceptions import CodecError
+from blockchain.transaction import Transaction
+
+from .message import Message
+from .get_block_transactions import GetBlockTransactions
+from ..compact import short_id, NONCE_SIZE, SHORT_ID_SIZE
+
+HASH_SIZE = 32
+SHORT_IDS = struct.Struct(f"!{HASH_SIZE}s{NONCE_SIZE}sI")  # block hash, nonce, short ids count
+
+
+class CompactBlock(Message):
+    """
+    New block as header and transactions short ids (see compact.py)
+    """
+
+    typ = "compact-block"
+    typ_id = 7
+    gossip = True
+
+    def __init__(self, header, block_hash: str, nonce: bytes, short_ids: List[bytes], ttl=10, **kwargs) -> None:
+        """
+        :header: the block without transactions (block object or block dict)
+        :block_hash: the full block hash
+        :nonce: short ids key
+        :short_ids: the block transactions short ids
+        """
+        self.header = header if isinstance(header, Block) else Block.from_dict(header)
+        self.block_hash = block_hash
+        self.nonce = nonce
+        self.short_ids = short_ids
+        self.block: Optional[Block] = None  # the full block when the message is created from block
+        super().__init__(self.__class__.typ, ttl=ttl)
+
+    @classmethod
+    def from_block(cls, block: Block, ttl: int = 10) -> "CompactBlock":
+        nonce = os.urandom(NONCE_SIZE)
+        compact_block = cls(
+            block.replace(transactions=()),
+            block.hash,
+            nonce,
+            [short_id(nonce, t.hash) for t in block.transactions],
+            ttl=ttl,
+        )
+        compact_block.block = block
+        return compact_block
+
+    def rebuild(self, transactions: List[Optional[Transaction]]) -> Optional[Block]:
+        """
+        :param transactions: the block transactions
+        :return: the full block (None if the block hash is not the compact block hash)
+        """
+        block = self.header.replace(transactions=transactions)
+        if block.hash != self.block_hash:
+            return None
+        return block
+
+    def process(self, blockchain, node):
+        """
+        Rebuild the block from the mempool transactions, request the missing transactions from the peer
+        :return: GetBlockTransactions reply if there are missing transactions
+        """
+        by_short_id: Dict[bytes, Transaction] = {
+            short_id(self.nonce, t.hash): t for t in list(blockchain.mempool)
+        }
+        transactions = [by_short_id.get(i) for i in self.short_ids]
+        missing = [index for index, t in enumerate(transactions) if t is None]
+        if not missing:
+            block = self.rebuild(transactions)
+            if block is not None:
+                print("Adding candidate compact block")
+                node.compact_blocks.add_block(block)
+                blockchain.add_block(block)
+                return None
+            missing = list(range(len(transactions)))  # short id collision, request all the transactions
+            transactions = [None] * len(transactions)
+        print(f"Requesting {len(missing)} missing transactions of compact block")
+        node.compact_blocks.add_pending(self, transactions)
+        return GetBlockTransactions(self.block_hash, missing)
+
+    def to_dict(self) -> dict:
+        return {
+            "msg": super().to_dict(),
+            "header": self.header.to_dict(),
+            "block_hash": self.block_hash,
+            "nonce": self.nonce.hex(),
+            "short_ids": [i.hex() for i in self.short_ids],
+        }
+
+    def to_binary(self) -> bytes:
+        try:
+            block_hash = bytes.fromhex(self.block_hash)
+            ids = SHORT_IDS.pack(block_hash, self.nonce, len(self.short_ids))
+        except (ValueError, struct.error):
+            raise CodecError("invalid compact block", block_hash=self.block_hash)
+        if len(block_hash) != HASH_SIZE or len(self.nonce) != NONCE_SIZE:
+            raise CodecError("invalid compact block", block_hash=self.block_hash)
+        return b"".join([encode_block(self.header), ids, *self.short_ids])
+
+    @classmethod
+    def from_binary(cls, payload):
+        header, offset = decode_block(payload)
+        try:
+            block_hash, nonce, count = SHORT_IDS.unpack_from(payload, offset)
+        except struct.error:
+            raise CodecError("invalid compact block")
+        offset += SHORT_IDS.size
+        end = offset + count * SHORT_ID_SIZE
+        if end > len(payload):
+            raise CodecError("compact block short ids are truncated", count=count)
+        short_ids = [bytes(payload[i: i + SHORT_ID_SIZE]) for i in range(offset, end, SHORT_ID_SIZE)]
+        return cls(header, block_hash.hex(), nonce, short_ids)
+
+    @classmethod
+    def from_dict(cls, dict_: dict):
+        msg_typ = dict_["msg"]["typ"]
+        if msg_typ != cls.typ:
+            raise TypeError(f"invalid message type '{msg_typ}' required '{cls.typ}'")
+        return cls(
+            dict_["header"],
+            dict_["block_hash"],
+            bytes.fromhex(dict_["nonce"]),
+            [bytes.fromhex(i) for i in dict_["short_ids"]],
+            **dict_["msg"],
+        )
+
+    def __str__(self) -> str:
+        return f"CompactBlock('ttl'={self.ttl}, 'block_hash': {self.block_hash}, 'transactions': {len(self.short_ids)})"
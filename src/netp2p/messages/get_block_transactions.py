@@ -0,0 +1,66 @@
+import struct
+
+from blockchain.exceptions import CodecError
+
+from .message import Message
+from .block_transactions import BlockTransactions
+
+HASH_SIZE = 32
+HEADER = struct.Struct(f"!{HASH_SIZE}sI")  # block hash, indexes count
+INDEX = struct.Struct("!I")
+
+
+class GetBlockTransactions(Message):
+    """
+    Request of the compact block transactions that are missing in the mempool
+    """
+
+    typ = "get-block-transactions"
+    typ_id = 8
+
+    def __init__(self, block_hash: str, indexes, **kwargs) -> None:
+        """
+        :block_hash: the compact block hash
+        :indexes: the missing transactions indexes in the block
+        """
+        self.block_hash = block_hash
+        self.indexes = indexes
+        super().__init__(self.__class__.typ, ttl=1)
+
+    def process(self, blockchain, node):
+        """
+        :return: BlockTransactions reply (without transactions if the block is not known)
+        """
+        block = node.compact_blocks.get_block(self.block_hash)
+        if block is None or any(not 0 <= i < len(block.transactions) for i in self.indexes):
+            return BlockTransactions(self.block_hash, [])
+        return BlockTransactions(self.block_hash, [block.transactions[i] for i in self.indexes])
+
+    def to_dict(self) -> dict:
+        return {"msg": super().to_dict(), "block_hash": self.block_hash, "indexes": self.indexes}
+
+    def to_binary(self) -> bytes:
+        try:
+            header = HEADER.pack(bytes.fromhex(self.block_hash), len(self.indexes))
+            return header + b"".join(INDEX.pack(i) for i in self.indexes)
+        except (ValueError, struct.error):
+            raise CodecError("invalid block transactions request", block_hash=self.block_hash)
+
+    @classmethod
+    def from_binary(cls, payload):
+        try:
+            block_hash, count = HEADER.unpack_from(payload)
+            indexes = [INDEX.unpack_from(payload, HEADER.size + i * INDEX.size)[0] for i in range(count)]
+        except struct.error:
+            raise CodecError("invalid block transactions request")
+        return cls(block_hash.hex(), indexes)
+
+    @classmethod
+    def from_dict(cls, dict_: dict):
+        msg_typ = dict_["msg"]["typ"]
+        if msg_typ != cls.typ:
+            raise TypeError(f"invalid message type '{msg_typ}' required '{cls.typ}'")
+        return cls(dict_["block_hash"], dict_["indexes"], **dict_["msg"])
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}('block_hash': {self.block_hash}, 'indexes': {len(self.indexes)})"
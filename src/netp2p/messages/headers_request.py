@@ -0,0 +1,72 @@
+import struct
+
+from blockchain.exceptions import CodecError
+
+from .message import Message
+from .headers_response import HeadersResponse
+from ..config import MAX_HEADERS_PER_RESPONSE
+
+RANGE = struct.Struct("!qq")  # start index, end index (-1 for None)
+
+
+class HeadersRequest(Message):
+    """
+    Request of blocks headers range (headers first sync, see sync.py)
+    """
+
+    typ = "headers-request"
+    typ_id = 11
+
+    def __init__(self, start_index, end_index, **kwargs) -> None:
+        self.start_index = start_index
+        self.end_index = end_index
+        super().__init__(self.__class__.typ, ttl=1)
+
+    def to_dict(self) -> dict:
+        return {
+            "msg": super().to_dict(),
+            "start_index": self.start_index,
+            "end_index": self.end_index,
+        }
+
+    def to_binary(self) -> bytes:
+        try:
+            return RANGE.pack(
+                -1 if self.start_index is None else self.start_index,
+                -1 if self.end_index is None else self.end_index,
+            )
+        except struct.error:
+            raise CodecError("invalid headers range", start=self.start_index, end=self.end_index)
+
+    def process(self, blockchain, node):
+        """
+        Reply with the requested headers range (at most MAX_HEADERS_PER_RESPONSE headers)
+        """
+        if not blockchain.is_full():
+            return HeadersResponse(headers=[])
+        start_index = self.start_index or 0
+        end_index = start_index + MAX_HEADERS_PER_RESPONSE
+        if self.end_index is not None:
+            end_index = min(end_index, self.end_index)
+        return HeadersResponse.from_blocks(blockchain.blocks[start_index:end_index])
+
+    @classmethod
+    def from_binary(cls, payload):
+        try:
+            start_index, end_index = RANGE.unpack_from(payload)
+        except struct.error:
+            raise CodecError("invalid headers request")
+        return cls(
+            None if start_index == -1 else start_index,
+            None if end_index == -1 else end_index,
+        )
+
+    @classmethod
+    def from_dict(cls, dict_: dict):
+        msg_typ = dict_["msg"]["typ"]
+        if msg_typ != cls.typ:
+            raise TypeError(f"invalid message type '{msg_typ}' required '{cls.typ}'")
+        return cls(dict_["start_index"], dict_["end_index"], **dict_["msg"])
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}('ttl'={self.ttl}, 'start_index': {self.start_index}, 'end_index': {self.end_index})"
@@ -0,0 +1,80 @@
+import struct
+from typing import List, Tuple
+
+from blockchain.block import Block
+from blockchain.codec import encode_block, decode_block
+from blockchain.exceptions import CodecError
+
+from .message import Message
+
+HASH_SIZE = 32
+COUNT = struct.Struct("!I")
+HASH = struct.Struct(f"!{HASH_SIZE}s")
+
+
+class HeadersResponse(Message):
+    """
+    Reply with blocks headers (the block without transactions and the full block hash)
+    """
+
+    typ = "headers-response"
+    typ_id = 12
+
+    def __init__(self, headers, **kwargs) -> None:
+        """
+        :headers: list of (header, block hash), the header is block object or block dict without transactions
+        """
+        self.headers: List[Tuple[Block, str]] = [
+            (header if isinstance(header, Block) else Block.from_dict(header), block_hash)
+            for header, block_hash in headers
+        ]
+        super().__init__(self.__class__.typ, ttl=1)
+
+    @classmethod
+    def from_blocks(cls, blocks) -> "HeadersResponse":
+        return cls([(block.replace(transactions=()), block.hash) for block in blocks])
+
+    def to_dict(self) -> dict:
+        headers = [{"header": header.to_dict(), "block_hash": block_hash} for header, block_hash in self.headers]
+        return {"msg": super().to_dict(), "headers": headers}
+
+    def to_binary(self) -> bytes:
+        encoded = [COUNT.pack(len(self.headers))]
+        for header, block_hash in self.headers:
+            try:
+                raw_hash = bytes.fromhex(block_hash)
+            except ValueError:
+                raise CodecError("invalid header hash", block_hash=block_hash)
+            if len(raw_hash) != HASH_SIZE:
+                raise CodecError("invalid header hash", block_hash=block_hash)
+            encoded += [encode_block(header), raw_hash]
+        return b"".join(encoded)
+
+    @classmethod
+    def from_binary(cls, payload):
+        try:
+            (count,) = COUNT.unpack_from(payload)
+        except struct.error:
+            raise CodecError("invalid headers response")
+        headers = []
+        offset = COUNT.size
+        for _ in range(count):
+            header, offset = decode_block(payload, offset)
+            try:
+                (block_hash,) = HASH.unpack_from(payload, offset)
+            except struct.error:
+                raise CodecError("header hash is truncated")
+            offset += HASH.size
+            headers.append((header, block_hash.hex()))
+        return cls(headers)
+
+    @classmethod
+    def from_dict(cls, dict_: dict):
+        msg_typ = dict_["msg"]["typ"]
+        if msg_typ != cls.typ:
+            raise TypeError(f"invalid message type '{msg_typ}' required '{cls.typ}'")
+        headers = [(h["header"], h["block_hash"]) for h in dict_["headers"]]
+        return cls(headers, **dict_["msg"])
+
+    def __str__(self) -> str:
+        return f"{self.__class__.__name__}('ttl'={self.ttl}, 'headers': {len(self.headers)})"
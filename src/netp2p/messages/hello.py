@@ -0,0 +1,54 @@
+from typing import List
+
+from blockchain.codec import CODEC_JSON
+from blockchain.exceptions import CodecError
+
+from .message import Message
+
+
+class Hello(Message):
+    """
+    First message on every connection (in both directions), used to negotiate the payload codec
+    """
+
+    typ = "hello"
+    typ_id = 6
+
+    def __init__(self, codecs: List[int], **kwargs) -> None:
+        """
+        :codecs: supported codecs ordered by preference
+        """
+        self.codecs = codecs
+        super().__init__(self.__class__.typ, ttl=1)
+
+    def to_dict(self) -> dict:
+        return {"msg": super().to_dict(), "codecs": self.codecs}
+
+    def to_binary(self) -> bytes:
+        return bytes([len(self.codecs), *self.codecs])
+
+    def choose_codec(self, supported: List[int]) -> int:
+        """
+        :param supported: local supported codecs ordered by preference
+        :return: the preferred codec that both peers support (JSON if there is no such codec)
+        """
+        for codec in supported:
+            if codec in self.codecs:
+                return codec
+        return CODEC_JSON
+
+    @classmethod
+    def from_binary(cls, payload):
+        if not len(payload) or len(payload) < payload[0] + 1:
+            raise CodecError("invalid hello")
+        return cls(list(payload[1: payload[0] + 1]))
+
+    @classmethod
+    def from_dict(cls, dict_: dict):
+        msg_typ = dict_["msg"]["typ"]
+        if msg_typ != cls.typ:
+            raise TypeError(f"invalid message type '{msg_typ}' required '{cls.typ}'")
+        return cls(dict_["codecs"], **dict_["msg"])
+
+    def __str__(self) -> str:
+        return f"Hello('codecs': {self.codecs})"
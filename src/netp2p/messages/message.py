@@ -1,25 +1,87 @@
 import json
+from typing import Dict, Tuple
+
+from blockchain.codec import CODEC_BINARY, CODEC_JSON
+from blockchain.exceptions import CodecError
+
+from ..frame import encode_frame, reframe
 
 
 class Message:
+    typ_id = 0  # message type id in the frame header
+    gossip = False  # event message that is relayed to all the peers (duplicates are dropped by the seen cache)
+    relay_payload = True  # the received payload is relayed as it is (False if processing changed the message)
+
     def __init__(self, typ: str, ttl: int = 10) -> None:
         self.typ = typ
         self.ttl = ttl
+        self._frames: Dict[Tuple[int, int], bytes] = {}  # {(codec, ttl): frame} the message is sent to many peers
 
     def process(self, blockchain, node):
         pass  # TODO require sub class to implement
 
     def to_dict(self) -> dict:
-        return {"typ": self.typ, "ttl": self.ttl}
+        return {"typ": self.typ}  # the ttl is sent in the frame header
 
     def to_bytes(self) -> bytes:
         return json.dumps(self.to_dict()).encode()
 
+    def to_binary(self) -> bytes:
+        """
+        :return: binary codec payload (sub classes that support the binary codec override it)
+        """
+        raise CodecError("message has no binary encoding", typ=self.typ)
+
+    def to_frame(self, codec: int = CODEC_JSON, request_id: int = 0, flags: int = 0) -> bytes:
+        """
+        :param codec: payload codec (message that can't be encoded with the binary codec is sent as JSON)
+        :param request_id: request id of request or response frame
+        :param flags: frame flags
+        :return: frame bytes
+        """
+        if request_id or flags:
+            return reframe(self.to_frame(codec), request_id, flags)
+        frame = self._frames.get((codec, self.ttl))
+        if frame is None:
+            if codec == CODEC_BINARY:
+                try:
+                    frame = encode_frame(CODEC_BINARY, self.typ_id, self.ttl, self.to_binary())
+                except CodecError:
+                    frame = self.to_frame(CODEC_JSON)
+            else:
+                frame = encode_frame(CODEC_JSON, self.typ_id, self.ttl, self.to_bytes())
+            self._frames[(codec, self.ttl)] = frame
+        return frame
+
+    def add_frame(self, codec: int, frame: bytes):
+        """
+        Add already encoded frame of the message (e.g: received frame with the relay ttl)
+        """
+        self._frames[(codec, self.ttl)] = frame
+
     @classmethod
-    def from_bytes(cls, bytes_msg: bytes):
-        dict_msg = json.loads(bytes_msg.decode())
+    def from_bytes(cls, bytes_msg, ttl: int = None, codec: int = CODEC_JSON):
+        """
+        :param bytes_msg: message payload (bytes or memoryview)
+        :param ttl: message ttl from the frame header
+        :param codec: payload codec from the frame header
+        """
+        if codec == CODEC_BINARY:
+            msg = cls.from_binary(bytes_msg)
+            if ttl is not None:
+                msg.ttl = ttl
+            return msg
+        if codec != CODEC_JSON:
+            raise CodecError("unsupported codec", codec=codec)
+        dict_msg = json.loads(bytes(bytes_msg))
+        if ttl is not None:
+            dict_msg["msg"]["ttl"] = ttl
         return cls.from_dict(dict_msg)
 
+    @classmethod
+    def from_binary(cls, payload):
+        raise CodecError("message has no binary encoding", typ=cls.__name__)
+
     @classmethod
     def from_dict(cls, dict_: dict):
         pass
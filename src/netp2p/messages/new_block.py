@@ -1,20 +1,37 @@
+from blockchain.block import Block
+from blockchain.codec import encode_block, decode_block
+
 from .message import Message
 
 
 class NewBlock(Message):
     typ = "new-block"
+    typ_id = 1
+    gossip = True
 
     def __init__(self, block, ttl=10, **kwargs) -> None:
+        """
+        :block: block object or block dict
+        """
         self.block = block
         super().__init__(self.__class__.typ, ttl=ttl)
 
     def to_dict(self) -> dict:
-        return {"msg": super().to_dict(), "block": self.block}
+        block = self.block.to_dict() if isinstance(self.block, Block) else self.block
+        return {"msg": super().to_dict(), "block": block}
+
+    def to_binary(self) -> bytes:
+        block = self.block if isinstance(self.block, Block) else Block.from_dict(self.block)
+        return encode_block(block)
 
     def process(self, blockchain, node):
         print("Adding candidate block")
         blockchain.add_block(self.block)
 
+    @classmethod
+    def from_binary(cls, payload):
+        return cls(decode_block(payload)[0])
+
     @classmethod
     def from_dict(cls, dict_: dict):
         msg_typ = dict_["msg"]["typ"]
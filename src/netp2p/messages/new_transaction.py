@@ -1,21 +1,46 @@
+from blockchain.transaction import Transaction
+from blockchain.codec import encode_transaction, decode_transaction
+
 from .message import Message
 
 
 class NewTransaction(Message):
     typ = "new-transaction"
+    typ_id = 2
+    gossip = True
 
     def __init__(self, transaction, ttl=10, **kwargs) -> None:
+        """
+        :transaction: transaction object or transaction dict
+        """
         self.transaction = transaction
 
         super().__init__(self.__class__.typ, ttl=ttl)
 
     def to_dict(self) -> dict:
-        return {"msg": super().to_dict(), "transaction": self.transaction}
+        transaction = (
+            self.transaction.to_dict()
+            if isinstance(self.transaction, Transaction)
+            else self.transaction
+        )
+        return {"msg": super().to_dict(), "transaction": transaction}
+
+    def to_binary(self) -> bytes:
+        transaction = (
+            self.transaction
+            if isinstance(self.transaction, Transaction)
+            else Transaction.from_dict(self.transaction)
+        )
+        return encode_transaction(transaction)
 
     def process(self, blockchain, node):
         print("Adding transaction")
         blockchain.add_transaction(self.transaction)
 
+    @classmethod
+    def from_binary(cls, payload):
+        return cls(decode_transaction(payload))
+
     @classmethod
     def from_dict(cls, dict_: dict):
         msg_typ = dict_["msg"]["typ"]
@@ -0,0 +1,108 @@
+import struct
+from typing import Dict, List
+
+from blockchain.codec import encode_transaction, decode_transaction, TRANSACTION
+from blockchain.exceptions import CodecError
+from blockchain.transaction import Transaction
+
+from .message import Message
+from .new_transaction import NewTransaction
+from ..config import MAX_TRANSACTIONS_PER_BATCH
+
+COUNT = struct.Struct("!I")
+
+
+class NewTransactions(Message):
+    """
+    Batch of new transactions, the transactions are validated together (see Chain.add_transactions)
+    and relayed together with the other transactions that arrived in the same relay flush,
+    only the transactions that were added to the mempool are relayed (the batch is encoded again)
+    """
+
+    typ = "new-transactions"
+    typ_id = 10
+    gossip = True
+    relay_payload = False
+
+    def __init__(self, transactions, ttl=10, **kwargs) -> None:
+        """
+        :transactions: list of transactions (transaction objects or transactions dicts)
+        """
+        self.transactions = [t if isinstance(t, Transaction) else Transaction.from_dict(t) for t in transactions]
+        super().__init__(self.__class__.typ, ttl=ttl)
+
+    @classmethod
+    def batch(cls, messages: List[Message], max_transactions: int = MAX_TRANSACTIONS_PER_BATCH) -> List[Message]:
+        """
+        Aggregate the transactions messages with the same ttl to NewTransactions messages
+        (other messages are not changed, single NewTransaction message is kept as it is)
+        :param messages: messages to relay
+        :param max_transactions: max transactions in one batch
+        :return: messages to relay, the batches are in place of the first aggregated message
+        """
+        batches: Dict[int, List[Message]] = {}  # {ttl: transactions messages}
+        res: List = []  # messages and the batches (lists) in the relay order
+        for msg in messages:
+            if not isinstance(msg, (NewTransaction, NewTransactions)):
+                res.append(msg)
+                continue
+            if msg.ttl not in batches:
+                batches[msg.ttl] = []
+                res.append(batches[msg.ttl])
+            batches[msg.ttl].append(msg)
+
+        relay_messages: List[Message] = []
+        for item in res:
+            if not isinstance(item, list):
+                relay_messages.append(item)
+            elif len(item) == 1 and isinstance(item[0], NewTransaction):
+                relay_messages.append(item[0])
+            else:
+                transactions = [t for msg in item for t in cls._transactions(msg)]
+                relay_messages.extend(
+                    cls(transactions[i: i + max_transactions], ttl=item[0].ttl)
+                    for i in range(0, len(transactions), max_transactions)
+                )
+        return relay_messages
+
+    @staticmethod
+    def _transactions(msg) -> List[Transaction]:
+        if isinstance(msg, NewTransactions):
+            return msg.transactions
+        if isinstance(msg.transaction, Transaction):
+            return [msg.transaction]
+        return [Transaction.from_dict(msg.transaction)]
+
+    def process(self, blockchain, node):
+        """
+        Add the batch transactions to the mempool, the batch keep only the added transactions (that are relayed)
+        """
+        print(f"Adding {len(self.transactions)} transactions")
+        self.transactions = blockchain.add_transactions(self.transactions)
+
+    def to_dict(self) -> dict:
+        return {"msg": super().to_dict(), "transactions": [t.to_dict() for t in self.transactions]}
+
+    def to_binary(self) -> bytes:
+        return b"".join([COUNT.pack(len(self.transactions)), *(encode_transaction(t) for t in self.transactions)])
+
+    @classmethod
+    def from_binary(cls, payload):
+        try:
+            (count,) = COUNT.unpack_from(payload)
+        except struct.error:
+            raise CodecError("invalid new transactions")
+        if COUNT.size + count * TRANSACTION.size > len(payload):
+            raise CodecError("new transactions are truncated", count=count)
+        offsets = range(COUNT.size, COUNT.size + count * TRANSACTION.size, TRANSACTION.size)
+        return cls([decode_transaction(payload, offset) for offset in offsets])
+
+    @classmethod
+    def from_dict(cls, dict_: dict):
+        msg_typ = dict_["msg"]["typ"]
+        if msg_typ != cls.typ:
+            raise TypeError(f"invalid message type '{msg_typ}' required '{cls.typ}'")
+        return cls(dict_["transactions"], **dict_["msg"])
+
+    def __str__(self) -> str:
+        return f"NewTransactions('ttl'={self.ttl}, 'transactions': {len(self.transactions)})"
@@ -1,8 +1,16 @@
+import struct
+
+from blockchain.exceptions import CodecError
+
 from .message import Message
 
+PORT = struct.Struct("!H")
+
 
 class PeerInfo(Message):
     typ = "peer-info"
+    typ_id = 3
+    gossip = True
 
     def __init__(self, addr, ttl=10, **kwargs) -> None:
         self.addr = addr
@@ -12,10 +20,27 @@ class PeerInfo(Message):
     def to_dict(self) -> dict:
         return {"msg": super().to_dict(), "addr": self.addr}
 
+    def to_binary(self) -> bytes:
+        host = self.addr[0].encode()
+        try:
+            return bytes([len(host)]) + host + PORT.pack(int(self.addr[1]))
+        except (ValueError, struct.error):
+            raise CodecError("invalid peer address", addr=self.addr)
+
     def process(self, blockchain, node):
         print("adding peer info", self.addr)
         node.nodes.add(tuple(self.addr))
 
+    @classmethod
+    def from_binary(cls, payload):
+        try:
+            host_length = payload[0]
+            host = bytes(payload[1: 1 + host_length]).decode()
+            (port,) = PORT.unpack_from(payload, 1 + host_length)
+        except (IndexError, UnicodeDecodeError, struct.error):
+            raise CodecError("invalid peer info")
+        return cls([host, port])
+
     @classmethod
     def from_dict(cls, dict_: dict):
         msg_typ = dict_["msg"]["typ"]
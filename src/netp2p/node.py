@@ -1,17 +1,37 @@
+"""
+Node run the p2p networking on one asyncio event loop (in the node thread)
+all the inbound connections (server) and the outbound connections (clients) are handled on the loop,
+messages processing (chain validation) is offloaded to executor so it doesn't block the I/O
+
+messages to relay are sent as soon as they are added (broadcast or processed event message wake the loop),
+after every send the loop wait RELAY_FLUSH_INTERVAL so under load the messages are coalesced to one send
+and the transactions of the flush are relayed as one NewTransactions batch,
+connecting to new peers and broadcasting the node address run on their own timers
+"""
+import asyncio
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from threading import Thread
-from time import sleep
-from typing import List, Set, Tuple
+from typing import Callable, Deque, List, Optional, Set, Tuple, Union
 
-from .server import Server, RequestHandler
+from blockchain.block import Block
+
+from .server import Server
 from .processor import Processor
 from .client import Client
-from .messages import PeerInfo, BlocksRequest
+from .sync import BlockDownloader, HeadersFirstDownloader
+from .compact import CompactBlocks
+from .messages import PeerInfo, NewBlock, CompactBlock, NewTransactions
 from .messages.message import Message
+from .frame import Frame
 from .config import (
-    HEARTBEAT_RATE,
-    CONNECT_EVERY_X_HEARBEATS,
-    BROADCAST_ADDR_EVERY_X_HEARTBEATS,
+    RELAY_FLUSH_INTERVAL,
+    CONNECT_INTERVAL,
+    BROADCAST_ADDR_INTERVAL,
     BOOTSTRAP_LIST,
+    PROCESS_WORKERS,
+    COMPACT_BLOCK_RELAY,
+    SYNC_HEADERS_FIRST,
 )
 
 
@@ -21,60 +41,148 @@ class Node(Thread):
         self.blockchain = blockchain
         self.processor = Processor(blockchain, self)
         self.nodes: Set[Tuple[str, int]] = set()
+        self.compact_blocks = CompactBlocks()
         self.clients: List[Client] = []
+        self.executor = ThreadPoolExecutor(
+            max_workers=PROCESS_WORKERS, thread_name_prefix="node-processor"
+        )
         self.server = Server(
             ("0.0.0.0", self.port),
-            RequestHandlerClass=RequestHandler,
-            bind_and_activate=True,
             processor=self.processor,
+            executor=self.executor,
         )
+        self.loop = asyncio.new_event_loop()
 
         self.__loaded_bootstrap_nodes = False
-        self._to_relay: List[bytes] = []
+        self._to_relay: Deque[Message] = deque()  # appended from other threads, taken on the loop
+        self._relay_ready: Optional[asyncio.Event] = None  # created on the node loop
+        self._download: Optional[asyncio.Future] = None
         self.__stop = False
 
         super().__init__(name="node", daemon=True)
 
+    def broadcast_block(self, block: Block):
+        """Broadcast new block (as compact block if COMPACT_BLOCK_RELAY is set)"""
+        self.broadcast(CompactBlock.from_block(block) if COMPACT_BLOCK_RELAY else NewBlock(block))
+
     def broadcast(self, msg):
         """Broadcast message to peers"""
-        self._to_relay.append(msg.to_bytes())
+        if isinstance(msg, CompactBlock) and msg.block is not None:
+            self.compact_blocks.add_block(msg.block)  # serve the transactions that the peers are missing
+        self.processor.mark_seen(msg)
+        self._to_relay.append(msg)
+        self.notify_relay()
+
+    def notify_relay(self):
+        """Wake the node loop to send the relay messages (can be called from any thread)"""
+        try:
+            self.loop.call_soon_threadsafe(self._wake_relay)
+        except RuntimeError:
+            pass  # the loop is closed
+
+    def _wake_relay(self):
+        if self._relay_ready is not None:
+            self._relay_ready.set()
 
     def load_history(self, from_index: int):
-        """Initial block download
+        """Initial block download (chunks of blocks from all the known peers, see sync.py)
         from_index: the index of the block to start downloading from
         """
         self._load_bootstarp_nodes()
-        blocks_request_message = BlocksRequest(
-            1, None
-        )  # All the blocks after the genesis block
-        self._connect(
-            initial_message=blocks_request_message, max_connections=1
-        )  # download_blocks
+        self.loop.call_soon_threadsafe(self._start_download, from_index)
 
-    def run(self):
-        """Send updates to connected peers every heartbeat 1/s"""
+    def _start_download(self, from_index: int):
+        peers = [node for node in self.nodes if not self._is_me(node)]
+        downloader_class = HeadersFirstDownloader if SYNC_HEADERS_FIRST else BlockDownloader
+        downloader = downloader_class(
+            self.blockchain, peers, from_index, executor=self.executor, request=self.request
+        )
+        self._download = asyncio.ensure_future(self._download_history(downloader))
 
-        Thread(
-            target=lambda: self.server.serve_forever(poll_interval=0.5), daemon=True
-        ).start()  # Run the server
+    async def _download_history(self, downloader: Union[BlockDownloader, HeadersFirstDownloader]):
+        next_index = await downloader.run()
+        status = "failed" if downloader.failed else "completed"
+        print(f"blocks download {status}, next block index {next_index}")
+
+    def run(self):
+        """Run the event loop (server, clients and heartbeat)"""
+        asyncio.set_event_loop(self.loop)
+        try:
+            self.loop.run_until_complete(self._run())
+        finally:
+            self.loop.close()
+            self.executor.shutdown(wait=False)
+
+    async def _run(self):
+        """Send the relay messages to connected peers as soon as they are added"""
+        self._relay_ready = asyncio.Event()
+        self._relay_ready.set()  # messages that were broadcast before the loop started
+        await self.server.start()
 
         self._load_bootstarp_nodes()
 
-        heartbeat = 0
-        while not self.__stop:
-            relay_messages = self._to_relay.copy()
-            self._to_relay.clear()
-            heartbeat += 1
-            sleep(HEARTBEAT_RATE)
-            if heartbeat % CONNECT_EVERY_X_HEARBEATS == 0 and self._need_to_connect():
-                self._connect(
-                    initial_message=PeerInfo(["127.0.0.1", self.port])
-                )  # get updates
-            if heartbeat % BROADCAST_ADDR_EVERY_X_HEARTBEATS == 0:
-                relay_messages.append(PeerInfo(["127.0.0.1", self.port]).to_bytes())
-            relay_messages.extend(self.processor.relay_messages)
+        timers = [
+            asyncio.ensure_future(self._every(CONNECT_INTERVAL, self._connect_to_peers)),
+            asyncio.ensure_future(self._every(BROADCAST_ADDR_INTERVAL, self._broadcast_addr)),
+        ]
+        try:
+            while not self.__stop:
+                await self._relay_ready.wait()
+                self._relay_ready.clear()
+                self._flush_relay()
+                await asyncio.sleep(RELAY_FLUSH_INTERVAL)  # coalesce the messages that are added meanwhile
+        finally:
+            for timer in timers:
+                timer.cancel()
+            await asyncio.gather(*timers, return_exceptions=True)
+        for client in self.clients:
+            client.stop()
+        if self._download is not None:
+            self._download.cancel()
+        await self.server.shutdown()
+
+    def _flush_relay(self):
+        relay_messages = []
+        while self._to_relay:
+            relay_messages.append(self._to_relay.popleft())
+        relay_messages.extend(self.processor.relay_messages)
+        relay_messages = NewTransactions.batch(relay_messages)  # one message for the transactions of this flush
+        if relay_messages:
             self.server.send(relay_messages)
-        self.server.shutdown()
+            for client in self.clients:
+                if client.session is not None:
+                    client.session.send(relay_messages)
+
+    async def request(self, addr: Tuple[str, int], message: Message) -> Frame:
+        """
+        Send request to peer on the peer session (new outbound connection is opened if there is none)
+        :param addr: peer address
+        :param message: request message
+        :return: response frame
+        :raise ConnectionError: if the peer is not reachable
+        """
+        client = next((c for c in self.clients if c.addr == addr and c.is_alive()), None)
+        if client is None:
+            client = self._new_client(addr, PeerInfo(["127.0.0.1", self.port]))
+            client.start()
+        session = await client.connected()
+        return await session.request(message)
+
+    @staticmethod
+    async def _every(interval: float, callback: Callable[[], None]):
+        while True:
+            await asyncio.sleep(interval)
+            callback()
+
+    def _connect_to_peers(self):
+        if self._need_to_connect():
+            self._connect(
+                initial_message=PeerInfo(["127.0.0.1", self.port])
+            )  # get updates
+
+    def _broadcast_addr(self):
+        self._to_relay.append(PeerInfo(["127.0.0.1", self.port]))
+        self._wake_relay()
 
     def _load_bootstarp_nodes(self):
         if self.__loaded_bootstrap_nodes:
@@ -89,14 +197,8 @@ class Node(Thread):
 
     def _need_to_connect(self) -> bool:
         """Check if the node have less then 8 active connections and remove inactive clients"""
-        c = 0
-        for i in range(0, len(self.clients) - 1):
-            client = self.clients[i]
-            if client.is_alive():
-                c += 1
-            else:
-                self.clients.pop(i)
-        return c < 8
+        self.clients = [client for client in self.clients if client.is_alive()]
+        return len(self.clients) < 8
 
     def _connected_to(self, addr) -> bool:
         return any(
@@ -107,20 +209,26 @@ class Node(Thread):
         return addr[1] == self.port
 
     def _connect(self, initial_message: Message, max_connections: int = 8):
-        """Connect to other peers on the network"""
+        """Connect to other peers on the network (the clients are started on the event loop)"""
 
         for _, node in zip(range(0, max_connections), self.nodes):
             if self._is_me(node) or self._connected_to(node):
                 continue
             print("connecting to node", node)
-            client = Client(
-                addr=node,
-                initial_message=initial_message,
-                processor=self.processor,
-                server_port=self.port,
-            )
-            client.start()
-            self.clients.append(client)
+            client = self._new_client(node, initial_message)
+            self.loop.call_soon_threadsafe(client.start)
+
+    def _new_client(self, addr: Tuple[str, int], initial_message: Message) -> Client:
+        client = Client(
+            addr=addr,
+            initial_message=initial_message,
+            processor=self.processor,
+            server_port=self.port,
+            executor=self.executor,
+        )
+        self.clients.append(client)
+        return client
 
     def stop(self):
         self.__stop = True
+        self.notify_relay()
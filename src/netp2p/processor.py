@@ -1,12 +1,39 @@
-from typing import Dict, List
-import json
+from collections import deque
+from typing import Deque, Dict, List, Optional
 
-from .messages import NewBlock, NewTransaction, PeerInfo, BlocksRequest, BlocksResponse
+from .config import CODECS
+from .frame import Frame, FRAME_HEADER, encode_frame
+from .messages import (
+    NewBlock,
+    NewTransaction,
+    NewTransactions,
+    PeerInfo,
+    BlocksRequest,
+    BlocksResponse,
+    CompactBlock,
+    GetBlockTransactions,
+    BlockTransactions,
+    HeadersRequest,
+    HeadersResponse,
+)
 from .messages.message import Message
+from .seen_cache import SeenCache
 
-types: Dict[str, Message] = {
-    clss.typ: clss  # type: ignore
-    for clss in [NewBlock, NewTransaction, PeerInfo, BlocksRequest, BlocksResponse]
+types: Dict[int, Message] = {
+    clss.typ_id: clss  # type: ignore
+    for clss in [
+        NewBlock,
+        NewTransaction,
+        NewTransactions,
+        PeerInfo,
+        BlocksRequest,
+        BlocksResponse,
+        CompactBlock,
+        GetBlockTransactions,
+        BlockTransactions,
+        HeadersRequest,
+        HeadersResponse,
+    ]
 }
 
 
@@ -14,38 +41,54 @@ class Processor:
     def __init__(self, blockchain, node) -> None:
         self.chain = blockchain
         self.node = node
-        self._to_relay: List[bytes] = []
+        self._to_relay: Deque[Message] = deque()  # appended in the executor, taken on the node loop
+        self.seen = SeenCache()
 
-    def process(self, msg: bytes):
+    def process(self, frame: Frame) -> Optional[Message]:
         """There is tow types of messages
         1. 'event' message brodcasted to me to be proccessed and broadcast forward (if ttl > 1)
-        2. 'request' message that have a response and do not broadcasted forward
+        2. 'request' message that have a response (reply message) and do not broadcasted forward
         """
-        msg_str: str = msg.decode()
-        msg_dict: dict = json.loads(msg_str)
-
-        msg_typ = msg_dict["msg"]["typ"]
-        msg_cls = types.get(msg_typ, None)
+        msg_cls = types.get(frame.typ_id, None)
         if msg_cls is None:
-            print("unsupported message", msg_typ)
-            return
-        msg_obj: Message = msg_cls.from_dict(msg_dict)
+            print("unsupported message", frame.typ_id)
+            return None
+        if msg_cls.gossip and self.seen.seen(frame.typ_id, frame.payload):
+            return None  # duplicate, already processed and relayed
+        msg_obj: Message = msg_cls.from_bytes(frame.payload, ttl=frame.ttl, codec=frame.codec)
         print("preccessed msg", msg_obj)
 
         reply = msg_obj.process(self.chain, self.node)
         if reply is not None:  # is a request message
             return reply
 
-        self._relay(msg_obj)  # is an event message
+        self._relay(msg_obj, frame)  # is an event message
+        return None
+
+    def mark_seen(self, msg: Message):
+        """
+        Remember message that this node created, so it's dropped when it's relayed back
+        (the message frames are encoded for every codec and cached in the message for the broadcast)
+        """
+        if not msg.gossip:
+            return
+        for codec in CODECS:
+            self.seen.seen(msg.typ_id, memoryview(msg.to_frame(codec))[FRAME_HEADER.size:])
 
-    def _relay(self, o_msg: Message):
-        o_msg.ttl -= 1
+    def _relay(self, o_msg: Message, frame: Frame):
+        """Relay the message with lower ttl (the received payload is reused unless the processing changed it)"""
+        o_msg.ttl = frame.ttl - 1
         if o_msg.ttl <= 0:
             return
-        self._to_relay.append(o_msg.to_bytes())
+        if o_msg.relay_payload:
+            o_msg.add_frame(frame.codec, encode_frame(frame.codec, frame.typ_id, o_msg.ttl, frame.payload))
+        self._to_relay.append(o_msg)
+        if self.node is not None:
+            self.node.notify_relay()
 
     @property
-    def relay_messages(self) -> list:
-        res = self._to_relay.copy()
-        self._to_relay.clear()
+    def relay_messages(self) -> List[Message]:
+        res = []
+        while self._to_relay:
+            res.append(self._to_relay.popleft())
         return res
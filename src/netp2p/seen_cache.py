@@ -0,0 +1,142 @@
+"""
+SeenCache is a time bounded LRU cache of the gossip messages that were already received
+
+in a connected network the same event message (new block, new transaction) is received from many peers,
+the cache key is hash of the message type id and the frame payload, so duplicate message is dropped
+before the payload is decoded and validated (the ttl is in the frame header so relayed frames have the same key)
+
+bloom filter is checked before the LRU, most of the received messages are new and the bloom filter
+answer "not seen" for them without touching the LRU dict,
+the bloom filter can't remove keys so there are two generations (current and previous),
+the generations rotate every ttl seconds and the LRU entries that were not seen in the last ttl seconds expire,
+every key in the LRU is in one of the generations (bloom negative is always correct)
+"""
+import hashlib
+import math
+import struct
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+from typing import Union
+
+from .config import SEEN_CACHE_SIZE, SEEN_CACHE_TTL, SEEN_CACHE_FALSE_POSITIVE_RATE
+
+__all__ = ["BloomFilter", "SeenCache"]
+
+Payload = Union[bytes, memoryview]
+
+KEY_SIZE = 16
+_HASHES = struct.Struct("!4I")  # the key is split to 4 hash values
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, false_positive_rate: float):
+        """
+        :param capacity: expected number of keys
+        :param false_positive_rate: false positive rate when the filter contain capacity keys
+        """
+        self.size = max(8, int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key: bytes):
+        """
+        Double hashing (h1 + i * h2) of the 16 bytes key
+        """
+        a, b, c, d = _HASHES.unpack(key)
+        h1, h2 = (a << 32) | b, (c << 32) | d | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, key: bytes):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: bytes) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class SeenCache:
+    def __init__(
+        self,
+        max_size: int = SEEN_CACHE_SIZE,
+        ttl: float = SEEN_CACHE_TTL,
+        false_positive_rate: float = SEEN_CACHE_FALSE_POSITIVE_RATE,
+    ):
+        """
+        :param max_size: maximum number of cached messages
+        :param ttl: seconds a message is remembered after it was last seen
+        :param false_positive_rate: bloom filter false positive rate (false positive is checked in the LRU)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.false_positive_rate = false_positive_rate
+        self.duplicates = 0  # suppressed messages
+        self.unique = 0
+        self.bloom_false_positives = 0  # bloom filter hit of key that isn't in the LRU (or was evicted from it)
+        self._cache: OrderedDict = OrderedDict()  # {key: last seen time}, ordered by last seen time
+        self._current = BloomFilter(max_size, false_positive_rate)
+        self._previous = BloomFilter(max_size, false_positive_rate)
+        self._rotated_at = monotonic()
+        self._lock = Lock()
+
+    @staticmethod
+    def key(typ_id: int, payload: Payload) -> bytes:
+        """
+        :return: message content hash
+        """
+        digest = hashlib.blake2b(bytes((typ_id,)), digest_size=KEY_SIZE)
+        digest.update(payload)
+        return digest.digest()
+
+    def seen(self, typ_id: int, payload: Payload) -> bool:
+        """
+        Check if the message was seen and remember it
+        :param typ_id: message type id
+        :param payload: message payload
+        :return: True if the message was seen in the last ttl seconds (duplicate)
+        """
+        key = self.key(typ_id, payload)
+        now = monotonic()
+        with self._lock:
+            self._expire(now)
+            in_bloom = key in self._current or key in self._previous
+            if in_bloom and key in self._cache:
+                self._cache[key] = now
+                self._cache.move_to_end(key)
+                self._current.add(key)  # the key must stay in the bloom filter while it's in the LRU
+                self.duplicates += 1
+                return True
+            if in_bloom:
+                self.bloom_false_positives += 1
+            self._cache[key] = now
+            self._current.add(key)
+            if len(self._cache) > self.max_size:
+                self._cache.popitem(last=False)
+            self.unique += 1
+            return False
+
+    def _expire(self, now: float):
+        expired = now - self.ttl
+        while self._cache:
+            key, last_seen = next(iter(self._cache.items()))
+            if last_seen >= expired:
+                break
+            del self._cache[key]
+        if now - self._rotated_at >= self.ttl:
+            # the keys that were only in the previous generation were not seen for more than ttl (expired)
+            self._previous = self._current
+            self._current = BloomFilter(self.max_size, self.false_positive_rate)
+            self._rotated_at = now
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
+            self._current = BloomFilter(self.max_size, self.false_positive_rate)
+            self._previous = BloomFilter(self.max_size, self.false_positive_rate)
+            self._rotated_at = monotonic()
+            self.duplicates = 0
+            self.unique = 0
+            self.bloom_false_positives = 0
+
+    def __len__(self) -> int:
+        return len(self._cache)
@@ -0,0 +1,140 @@
+"""
+SendQueue is the outbound buffer of one peer connection
+
+the relayed messages are encoded (once per codec, the frames are cached in the message) and queued without
+blocking, the queue task write all the queued frames together and wait for the peer to read them,
+so slow peer only fill its own queue and never delay the relay to the other peers
+
+the queue is bounded by bytes (the queued frames and the frames that are written but not drained yet),
+message that doesn't fit is dropped (DROP policy) or the peer is disconnected (DISCONNECT policy),
+requests and replies are never dropped (only the relayed messages),
+peer that didn't read anything for stall_timeout seconds while frames are waiting is disconnected by the server
+"""
+import asyncio
+from collections import deque
+from time import monotonic
+from typing import Deque, Dict
+
+from .config import PEER_QUEUE_MAX_BYTES, PEER_OVERFLOW_POLICY, PEER_STALL_TIMEOUT, DROP, DISCONNECT
+from .messages.message import Message
+
+__all__ = ["SendQueue", "DROP", "DISCONNECT"]
+
+
+class SendQueue:
+    def __init__(
+        self,
+        writer: asyncio.StreamWriter,
+        codec: int,
+        max_bytes: int = PEER_QUEUE_MAX_BYTES,
+        overflow_policy: str = PEER_OVERFLOW_POLICY,
+        stall_timeout: float = PEER_STALL_TIMEOUT,
+    ) -> None:
+        """
+        :param writer: peer connection writer
+        :param codec: the connection payload codec
+        :param max_bytes: maximum pending bytes (frame bigger than max_bytes is queued only to empty queue)
+        :param overflow_policy: DROP the message or DISCONNECT the peer when the queue is full
+        :param stall_timeout: seconds without progress before the peer is considered stalled
+        """
+        if overflow_policy not in (DROP, DISCONNECT):
+            raise ValueError(f"invalid overflow policy {overflow_policy}")
+        self.writer = writer
+        self.codec = codec
+        self.max_bytes = max_bytes
+        self.overflow_policy = overflow_policy
+        self.stall_timeout = stall_timeout
+
+        self.pending_bytes = 0  # queued and written but not drained
+        self.sent_messages = 0
+        self.sent_bytes = 0
+        self.dropped_messages = 0
+        self.dropped_bytes = 0
+        self.closed = False
+        self.last_progress = monotonic()
+        self._frames: Deque[bytes] = deque()
+        self._writing = 0  # frames written and waiting for drain
+        self._ready = asyncio.Event()
+
+    def put(self, msg: Message) -> bool:
+        """
+        Queue message without blocking
+        :param msg: message to send
+        :return: True if the message was queued, False if it was dropped
+        """
+        if self.closed:
+            return False
+        return self.put_frame(msg.to_frame(self.codec))
+
+    def put_frame(self, frame: bytes, droppable: bool = True) -> bool:
+        """
+        Queue encoded frame without blocking
+        :param frame: frame bytes
+        :param droppable: False for frame that is queued even if the queue is full (request or reply)
+        :return: True if the frame was queued, False if it was dropped
+        """
+        if self.closed:
+            return False
+        if droppable and self.pending_bytes and self.pending_bytes + len(frame) > self.max_bytes:
+            self.dropped_messages += 1
+            self.dropped_bytes += len(frame)
+            if self.overflow_policy == DISCONNECT:
+                self.close()
+            return False
+        if not self.pending_bytes:
+            self.last_progress = monotonic()  # the queue was idle, the stall time start now
+        self._frames.append(frame)
+        self.pending_bytes += len(frame)
+        self._ready.set()
+        return True
+
+    def stalled(self, now: float) -> bool:
+        """
+        :return: True if frames are waiting and the peer didn't read for stall_timeout seconds
+        """
+        return self.pending_bytes > 0 and now - self.last_progress > self.stall_timeout
+
+    async def run(self):
+        """
+        Write the queued frames until the queue is closed
+        :raise ConnectionError: if the connection is lost
+        """
+        while not self.closed:
+            if not self._frames:
+                self._ready.clear()
+                await self._ready.wait()
+                continue
+            frames = list(self._frames)
+            self._frames.clear()
+            self._writing = len(frames)
+            self.writer.writelines(frames)
+            await self.writer.drain()
+            size = sum(len(frame) for frame in frames)
+            self._writing = 0
+            self.pending_bytes -= size
+            self.sent_bytes += size
+            self.sent_messages += len(frames)
+            self.last_progress = monotonic()
+
+    def close(self):
+        """
+        Disconnect the peer (the pending frames are discarded)
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self._ready.set()
+        self.writer.transport.abort()
+
+    def metrics(self) -> Dict[str, int]:
+        return {
+            "depth": len(self),
+            "pending_bytes": self.pending_bytes,
+            "sent_messages": self.sent_messages,
+            "sent_bytes": self.sent_bytes,
+            "dropped_messages": self.dropped_messages,
+            "dropped_bytes": self.dropped_bytes,
+        }
+
+    def __len__(self) -> int:
+        return len(self._frames) + self._writing
@@ -1,63 +1,87 @@
-from typing import List, Tuple, Callable
+import asyncio
+from concurrent.futures import Executor
+from typing import Dict, List, Optional, Set, Tuple
 
-from socketserver import ThreadingTCPServer, BaseRequestHandler
-from queue import Queue
+from blockchain.exceptions import BlockChainError
 
-from .config import SERVER_RECV_BATCH, MESSAGE_DELIMITER
+from .frame import FrameError
+from .messages.message import Message
+from .session import Session
 
 
-class Server(ThreadingTCPServer):
+class Server:
     def __init__(
         self,
         server_address: Tuple[str, int],
-        RequestHandlerClass: Callable[..., BaseRequestHandler],
-        bind_and_activate: bool,
         processor,
+        executor: Optional[Executor] = None,
     ) -> None:
+        """
+        Inbound connections server, all the connections are handled on the node event loop
+        :param server_address: listening address
+        :param processor: messages processor (called in the executor)
+        :param executor: executor of the messages processing (None for the loop default executor)
+        """
         self.s_addr = server_address
         self.processor = processor
+        self.executor = executor
 
-        self.finished_queues: List[Queue] = []
-        self.queues: List[Queue] = []
-
-        super().__init__(
-            server_address, RequestHandlerClass, bind_and_activate=bind_and_activate
-        )
-
-    def send(self, msgs: list):
-        for q in self.queues:
-            for msg in msgs:
-                q.put(msg)
-        fqs = self.finished_queues.copy()
-        self.finished_queues.clear()
-        for fq in fqs:
-            self.queues.remove(fq)
-
-
-class RequestHandler(BaseRequestHandler):
-    def __init__(self, request, client_address: Tuple[str, int], server) -> None:
-        self.sock = request
-        self.c_addr = client_address
-        self.server: Server = server
-
-        self.q: Queue = Queue(maxsize=10000)
-        self.server.queues.append(self.q)
-        super().__init__(request, client_address, server)
-
-    def handle(self) -> None:
-        print("new connection from", self.c_addr)
-        msg = self.sock.recv(SERVER_RECV_BATCH)
-        reply = self.server.processor.process(msg)
-        if reply is not None:
-            self.sock.send(reply)
-            return  # Stop communication after response
-
-        while True:
-            msg = self.q.get()
-            try:
-                self.sock.send(msg + MESSAGE_DELIMITER)
-            except BrokenPipeError:
-                break
-
-    def finish(self) -> None:
-        self.server.finished_queues.append(self.q)
+        self.sessions: Dict[Tuple[str, int], Session] = {}  # {peer address: session}
+        self._handlers: Set[asyncio.Future] = set()  # connection handler tasks
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._accept, *self.s_addr)
+
+    def _accept(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        handler = asyncio.ensure_future(self.handle(reader, writer))
+        self._handlers.add(handler)
+        handler.add_done_callback(self._handlers.discard)
+
+    @property
+    def address(self) -> Tuple[str, int]:
+        """
+        :return: the bound address (the real port when listening on port 0)
+        """
+        return self._server.sockets[0].getsockname()[:2]  # type: ignore
+
+    def send(self, msgs: List[Message]):
+        """
+        Queue messages to every connected peer without blocking (must be called from the event loop)
+        every message is encoded once for every codec, stalled peers are disconnected
+        """
+        for session in list(self.sessions.values()):
+            session.send(msgs)
+
+    def metrics(self) -> Dict[Tuple[str, int], Dict[str, int]]:
+        """
+        :return: send queue metrics of every connected peer (depth, pending bytes, sent and dropped)
+        """
+        return {peer: session.queue.metrics() for peer, session in self.sessions.items()}
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        session = Session(reader, writer, self.processor, self.executor)
+        print("new connection from", session.addr)
+        self.sessions[session.addr] = session
+        try:
+            await session.run()
+        except FrameError as e:
+            print(f"invalid frame from {session.addr}: {e}")
+        except BlockChainError as e:
+            print(f"invalid message from {session.addr}: {e}")
+        except ConnectionError:
+            pass
+        finally:
+            if self.sessions.get(session.addr) is session:
+                del self.sessions[session.addr]
+
+    async def shutdown(self):
+        """
+        Stop listening and close all the connections
+        """
+        if self._server is not None:
+            self._server.close()
+        handlers = list(self._handlers)
+        for handler in handlers:
+            handler.cancel()
+        await asyncio.gather(*handlers, return_exceptions=True)
@@ -0,0 +1,173 @@
+"""
+Session is long lived bidirectional peer connection (inbound or outbound)
+
+both peers send Hello when the connection is opened, after that every peer can send
+event messages (relayed messages, request id 0) and requests (request id != 0) at any time,
+the reply of a request is sent with the request id and the response flag, so many requests are waiting
+on the same connection together with the relayed messages
+
+the session has 3 tasks:
+1. read the frames, responses are passed to the waiting request and the other frames are queued to be processed
+2. process the received frames in order (on the executor), the reply is sent with the request id
+3. write the send queue (relayed messages, requests and replies)
+the session is closed when one of the tasks stop (connection closed, invalid frame or write error)
+
+message that can't be decoded or processed is dropped, the peer is disconnected after
+SESSION_MAX_INVALID_MESSAGES invalid messages
+"""
+import asyncio
+import struct
+from concurrent.futures import Executor
+from time import monotonic
+from typing import Dict, List, Optional
+
+from blockchain.codec import CODEC_JSON
+from blockchain.exceptions import BlockChainError
+
+from .config import CODECS, SESSION_INBOUND_FRAMES, SESSION_MAX_INVALID_MESSAGES
+from .frame import FLAG_RESPONSE, Frame, FrameDecoder, read_frame
+from .messages import Hello
+from .messages.message import Message
+from .send_queue import SendQueue
+
+__all__ = ["Session"]
+
+MAX_REQUEST_ID = 0xFFFFFFFF
+# errors of message that can't be decoded (e.g: bad JSON, missing keys) or is invalid for the chain
+INVALID_MESSAGE_ERRORS = (BlockChainError, ValueError, KeyError, TypeError, IndexError, struct.error)
+
+
+class Session:
+    def __init__(
+        self,
+        reader: asyncio.StreamReader,
+        writer: asyncio.StreamWriter,
+        processor=None,
+        executor: Optional[Executor] = None,
+    ) -> None:
+        """
+        Peer session, created on the node event loop
+        :param reader: connection reader
+        :param writer: connection writer
+        :param processor: messages processor (None to ignore the messages that are not responses)
+        :param executor: executor of the messages processing (None for the loop default executor)
+        """
+        self.addr = writer.get_extra_info("peername")
+        self.reader = reader
+        self.processor = processor
+        self.executor = executor
+        self.queue = SendQueue(writer, CODEC_JSON)  # the codec is negotiated with the peer hello
+        self.queue.put_frame(Hello(CODECS).to_frame(), droppable=False)
+        self._inbound: asyncio.Queue = asyncio.Queue(maxsize=SESSION_INBOUND_FRAMES)
+        self._requests: Dict[int, asyncio.Future] = {}  # {request id: future of the response frame}
+        self._last_request_id = 0
+        self.invalid_messages = 0
+
+    @property
+    def closed(self) -> bool:
+        return self.queue.closed
+
+    async def run(self):
+        """
+        Run the session until the connection is closed
+        :raise FrameError: if the peer sent invalid frame
+        :raise ConnectionError: if the connection is lost
+        """
+        tasks = [
+            asyncio.ensure_future(self._read()),
+            asyncio.ensure_future(self._process()),
+            asyncio.ensure_future(self.queue.run()),
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()  # raise the error that stopped the session
+        finally:
+            self.close()
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for future in self._requests.values():
+                if not future.done():
+                    future.set_exception(ConnectionError(f"session with {self.addr} closed"))
+
+    def send(self, msgs: List[Message]):
+        """
+        Queue messages to the peer without blocking (the messages are dropped if the peer is too slow)
+        stalled peer is disconnected
+        """
+        if self.queue.stalled(monotonic()):
+            print(f"disconnecting stalled peer {self.addr} ({self.queue.pending_bytes} bytes pending)")
+            self.close()
+            return
+        for msg in msgs:
+            self.queue.put(msg)
+
+    async def request(self, msg: Message) -> Frame:
+        """
+        Send request and wait for the peer response (cancel the call to stop waiting)
+        :param msg: request message
+        :return: response frame
+        :raise ConnectionError: if the session is closed before the response
+        """
+        if self.closed:
+            raise ConnectionError(f"session with {self.addr} is closed")
+        self._last_request_id = self._last_request_id % MAX_REQUEST_ID + 1
+        request_id = self._last_request_id
+        future = asyncio.get_event_loop().create_future()
+        self._requests[request_id] = future
+        try:
+            self.queue.put_frame(msg.to_frame(self.queue.codec, request_id=request_id), droppable=False)
+            return await future
+        finally:
+            self._requests.pop(request_id, None)
+
+    def close(self):
+        self.queue.close()
+
+    async def _read(self):
+        decoder = FrameDecoder()
+        while True:
+            frame = await read_frame(self.reader, decoder)
+            if frame is None:
+                return
+            if frame.typ_id == Hello.typ_id:
+                try:
+                    self.queue.codec = Hello.from_bytes(frame.payload, codec=frame.codec).choose_codec(CODECS)
+                except INVALID_MESSAGE_ERRORS as e:
+                    self._invalid_message(e)
+            elif frame.flags & FLAG_RESPONSE:
+                future = self._requests.get(frame.request_id)
+                if future is not None and not future.done():
+                    future.set_result(frame)
+            else:
+                await self._inbound.put(frame)  # wait (stop reading) when the processing is behind
+
+    async def _process(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            frame = await self._inbound.get()
+            if self.processor is None:
+                continue
+            try:
+                reply = await loop.run_in_executor(self.executor, self.processor.process, frame)
+            except INVALID_MESSAGE_ERRORS as e:
+                self._invalid_message(e)
+                continue
+            if reply is not None:
+                frame_bytes = reply.to_frame(
+                    self.queue.codec,
+                    request_id=frame.request_id,
+                    flags=FLAG_RESPONSE if frame.request_id else 0,
+                )
+                self.queue.put_frame(frame_bytes, droppable=False)
+
+    def _invalid_message(self, error: Exception):
+        """
+        Drop the invalid message and disconnect the peer if it sent too many invalid messages
+        """
+        self.invalid_messages += 1
+        print(f"invalid message from {self.addr}: {error!r}")
+        if self.invalid_messages >= SESSION_MAX_INVALID_MESSAGES:
+            print(f"disconnecting peer {self.addr} after {self.invalid_messages} invalid messages")
+            self.close()
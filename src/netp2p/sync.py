@@ -0,0 +1,504 @@
+"""
+Initial block download
+
+the blocks after the chain tip are requested in fixed size chunks (blocks range of SYNC_CHUNK_SIZE blocks),
+every peer has SYNC_REQUESTS_PER_PEER workers that take the next chunk to download,
+so the chunks are downloaded from all the peers in parallel (faster peer download more chunks)
+only chunks inside the window (SYNC_WINDOW chunks from the applied height) are requested,
+the downloaded blocks that wait to be applied are bounded by the window and not by the chain length
+the chunks are applied to the chain in order (on the executor) as soon as the next chunk arrives
+
+failed request (timeout, connection error or invalid blocks) put the chunk back to be downloaded by another peer,
+peer that failed SYNC_RETRIES times in a row is dropped,
+the download stop when all the peers were dropped or when a chunk failed on SYNC_RETRIES peers (or on all of them)
+the download end at the first chunk that isn't full (the peer chain tip)
+
+headers first sync (SYNC_HEADERS_FIRST) download the same way the headers chain (the blocks without transactions
+and the blocks hashes) and link check it, then download the blocks bodies from the peers that were not dropped,
+every bodies chunk is checked against the headers (the blocks hashes) and its signatures are verified on
+the executor as soon as it arrive, so bad peers are found before the chunk turn to be applied
+and the chunks are verified in parallel while the chain is updated in order,
+the peer that sent every headers chunk is recorded, bodies chunk that doesn't match the headers is blamed on the
+headers peer if the body block is signed by its forger and the header block hash isn't (the headers peer lied),
+then the bodies are applied until the false header and the headers are downloaded again from there
+without the headers peer, else the bodies peer is blamed
+"""
+import asyncio
+from concurrent.futures import Executor
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from blockchain.batch_verifier import BatchVerifier
+from blockchain.block import Block
+from blockchain.verifier import Verifier
+
+from .config import (
+    SYNC_CHUNK_SIZE,
+    SYNC_WINDOW,
+    SYNC_REQUESTS_PER_PEER,
+    SYNC_TIMEOUT,
+    SYNC_RETRIES,
+    SYNC_HEADERS_CHUNK_SIZE,
+)
+from .frame import Frame, FrameError
+from .messages import BlocksRequest, BlocksResponse, HeadersRequest, HeadersResponse
+from .messages.message import Message
+from .session import Session, INVALID_MESSAGE_ERRORS
+
+HASH_SIZE = 32  # Bytes, sha256 block hash
+
+Address = Tuple[str, int]
+Request = Callable[[Address, Message], Awaitable[Frame]]
+
+
+class InvalidResponseError(Exception):
+    pass
+
+
+class HeadersMismatchError(InvalidResponseError):
+    def __init__(self, message: str, index: int) -> None:
+        """
+        :param index: the index of the false header (the bodies peer sent the real block)
+        """
+        super().__init__(message)
+        self.index = index
+
+
+async def request(addr: Address, message: Message) -> Frame:
+    """
+    Send request message on a new session and close it after the reply
+    (the node send the requests on the peers persistent sessions, see Node.request)
+    :param addr: peer address
+    :param message: request message
+    :return: reply frame
+    :raise ConnectionError: if the connection was closed before the reply
+    """
+    reader, writer = await asyncio.open_connection(*addr)
+    session = Session(reader, writer)
+    task = asyncio.ensure_future(session.run())
+    try:
+        return await session.request(message)
+    finally:
+        session.close()
+        await asyncio.gather(task, return_exceptions=True)
+
+
+class BlockDownloader:
+    def __init__(
+        self,
+        blockchain,
+        peers: Iterable[Address],
+        start_index: int,
+        executor: Optional[Executor] = None,
+        chunk_size: int = SYNC_CHUNK_SIZE,
+        window: int = SYNC_WINDOW,
+        requests_per_peer: int = SYNC_REQUESTS_PER_PEER,
+        timeout: float = SYNC_TIMEOUT,
+        retries: int = SYNC_RETRIES,
+        request: Request = request,
+        end_index: Optional[int] = None,
+    ) -> None:
+        """
+        Download the blocks after the chain tip from the peers (run as task on the node event loop)
+        :param blockchain: chain to update
+        :param peers: peers addresses
+        :param start_index: the index of the first block to download
+        :param executor: executor of the responses decoding and the chain update (None for the loop default executor)
+        :param chunk_size: blocks per request
+        :param window: maximum number of chunks requested ahead of the applied height
+        :param requests_per_peer: concurrent requests to one peer
+        :param timeout: request timeout in seconds
+        :param retries: failed requests before a peer is dropped or the chunk fail the download
+        :param request: send request to peer and return the response frame
+        :param end_index: the index after the last block if it's already known (the blocks of known headers chain)
+        """
+        self.blockchain = blockchain
+        self.peers: Set[Address] = set(peers)
+        self.executor = executor
+        self.chunk_size = chunk_size
+        self.window = window
+        self.requests_per_peer = requests_per_peer
+        self.timeout = timeout
+        self.retries = retries
+        self.request = request
+
+        self.applied_index = start_index  # the index of the next block to apply
+        self.failed = not self.peers
+        self._next_chunk = start_index  # start of the next chunk to request
+        self._known_end = end_index is not None
+        self._end_index = end_index  # known when chunk that isn't full is received
+        self._retry: List[int] = []  # failed chunks, requested before the next chunks
+        self._downloaded: Dict[int, Tuple[Address, Message]] = {}  # {chunk start: (peer, response)}
+        self._chunk_failures: Dict[int, Set[Address]] = {}  # {chunk start: peers that failed it}
+        self._peer_failures: Dict[Address, int] = {}
+        self._changed: Optional[asyncio.Condition] = None  # notified on every download state change
+
+    @property
+    def done(self) -> bool:
+        return self.failed or (self._end_index is not None and self.applied_index >= self._end_index)
+
+    async def run(self) -> int:
+        """
+        Download and apply the blocks
+        :return: the index of the next block to download (chain height + 1 when the download is complete)
+        """
+        self._changed = asyncio.Condition()
+        workers = [
+            asyncio.ensure_future(self._worker(peer))
+            for peer in self.peers
+            for _ in range(self.requests_per_peer)
+        ]
+        try:
+            await self._apply_chunks()
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+        return self.applied_index
+
+    async def _apply_chunks(self):
+        loop = asyncio.get_event_loop()
+        changed: asyncio.Condition = self._changed  # type: ignore
+        while True:
+            async with changed:
+                await changed.wait_for(lambda: self.done or self.applied_index in self._downloaded)
+                if self.done:
+                    return
+                start = self.applied_index
+                peer, response = self._downloaded.pop(start)
+            try:
+                applied = await loop.run_in_executor(self.executor, self._apply, response)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:  # the chunk is requested again from another peer
+                print(f"blocks {start} from {peer} can't be applied: {e!r}")
+                applied = False
+            async with changed:
+                if applied:
+                    self.applied_index += self._size(response)
+                    self._applied(peer, start)
+                else:
+                    self._request_failed(peer, start)
+                changed.notify_all()
+
+    async def _worker(self, peer: Address):
+        loop = asyncio.get_event_loop()
+        changed: asyncio.Condition = self._changed  # type: ignore
+        while True:
+            async with changed:
+                await changed.wait_for(lambda: self.done or peer not in self.peers or self._has_chunk(peer))
+                if self.done or peer not in self.peers:
+                    return
+                start = self._take_chunk(peer)
+            try:
+                frame = await asyncio.wait_for(self.request(peer, self._request_message(start)), self.timeout)
+                response = await loop.run_in_executor(self.executor, self._decode, frame, start)
+            except (asyncio.TimeoutError, OSError, FrameError, InvalidResponseError, *INVALID_MESSAGE_ERRORS) as e:
+                print(f"blocks request {start} from {peer} failed: {e!r}")
+                async with changed:
+                    self._invalid_response(peer, start, e)
+                    changed.notify_all()
+                continue
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:  # the chunk is never lost, one bad peer can't stall the download
+                print(f"blocks request {start} from {peer} failed with unexpected error: {e!r}")
+                async with changed:
+                    self._invalid_response(peer, start, e)
+                    changed.notify_all()
+                continue
+            async with changed:
+                self._peer_failures[peer] = 0
+                self._received(peer, start, response)
+                changed.notify_all()
+
+    def _request_message(self, start: int) -> Message:
+        return BlocksRequest(start, start + self.chunk_size)
+
+    def _decode(self, frame: Frame, start: int) -> Message:
+        """
+        Decode and check the chunk response (run on the executor),
+        the blocks objects are built here so malformed block fail the peer request and not the chunk apply
+        :param frame: response frame
+        :param start: the chunk start
+        :raise InvalidResponseError: if the response is not valid chunk
+        """
+        if frame.typ_id != BlocksResponse.typ_id:
+            raise InvalidResponseError(f"unexpected reply type {frame.typ_id}")
+        response = BlocksResponse.from_bytes(frame.payload, codec=frame.codec)
+        if len(response.blocks) > self.chunk_size:
+            raise InvalidResponseError(f"too many blocks ({len(response.blocks)})")
+        try:
+            response.blocks = [b if isinstance(b, Block) else Block.from_dict(b) for b in response.blocks]
+        except INVALID_MESSAGE_ERRORS as e:
+            raise InvalidResponseError(f"malformed block ({e!r})")
+        return response
+
+    def _apply(self, response) -> bool:
+        """
+        Apply the next chunk (run on the executor)
+        :return: False if the chunk is invalid
+        """
+        return response.apply(self.blockchain)
+
+    def _applied(self, peer: Address, start: int):
+        """
+        Called after the chunk was applied
+        :param peer: the peer that sent the chunk
+        :param start: the chunk start
+        """
+
+    @staticmethod
+    def _size(response) -> int:
+        return len(response.blocks)
+
+    def _past_end(self, start: int) -> bool:
+        return self._end_index is not None and start >= self._end_index
+
+    def _retry_chunks(self, peer: Address) -> List[int]:
+        """
+        :return: failed chunks the peer can retry (every chunk is retried by another peer)
+        """
+        self._retry = [start for start in self._retry if self.applied_index <= start and not self._past_end(start)]
+        return [start for start in self._retry if peer not in self._chunk_failures[start]]
+
+    def _has_chunk(self, peer: Address) -> bool:
+        if self._retry_chunks(peer):
+            return True
+        in_window = self._next_chunk < self.applied_index + self.window * self.chunk_size
+        return in_window and not self._past_end(self._next_chunk)
+
+    def _take_chunk(self, peer: Address) -> int:
+        retry_chunks = self._retry_chunks(peer)
+        if retry_chunks:
+            self._retry.remove(retry_chunks[0])
+            return retry_chunks[0]
+        start = self._next_chunk
+        self._next_chunk += self.chunk_size
+        return start
+
+    def _received(self, peer: Address, start: int, response):
+        if start < self.applied_index or self._past_end(start):
+            return  # duplicate or after the tip
+        if self._size(response) < self.chunk_size:
+            self._truncate(start + self._size(response))
+        self._downloaded[start] = (peer, response)
+
+    def _truncate(self, end_index: int):
+        """
+        End the download at the end index (the downloaded chunks after it are dropped)
+        """
+        self._end_index = end_index if self._end_index is None else min(self._end_index, end_index)
+        for chunk in [chunk for chunk in self._downloaded if self._past_end(chunk)]:
+            del self._downloaded[chunk]
+
+    def _invalid_response(self, peer: Address, start: int, error: Exception):
+        """
+        Called when the chunk request failed or the response is invalid
+        :param error: the request error
+        """
+        self._request_failed(peer, start)
+
+    def _request_failed(self, peer: Address, start: int):
+        if not self._known_end and self._end_index is not None and start < self._end_index <= start + self.chunk_size:
+            # the chunk that set the tip is invalid, the tip isn't known anymore
+            self._end_index = None
+            self._next_chunk = start + self.chunk_size
+        self._peer_failures[peer] = self._peer_failures.get(peer, 0) + 1
+        if self._peer_failures[peer] >= self.retries:
+            print(f"dropping peer {peer} from the download")
+            self.peers.discard(peer)
+        failed_peers = self._chunk_failures.setdefault(start, set())
+        failed_peers.add(peer)
+        if len(failed_peers) >= self.retries or self.peers <= failed_peers:
+            self.failed = True
+        self._retry.append(start)
+        self._retry.sort()
+
+
+class HeaderDownloader(BlockDownloader):
+    def __init__(self, blockchain, peers: Iterable[Address], start_index: int, **kwargs) -> None:
+        """
+        Download the headers chain after the chain tip and link check it (see BlockDownloader for the parameters)
+        :param start_index: the index after the chain tip
+        """
+        kwargs.setdefault("chunk_size", SYNC_HEADERS_CHUNK_SIZE)
+        super().__init__(blockchain, peers, start_index, **kwargs)
+        self.headers: List[Tuple[Block, str]] = []  # the linked headers chain (header, block hash)
+        self.sources: Dict[int, Address] = {}  # {chunk start: the peer that sent the linked headers}
+        self._tip_hash: str = blockchain.blocks[-1].hash
+
+    def headers_peer(self, index: int) -> Address:
+        """
+        :param index: the index of linked header
+        :return: the peer that sent the header
+        """
+        return self.sources[max(start for start in self.sources if start <= index)]
+
+    def _request_message(self, start: int) -> Message:
+        return HeadersRequest(start, start + self.chunk_size)
+
+    def _decode(self, frame: Frame, start: int) -> Message:
+        if frame.typ_id != HeadersResponse.typ_id:
+            raise InvalidResponseError(f"unexpected reply type {frame.typ_id}")
+        response = HeadersResponse.from_bytes(frame.payload, codec=frame.codec)
+        if len(response.headers) > self.chunk_size:
+            raise InvalidResponseError(f"too many headers ({len(response.headers)})")
+        return response
+
+    def _apply(self, response) -> bool:
+        """
+        Link the next headers to the headers chain (index, previous hash, signed header without transactions),
+        the block hash and the signature cover the transactions so they are verified with the bodies
+        :return: False if the headers don't link to the headers chain
+        """
+        previous_hash = self.headers[-1][1] if self.headers else self._tip_hash
+        index = self.applied_index
+        for header, block_hash in response.headers:
+            if (
+                header.index != index
+                or header.previous_hash != previous_hash
+                or header.transactions
+                or not header.is_signed
+                or len(block_hash) != 2 * HASH_SIZE
+            ):
+                return False
+            previous_hash = block_hash
+            index += 1
+        self.headers.extend(response.headers)
+        return True
+
+    def _applied(self, peer: Address, start: int):
+        self.sources[start] = peer
+
+    @staticmethod
+    def _size(response) -> int:
+        return len(response.headers)
+
+
+class BodyDownloader(BlockDownloader):
+    def __init__(
+        self, blockchain, peers: Iterable[Address], start_index: int, headers: List[Tuple[Block, str]], **kwargs
+    ) -> None:
+        """
+        Download the blocks of linked headers chain (see BlockDownloader for the parameters),
+        every chunk is verified against the headers (blocks hashes and signatures) on the executor when it arrive,
+        so the chunks are verified in parallel and the in order chain update find the signatures in the cache,
+        the download end before the first false header (see headers_mismatch)
+        :param start_index: the index of the first header
+        :param headers: the headers chain (header, block hash)
+        """
+        super().__init__(blockchain, peers, start_index, end_index=start_index + len(headers), **kwargs)
+        self.start_index = start_index
+        self.headers = headers
+        self.hashes = [block_hash for _, block_hash in headers]
+        self.headers_mismatch: Optional[int] = None  # the index of the first false header
+
+    def _request_message(self, start: int) -> Message:
+        return BlocksRequest(start, min(start + self.chunk_size, self._end_index))  # type: ignore
+
+    def _decode(self, frame: Frame, start: int) -> Message:
+        response: BlocksResponse = super()._decode(frame, start)  # type: ignore
+        blocks: List[Block] = response.blocks
+        offset = start - self.start_index
+        if [b.hash for b in blocks] != self.hashes[offset: offset + self.chunk_size]:
+            self._check_headers(blocks, offset)
+            raise InvalidResponseError(f"blocks {start} don't match the headers")
+        verifier = BatchVerifier()
+        for block in blocks:
+            if not all(verifier.verify_block(block)):
+                raise InvalidResponseError(f"invalid signature in block {block.index}")
+        return response
+
+    def _check_headers(self, blocks: List[Block], offset: int):
+        """
+        Find who is to blame for the first block that doesn't match its header (run on the executor)
+        :param blocks: the chunk blocks
+        :param offset: the chunk first header position
+        :raise HeadersMismatchError: if the block is signed by its forger and the header block hash isn't
+        """
+        for block, (header, block_hash) in zip(blocks, self.headers[offset: offset + self.chunk_size]):
+            if block.hash == block_hash:
+                continue
+            if (
+                block.is_signed
+                and Verifier.is_verified(block.verifying_key, block.signature, block.hash)
+                and not Verifier.is_verified(header.verifying_key, header.signature, block_hash)
+            ):
+                raise HeadersMismatchError(f"header {header.index} block hash isn't signed", index=header.index)
+            return
+
+    def _invalid_response(self, peer: Address, start: int, error: Exception):
+        """
+        Bodies chunk that found false header end the download before the header (the chunk isn't blamed on the peer)
+        """
+        if not isinstance(error, HeadersMismatchError):
+            super()._invalid_response(peer, start, error)
+            return
+        if self.headers_mismatch is None or error.index < self.headers_mismatch:
+            self.headers_mismatch = error.index
+            self.hashes = self.hashes[: error.index - self.start_index]
+            self._truncate(error.index)
+        if not self._past_end(start):
+            self._chunk_failures.setdefault(start, set())
+            self._retry.append(start)
+            self._retry.sort()
+
+
+class HeadersFirstDownloader:
+    def __init__(
+        self,
+        blockchain,
+        peers: Iterable[Address],
+        start_index: int,
+        headers_chunk_size: int = SYNC_HEADERS_CHUNK_SIZE,
+        **kwargs,
+    ) -> None:
+        """
+        Download the headers chain from all the peers, then download the blocks bodies from the peers
+        that were not dropped by the headers download
+        :param blockchain: chain to update
+        :param peers: peers addresses
+        :param start_index: the index after the chain tip
+        :param headers_chunk_size: headers per request
+        :param kwargs: BlockDownloader parameters (chunk_size is the blocks per request)
+        """
+        self.blockchain = blockchain
+        self.start_index = start_index
+        self._kwargs = kwargs
+        self._headers_kwargs = {**kwargs, "chunk_size": headers_chunk_size}
+        self.header_downloader = HeaderDownloader(blockchain, peers, start_index, **self._headers_kwargs)
+        self.body_downloader: Optional[BodyDownloader] = None
+
+    @property
+    def failed(self) -> bool:
+        return self.header_downloader.failed or (self.body_downloader is not None and self.body_downloader.failed)
+
+    @property
+    def peers(self) -> Set[Address]:
+        return (self.body_downloader or self.header_downloader).peers
+
+    async def run(self) -> int:
+        """
+        Download the headers and the blocks (the blocks of the headers that were linked before a failure are applied)
+        the peer that sent false header is dropped and the headers after the applied blocks are downloaded again
+        :return: the index of the next block to download (chain height + 1 when the download is complete)
+        """
+        start_index = self.start_index
+        while True:
+            await self.header_downloader.run()
+            self.body_downloader = BodyDownloader(
+                self.blockchain,
+                self.header_downloader.peers,
+                start_index,
+                self.header_downloader.headers,
+                **self._kwargs,
+            )
+            next_index = await self.body_downloader.run()
+            false_header = self.body_downloader.headers_mismatch
+            if self.body_downloader.failed or false_header is None or next_index != false_header:
+                return next_index
+            headers_peer = self.header_downloader.headers_peer(false_header)
+            print(f"dropping peer {headers_peer} that sent false header {false_header}")
+            peers = self.body_downloader.peers - {headers_peer}
+            self.header_downloader = HeaderDownloader(self.blockchain, peers, next_index, **self._headers_kwargs)
+            start_index = next_index
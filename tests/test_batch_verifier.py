@@ -0,0 +1,37 @@
+import unittest
+
+from blockchain import Chain, Actor, Config
+from blockchain.batch_verifier import BatchVerifier
+
+
+class BatchVerifierTester(unittest.TestCase):
+    def setUp(self) -> None:
+        Config.test_net = True
+        Config.test_net_wallet_initial_coins = 100
+        Config.max_transactions_per_block = 100
+
+    def _transactions(self, blockchain, count):
+        sender = Actor(secret_key="sender_key", blockchain=blockchain)
+        recipient = Actor(secret_key="recipient_key", blockchain=blockchain)
+        return [sender.create_transaction(recipient.address, 1) for _ in range(count)]
+
+    def test_single_process_and_pool_results_match(self):
+        blockchain = Chain()
+        transactions = self._transactions(blockchain, 6)
+        in_process = BatchVerifier(workers=0).verify(transactions)
+        with_pool = BatchVerifier(workers=2, chunk_size=2).verify(transactions)
+        self.assertEqual(in_process, [True] * 6)
+        self.assertEqual(with_pool, in_process)
+
+    def test_stop_on_first_invalid_signature(self):
+        blockchain = Chain()
+        transactions = self._transactions(blockchain, 4)
+        transactions[1] = transactions[1].add_signature(transactions[0].signature)
+        results = BatchVerifier(workers=0).verify(transactions)
+        self.assertEqual(results, [True, False, None, None])
+
+    def test_unsigned_object(self):
+        blockchain = Chain()
+        forger = Actor(secret_key="forger_key", blockchain=blockchain)
+        unsigned_block = blockchain.create_unsigned_block(forger=forger.address)
+        self.assertEqual(BatchVerifier(workers=2).verify_block(unsigned_block), [False])
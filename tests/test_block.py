@@ -0,0 +1,49 @@
+import pickle
+import unittest
+
+from blockchain import Chain, Actor, Config
+from blockchain.block import Block
+
+
+class BlockTester(unittest.TestCase):
+    def setUp(self) -> None:
+        Config.test_net = True
+        Config.test_net_wallet_initial_coins = 100
+
+    def test_block_is_immutable(self):
+        blockchain = Chain()
+        forger = Actor(secret_key="forger_key", blockchain=blockchain)
+        sender = Actor(secret_key="sender_key", blockchain=blockchain)
+        tx = sender.create_transaction(forger.address, 10)
+        blockchain.add_transaction(tx.to_dict())
+        block = forger.forge_block()
+        with self.assertRaises(AttributeError):
+            block.index = 100
+        with self.assertRaises(AttributeError):
+            block.transactions[0].amount = 1
+
+    def test_add_signature_returns_new_block(self):
+        blockchain = Chain()
+        forger = Actor(secret_key="forger_key", blockchain=blockchain)
+        unsigned_block = blockchain.create_unsigned_block(forger=forger.address)
+        block = unsigned_block.add_signature(forger.wallet.sign(unsigned_block.hash))
+
+        self.assertFalse(unsigned_block.is_signed)
+        self.assertTrue(block.signature_verified())
+        self.assertEqual(block.hash, unsigned_block.hash)
+        self.assertNotEqual(block.hash, block.replace(index=100).hash)
+
+    def test_hash_matches_dict_round_trip(self):
+        blockchain = Chain()
+        forger = Actor(secret_key="forger_key", blockchain=blockchain)
+        sender = Actor(secret_key="sender_key", blockchain=blockchain)
+        tx = sender.create_transaction(forger.address, 10)
+        block = Block(
+            index=1,
+            previous_hash="0",
+            timestamp=0,
+            forger=forger.address,
+            transactions=[tx],
+        )
+        self.assertEqual(Block.from_dict(block.to_dict()).hash, block.hash)
+        self.assertEqual(pickle.loads(pickle.dumps(block)).hash, block.hash)
@@ -0,0 +1,184 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+from blockchain import Chain, Actor, Config
+from blockchain.block_store import BlockStore, INDEX_ENTRY
+from blockchain.hardcoded import GENESIS_BLOCK
+
+
+class BlockStoreTester(unittest.TestCase):
+    def setUp(self) -> None:
+        Config.test_net = True
+        Config.test_net_wallet_initial_coins = 100
+        Config.max_transactions_per_block = 100
+        self._directory = tempfile.TemporaryDirectory()
+        self.directory = self._directory.name
+
+    def tearDown(self) -> None:
+        self._directory.cleanup()
+
+    def _blocks(self, count: int):
+        blockchain = Chain()
+        forger = Actor(secret_key="forger_key", blockchain=blockchain)
+        sender = Actor(secret_key="sender_key", blockchain=blockchain)
+        blocks = [GENESIS_BLOCK]
+        for _ in range(count):
+            tx = sender.create_transaction(forger.address, 1)
+            blockchain.add_transaction(tx.to_dict())
+            block = forger.forge_block()
+            blockchain.link_new_block(block, _i_know_what_i_doing=True)
+            blocks.append(block)
+        return blocks
+
+    def test_read_by_height_and_hash(self):
+        blocks = self._blocks(5)
+        store = BlockStore(self.directory, batch_size=2)
+        for block in blocks:
+            store.append(block)
+        self.assertEqual(len(store), 6)
+        self.assertIs(store[-1], blocks[-1])
+        self.assertEqual([b.hash for b in store[1:4]], [b.hash for b in blocks[1:4]])
+        self.assertEqual(store.height_of(blocks[3].hash), 3)
+        self.assertEqual(store.height_of("00" * 32), -1)
+        with self.assertRaises(IndexError):
+            store[6]
+        store.close()
+
+    def test_reads_while_appending(self):
+        blocks = self._blocks(6)
+        store = BlockStore(self.directory, segment_size=1, batch_size=1)
+        store.append(blocks[0])
+        errors = []
+        done = threading.Event()
+
+        def read():
+            try:
+                while not done.is_set():
+                    self.assertEqual(store[0].hash, blocks[0].hash)
+                    self.assertLessEqual(len(store[:]), len(blocks))
+            except Exception as e:
+                errors.append(e)
+
+        reader = threading.Thread(target=read)
+        reader.start()
+        for _ in range(20):
+            for block in blocks[1:]:
+                store.append(block)
+            for _ in blocks[1:]:
+                store.pop()
+        done.set()
+        reader.join()
+        self.assertEqual(errors, [])
+        store.close()
+
+    def test_reopen_and_segments(self):
+        blocks = self._blocks(5)
+        store = BlockStore(self.directory, segment_size=1, batch_size=1)
+        for block in blocks:
+            store.append(block)
+        store.close()
+        self.assertEqual(len([n for n in os.listdir(self.directory) if n.endswith(".log")]), 6)
+
+        store = BlockStore(self.directory)
+        self.assertEqual([b.hash for b in store], [b.hash for b in blocks])
+        self.assertEqual(store[2].transactions[0].hash, blocks[2].transactions[0].hash)
+        self.assertEqual(store.height_of(blocks[4].hash), 4)
+        store.close()
+
+    def test_pop_last_blocks(self):
+        blocks = self._blocks(5)
+        store = BlockStore(self.directory, segment_size=1, batch_size=4)
+        for block in blocks:
+            store.append(block)
+        self.assertIs(store.pop(), blocks[5])  # pending block
+        self.assertIs(store.pop(), blocks[4])
+        self.assertEqual(store.pop().hash, blocks[3].hash)  # written block
+        self.assertEqual(store[-1].hash, blocks[2].hash)
+        with self.assertRaises(TypeError):
+            store.pop(0)
+        self.assertEqual(store.height_of(blocks[3].hash), -1)
+        store.append(blocks[3])
+        store.close()
+
+        store = BlockStore(self.directory)
+        self.assertEqual([b.hash for b in store], [b.hash for b in blocks[:4]])
+        self.assertEqual(len([n for n in os.listdir(self.directory) if n.endswith(".log")]), 4)
+        store.close()
+
+    def test_hash_lookup_in_many_blocks(self):
+        blocks = [GENESIS_BLOCK.replace(index=index, timestamp=index) for index in range(5000)]
+        store = BlockStore(self.directory, batch_size=64)
+        for block in blocks:
+            store.append(block)
+        store.close()
+
+        store = BlockStore(self.directory)
+        self.assertGreaterEqual(store._hashes.slots, 2 * len(blocks))  # the table grew with the chain
+        with mock.patch.object(store, "_index_entry", wraps=store._index_entry) as index_entry:
+            self.assertEqual(store.height_of(blocks[10].hash), 10)
+            self.assertEqual(index_entry.call_args_list, [mock.call(10)])  # only the found block entry is read
+        self.assertEqual([store.height_of(b.hash) for b in blocks[::499]], list(range(0, 5000, 499)))
+        for _ in range(10):
+            store.pop()
+        self.assertEqual(store.height_of(blocks[-1].hash), -1)
+        other = GENESIS_BLOCK.replace(index=4990, timestamp=-1)
+        store.append(other)
+        store.flush()
+        self.assertEqual(store.height_of(other.hash), 4990)
+        store.close()
+
+    def test_corrupted_hash_index_rebuilt(self):
+        blocks = self._blocks(3)
+        store = BlockStore(self.directory, batch_size=1)
+        for block in blocks:
+            store.append(block)
+        store.close()
+        with open(os.path.join(self.directory, "blocks.hashes"), "r+b") as hashes_file:
+            hashes_file.truncate(100)
+
+        store = BlockStore(self.directory)
+        self.assertEqual([store.height_of(b.hash) for b in blocks], [0, 1, 2, 3])
+        store.close()
+
+    def test_recover_partial_write(self):
+        blocks = self._blocks(3)
+        store = BlockStore(self.directory, batch_size=1)
+        for block in blocks:
+            store.append(block)
+        store.close()
+        with open(os.path.join(self.directory, "blocks.index"), "ab") as index_file:
+            index_file.write(b"\x00" * (INDEX_ENTRY.size // 2))
+        with open(os.path.join(self.directory, "blocks-000000.log"), "ab") as segment_file:
+            segment_file.write(b"partial record")
+
+        store = BlockStore(self.directory, batch_size=1)
+        self.assertEqual(len(store), 4)
+        store.append(blocks[1])
+        store.close()
+        store = BlockStore(self.directory)
+        self.assertEqual(store[4].hash, blocks[1].hash)
+        store.close()
+
+    def test_chain_state_restored_from_store(self):
+        blockchain = Chain(data_dir=self.directory)
+        forger = Actor(secret_key="forger_key", blockchain=blockchain)
+        sender = Actor(secret_key="sender_key", blockchain=blockchain)
+        tx = sender.create_transaction(forger.address, 10)
+        blockchain.add_transaction(tx.to_dict())
+        blockchain.link_new_block(forger.forge_block(), _i_know_what_i_doing=True)
+        last_hash = blockchain.blocks[-1].hash
+        blockchain.close()
+
+        blockchain = Chain(data_dir=self.directory)
+        self.assertEqual(len(blockchain.blocks), 2)
+        self.assertEqual(blockchain.blocks[-1].hash, last_hash)
+        self.assertEqual(blockchain.get_chain_wallet(sender.address).balance, 89)
+        self.assertEqual(blockchain.get_chain_wallet(sender.address).tx_counter, 1)
+        blockchain.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,151 @@
+import tempfile
+import unittest
+from unittest import mock
+
+from blockchain import Chain, Actor, Config
+from blockchain.block_tree import BlockTree, UndoRecord
+from blockchain.exceptions import ForkTooDeepError, InvalidSignatureError
+from netp2p.messages import BlocksResponse
+
+
+class BlockTreeTester(unittest.TestCase):
+    def setUp(self) -> None:
+        Config.test_net = True
+        Config.test_net_wallet_initial_coins = 100
+        Config.max_transactions_per_block = 100
+
+    def _forge(self, blockchain, forger_key: str, count: int, amount: float = 1):
+        """
+        Link blocks with one transaction to the chain
+        :return: the linked blocks
+        """
+        forger = Actor(secret_key=forger_key, blockchain=blockchain)
+        sender = Actor(secret_key="sender_key", blockchain=blockchain)
+        sender.tx_counter = sender.chain_tx_counter + 1
+        recipient = Actor(secret_key="recipient_key", blockchain=blockchain)
+        blocks = []
+        for _ in range(count):
+            blockchain.add_transaction(sender.create_transaction(recipient.address, amount))
+            block = forger.forge_block()
+            blockchain.link_new_block(block, _i_know_what_i_doing=True)
+            blocks.append(block)
+        return blocks
+
+    @staticmethod
+    def _state(blockchain):
+        return (
+            [b.hash for b in blockchain.blocks],
+            {a: (w.balance, w.tx_counter) for a, w in blockchain.chain_wallets.items() if w.balance or w.tx_counter},
+            blockchain.epoch_random,
+            blockchain.penalty,
+        )
+
+    def test_reorg_to_longer_branch(self):
+        blockchain, other = Chain(), Chain()
+        common = self._forge(blockchain, "forger_key", 1)
+        other.link_new_block(common[0], _i_know_what_i_doing=True)
+        self._forge(blockchain, "forger_key", 2, amount=5)
+        branch = self._forge(other, "other_forger_key", 3, amount=2)
+
+        self.assertTrue(blockchain.reorganize(branch))
+        self.assertEqual(blockchain.height(), 4)
+        self.assertEqual(self._state(blockchain)[:3], self._state(other)[:3])
+        self.assertAlmostEqual(blockchain.penalty, other.penalty)
+        self.assertIs(blockchain.block_tree.tip.block, branch[-1])
+
+    def test_worse_or_invalid_branch_leave_chain_untouched(self):
+        blockchain, other = Chain(), Chain()
+        common = self._forge(blockchain, "forger_key", 1)
+        other.link_new_block(common[0], _i_know_what_i_doing=True)
+        self._forge(blockchain, "forger_key", 3)
+        branch = self._forge(other, "other_forger_key", 3)
+        state = self._state(blockchain)
+
+        self.assertFalse(blockchain.reorganize(branch[:2]))  # shorter branch
+        self.assertEqual(self._state(blockchain), state)
+
+        invalid_block = branch[2].replace(signature=branch[1].signature)
+        with self.assertRaises(InvalidSignatureError):
+            blockchain.reorganize([*branch[:2], invalid_block])
+        self.assertEqual(self._state(blockchain), state)
+        self.assertNotIn(invalid_block.hash, blockchain.block_tree)
+
+        with self.assertRaises(ForkTooDeepError):
+            blockchain.reorganize(self._forge(Chain(), "other_forger_key", 2)[1:])  # fork point is unknown
+
+    def test_blocks_response_reorg(self):
+        blockchain, other = Chain(), Chain()
+        common = self._forge(blockchain, "forger_key", 1)
+        other.link_new_block(common[0], _i_know_what_i_doing=True)
+        self._forge(blockchain, "forger_key", 1)
+        branch = self._forge(other, "other_forger_key", 2)
+
+        self.assertFalse(BlocksResponse([b.to_dict() for b in branch[:1]]).apply(blockchain))
+        self.assertTrue(BlocksResponse([b.to_dict() for b in branch]).apply(blockchain))
+        self.assertEqual(self._state(blockchain)[:3], self._state(other)[:3])
+
+    def test_competing_block_fork_choice(self):
+        blockchain = Chain()
+        sender = Actor(secret_key="sender_key", blockchain=blockchain)
+        forgers = [Actor(secret_key=f"forger_{i}", blockchain=blockchain) for i in range(5)]
+        for forger in forgers:  # the forgers wallets are needed for different penalties
+            blockchain.add_transaction(sender.create_transaction(forger.address, 1))
+        blockchain.link_new_block(sender.forge_block(), _i_know_what_i_doing=True)
+        blocks = sorted((forger.forge_block() for forger in forgers), key=blockchain.block_penalty)
+        self.assertLess(blockchain.block_penalty(blocks[0]), blockchain.block_penalty(blocks[1]))
+        blockchain.link_new_block(blocks[1], _i_know_what_i_doing=True)
+
+        blockchain.add_block(blocks[2])  # competing block with higher penalty
+        self.assertEqual(blockchain.blocks[-1].hash, blocks[1].hash)
+        blockchain.add_block(blocks[0])
+        self.assertEqual(blockchain.blocks[-1].hash, blocks[0].hash)
+        self.assertEqual(blockchain.height(), 2)
+
+    def test_losing_branch_rejected_before_rollback(self):
+        blockchain = Chain()
+        sender = Actor(secret_key="sender_key", blockchain=blockchain)
+        forgers = [Actor(secret_key=f"forger_{i}", blockchain=blockchain) for i in range(5)]
+        shorter_branch_block = forgers[0].forge_block()  # fork on the genesis block
+        for forger in forgers:
+            blockchain.add_transaction(sender.create_transaction(forger.address, 1))
+        blockchain.link_new_block(sender.forge_block(), _i_know_what_i_doing=True)
+        blocks = sorted((forger.forge_block() for forger in forgers), key=blockchain.block_penalty)
+        blockchain.link_new_block(blocks[1], _i_know_what_i_doing=True)
+        state = self._state(blockchain)
+
+        with mock.patch.object(blockchain, "_undo_block") as undo_block:
+            self.assertFalse(blockchain.reorganize([shorter_branch_block]))
+            blockchain.add_block(blocks[2])  # competing tip with higher penalty
+            undo_block.assert_not_called()
+        self.assertEqual(self._state(blockchain), state)
+        self.assertNotIn(blocks[2].hash, blockchain.block_tree)
+
+        blockchain.add_block(blocks[0])  # competing tip with lower penalty
+        self.assertEqual(blockchain.blocks[-1].hash, blocks[0].hash)
+
+    def test_reorg_stored_chain(self):
+        with tempfile.TemporaryDirectory() as directory:
+            blockchain, other = Chain(data_dir=directory), Chain()
+            common = self._forge(blockchain, "forger_key", 1)
+            other.link_new_block(common[0], _i_know_what_i_doing=True)
+            self._forge(blockchain, "forger_key", 2)
+            branch = self._forge(other, "other_forger_key", 3)
+            self.assertTrue(blockchain.reorganize(branch))
+            blockchain.close()
+
+            restored = Chain(data_dir=directory)
+            self.assertEqual(self._state(restored)[:3], self._state(other)[:3])
+            restored.close()
+
+    def test_old_blocks_pruned(self):
+        tree = BlockTree(max_depth=2)
+        blockchain = Chain()
+        for block in self._forge(blockchain, "forger_key", 4):
+            tree.add_linked(block, 0, UndoRecord(0, None, 0))
+        self.assertEqual(len(tree), 3)
+        self.assertIsNone(tree.rollback_path(blockchain.blocks[1].hash))
+        self.assertEqual(len(tree.rollback_path(blockchain.blocks[2].hash)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
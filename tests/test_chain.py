@@ -73,9 +73,9 @@ class MyChainTester(unittest.TestCase):
 
         unsigned_block = blockchain.create_unsigned_block(forger=forger.address)
         bad_signature = non_forger.wallet.sign(unsigned_block.hash)
-        unsigned_block.add_signature(bad_signature)
+        bad_signature_block = unsigned_block.add_signature(bad_signature)
         with self.assertRaises(InvalidSignatureError):
-            blockchain.link_new_block(unsigned_block, _i_know_what_i_doing=True)
+            blockchain.link_new_block(bad_signature_block, _i_know_what_i_doing=True)
 
     def test_add_unsigned_transaction(self):
         blockchain = Chain()
@@ -105,11 +105,37 @@ class MyChainTester(unittest.TestCase):
             tx_counter=1,
         )
         signature = recipient.wallet.sign(valid_unsigned_transaction.hash)
-        valid_unsigned_transaction.add_signature(
+        bad_signature_transaction = valid_unsigned_transaction.add_signature(
             signature
         )  # add bad signature (recipient signature is invalid)
         with self.assertRaises(InvalidSignatureError):
-            blockchain.add_transaction(valid_unsigned_transaction.to_dict())
+            blockchain.add_transaction(bad_signature_transaction.to_dict())
+
+    def test_add_transactions_batch(self):
+        blockchain = Chain()
+        sender = Actor(secret_key="sender_key", blockchain=blockchain)
+        recipient = Actor(secret_key="recipient_key", blockchain=blockchain)
+
+        transactions = [sender.create_transaction(recipient.address, 1) for _ in range(3)]
+        unsigned_transaction = blockchain.create_unsigned_transaction(
+            sender=sender.address,
+            recipient=recipient.address,
+            amount=10,
+            fee=1,
+            tx_counter=4,
+        )
+        bad_signature_transaction = unsigned_transaction.add_signature(
+            recipient.wallet.sign(unsigned_transaction.hash)
+        )
+        blockchain.add_transaction(transactions[0])
+
+        added = blockchain.add_transactions(
+            [t.to_dict() for t in transactions] + [bad_signature_transaction, transactions[1]]
+        )
+        # known, invalid and duplicate transactions are skipped
+        self.assertEqual([t.hash for t in added], [t.hash for t in transactions[1:]])
+        self.assertEqual(len(blockchain.mempool), 3)
+        self.assertNotIn(bad_signature_transaction.hash, blockchain.mempool)
 
     def test_bigger_then_allowed_block(self):
         Config.max_transactions_per_block = 1
@@ -139,7 +165,7 @@ class MyChainTester(unittest.TestCase):
             transactions=transactions,
         )
         signature = forger.wallet.sign(block.hash)
-        block.add_signature(signature)
+        block = block.add_signature(signature)
 
         with self.assertRaises(TooMachTransactionInBlockError):
             blockchain.add_block(block.to_dict())
@@ -148,23 +174,23 @@ class MyChainTester(unittest.TestCase):
         blockchain = Chain()
         forger = Actor(secret_key="forger_key", blockchain=blockchain)
         unsigned_block = blockchain.create_unsigned_block(forger=forger.address)
-        unsigned_block.index = 100
+        unsigned_block = unsigned_block.replace(index=100)
         signature = forger.wallet.sign(unsigned_block.hash)
-        unsigned_block.add_signature(signature)
+        block = unsigned_block.add_signature(signature)
 
         with self.assertRaises(NonSequentialBlockError):
-            blockchain.link_new_block(unsigned_block, _i_know_what_i_doing=True)
+            blockchain.link_new_block(block, _i_know_what_i_doing=True)
 
     def test_add_non_sequential_hash_block(self):
         blockchain = Chain()
         forger = Actor(secret_key="forger_key", blockchain=blockchain)
         unsigned_block = blockchain.create_unsigned_block(forger=forger.address)
-        unsigned_block.previous_hash = "bad hash"
+        unsigned_block = unsigned_block.replace(previous_hash="bad hash")
         signature = forger.wallet.sign(unsigned_block.hash)
-        unsigned_block.add_signature(signature)
+        block = unsigned_block.add_signature(signature)
 
         with self.assertRaises(NonSequentialBlockError):
-            blockchain.link_new_block(unsigned_block, _i_know_what_i_doing=True)
+            blockchain.link_new_block(block, _i_know_what_i_doing=True)
 
     def test_add_insufficient_balance_transaction(self):
         Config.test_net = True
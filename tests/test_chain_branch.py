@@ -0,0 +1,58 @@
+import unittest
+
+from blockchain import Chain, Actor, Config
+from blockchain.exceptions import StaleBranchError
+
+
+class ChainBranchTester(unittest.TestCase):
+    def setUp(self) -> None:
+        Config.test_net = True
+        Config.test_net_wallet_initial_coins = 100
+        Config.max_transactions_per_block = 100
+
+    def _block_with_transaction(self, blockchain):
+        forger = Actor(secret_key="forger_key", blockchain=blockchain)
+        sender = Actor(secret_key="sender_key", blockchain=blockchain)
+        recipient = Actor(secret_key="recipient_key", blockchain=blockchain)
+        tx = sender.create_transaction(recipient.address, 10)
+        blockchain.add_transaction(tx.to_dict())
+        return forger.forge_block(), sender, recipient
+
+    def test_discarded_branch_leave_parent_untouched(self):
+        blockchain = Chain()
+        block, sender, recipient = self._block_with_transaction(blockchain)
+        blocks_count = len(blockchain.blocks)
+
+        branch = blockchain.branch()
+        branch.link_new_block(block, _i_know_what_i_doing=True)
+        self.assertEqual(branch.get_chain_wallet(sender.address).balance, 89)
+        branch.discard()
+
+        self.assertEqual(len(blockchain.blocks), blocks_count)
+        self.assertEqual(sender.balance, 100)
+        self.assertEqual(recipient.balance, 100)
+        self.assertEqual(len(blockchain.mempool), 1)
+        self.assertEqual(branch.get_chain_wallet(sender.address).balance, 100)
+
+    def test_commit_branch(self):
+        blockchain = Chain()
+        block, sender, recipient = self._block_with_transaction(blockchain)
+        branch = blockchain.branch()
+        branch.link_new_block(block, _i_know_what_i_doing=True)
+        self.assertNotIn(block.forger, blockchain.chain_wallets)
+        branch.commit()
+
+        self.assertIs(blockchain.blocks[-1], block)
+        self.assertEqual(sender.balance, 89)
+        self.assertEqual(recipient.balance, 110)
+        self.assertEqual(len(blockchain.mempool), 0)
+        self.assertIn(block.forger, blockchain.address_index)
+
+    def test_commit_stale_branch(self):
+        blockchain = Chain()
+        block, _, _ = self._block_with_transaction(blockchain)
+        branch = blockchain.branch()
+        blockchain.link_new_block(block, _i_know_what_i_doing=True)
+
+        with self.assertRaises(StaleBranchError):
+            branch.commit()
@@ -0,0 +1,114 @@
+import unittest
+
+from blockchain import Chain, Actor, Config
+from blockchain.codec import (
+    CODEC_BINARY,
+    CODEC_JSON,
+    decode_block,
+    decode_transaction,
+    encode_block,
+    encode_transaction,
+    TRANSACTION,
+)
+from blockchain.exceptions import CodecError
+from blockchain.hardcoded import GENESIS_BLOCK
+from blockchain.transaction import Transaction
+from netp2p.frame import FrameDecoder
+from netp2p.messages import NewBlock, NewTransaction, NewTransactions, PeerInfo, BlocksRequest, BlocksResponse, Hello
+from netp2p.messages import HeadersRequest, HeadersResponse
+
+
+class CodecTester(unittest.TestCase):
+    def setUp(self) -> None:
+        Config.test_net = True
+        Config.test_net_wallet_initial_coins = 100
+        Config.max_transactions_per_block = 100
+        self.blockchain = Chain()
+        self.forger = Actor(secret_key="forger_key", blockchain=self.blockchain)
+        self.sender = Actor(secret_key="sender_key", blockchain=self.blockchain)
+
+    def _block(self):
+        self.blockchain.add_transaction(self.sender.create_transaction(self.forger.address, 10).to_dict())
+        self.blockchain.add_transaction(self.sender.create_transaction(self.forger.address, 2.5, fee=1.5).to_dict())
+        return self.forger.forge_block()
+
+    def test_transaction_round_trip(self):
+        signed = self.sender.create_transaction(self.forger.address, 2.5)
+        unsigned = Transaction(self.sender.address, self.forger.address, 3, 1, 7)
+        for transaction in (signed, unsigned):
+            data = encode_transaction(transaction)
+            self.assertEqual(len(data), TRANSACTION.size)
+            decoded = decode_transaction(data)
+            self.assertEqual(decoded.to_dict(), transaction.to_dict())
+            self.assertEqual(decoded.hash, transaction.hash)
+            self.assertEqual(type(decoded.amount), type(transaction.amount))
+
+    def test_block_round_trip(self):
+        for block in (GENESIS_BLOCK, self._block()):
+            data = encode_block(block)
+            decoded, end = decode_block(memoryview(data))
+            self.assertEqual(end, len(data))
+            self.assertEqual(decoded.to_dict(), block.to_dict())
+            self.assertEqual(decoded.hash, block.hash)
+            self.assertEqual(decoded.signature_verified(), block.signature_verified())
+
+    def test_invalid_values(self):
+        with self.assertRaises(CodecError):
+            encode_transaction(Transaction("not an address", self.forger.address, 1, 1, 1))
+        with self.assertRaises(CodecError):
+            encode_transaction(Transaction(self.sender.address, self.forger.address, "1", 1, 1))
+        with self.assertRaises(CodecError):
+            decode_block(encode_block(self._block())[:-1])
+
+    def _round_trip(self, message, codec):
+        decoder = FrameDecoder()
+        decoder.feed(message.to_frame(codec))
+        frame = next(decoder)
+        return frame.codec, type(message).from_bytes(frame.payload, ttl=frame.ttl, codec=frame.codec)
+
+    def test_messages_round_trip(self):
+        block = self._block()
+        transaction = self.sender.create_transaction(self.forger.address, 1)
+        for codec in (CODEC_JSON, CODEC_BINARY):
+            frame_codec, decoded = self._round_trip(NewBlock(block.to_dict(), ttl=4), codec)
+            self.assertEqual(frame_codec, codec)
+            self.assertEqual(decoded.ttl, 4)
+            self.assertEqual(decoded.to_dict()["block"], block.to_dict())
+
+            _, decoded = self._round_trip(NewTransaction(transaction), codec)
+            self.assertEqual(decoded.to_dict()["transaction"], transaction.to_dict())
+
+            _, decoded = self._round_trip(NewTransactions([transaction, transaction.to_dict()], ttl=3), codec)
+            self.assertEqual(decoded.ttl, 3)
+            self.assertEqual(decoded.to_dict()["transactions"], [transaction.to_dict()] * 2)
+
+            _, decoded = self._round_trip(PeerInfo(["127.0.0.1", 1875]), codec)
+            self.assertEqual(list(decoded.addr), ["127.0.0.1", 1875])
+
+            _, decoded = self._round_trip(BlocksRequest(1, None), codec)
+            self.assertEqual((decoded.start_index, decoded.end_index), (1, None))
+
+            _, decoded = self._round_trip(BlocksResponse([GENESIS_BLOCK, block]), codec)
+            self.assertEqual(decoded.to_dict()["blocks"], [GENESIS_BLOCK.to_dict(), block.to_dict()])
+
+            _, decoded = self._round_trip(HeadersRequest(1, 5), codec)
+            self.assertEqual((decoded.start_index, decoded.end_index), (1, 5))
+
+            _, decoded = self._round_trip(HeadersResponse.from_blocks([GENESIS_BLOCK, block]), codec)
+            self.assertEqual([h for _, h in decoded.headers], [GENESIS_BLOCK.hash, block.hash])
+            self.assertEqual(decoded.headers[1][0].to_dict(), block.replace(transactions=()).to_dict())
+
+    def test_json_fallback_frame(self):
+        transaction = {**self.sender.create_transaction(self.forger.address, 1).to_dict(), "recipient": "bad"}
+        frame_codec, decoded = self._round_trip(NewTransaction(transaction), CODEC_BINARY)
+        self.assertEqual(frame_codec, CODEC_JSON)
+        self.assertEqual(decoded.to_dict()["transaction"], transaction)
+
+    def test_hello_codec_negotiation(self):
+        self.assertEqual(Hello([CODEC_JSON, CODEC_BINARY]).choose_codec([CODEC_BINARY, CODEC_JSON]), CODEC_BINARY)
+        self.assertEqual(Hello([CODEC_JSON]).choose_codec([CODEC_BINARY, CODEC_JSON]), CODEC_JSON)
+        self.assertEqual(Hello([]).choose_codec([CODEC_BINARY]), CODEC_JSON)
+
+
+if __name__ == "__main__":
+    unittest.main()
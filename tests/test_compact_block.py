@@ -0,0 +1,87 @@
+import unittest
+
+from blockchain import Chain, Actor, Config
+from blockchain.codec import CODEC_BINARY, CODEC_JSON
+from netp2p.compact import CompactBlocks
+from netp2p.frame import FrameDecoder
+from netp2p.messages import CompactBlock, GetBlockTransactions, BlockTransactions, NewBlock
+
+
+class StubNode:
+    def __init__(self):
+        self.compact_blocks = CompactBlocks()
+        self.broadcasted = []
+
+    def broadcast(self, msg):
+        self.broadcasted.append(msg)
+
+
+class CompactBlockTester(unittest.TestCase):
+    def setUp(self) -> None:
+        Config.test_net = True
+        Config.test_net_wallet_initial_coins = 100
+        Config.max_transactions_per_block = 100
+        self.sender_chain = Chain()
+        self.receiver_chain = Chain()
+        self.forger = Actor(secret_key="forger_key", blockchain=self.sender_chain)
+        sender = Actor(secret_key="sender_key", blockchain=self.sender_chain)
+        self.transactions = [sender.create_transaction(self.forger.address, 1) for _ in range(10)]
+        for transaction in self.transactions:
+            self.sender_chain.add_transaction(transaction)
+        self.block = self.forger.forge_block()
+
+    def _round_trip(self, message, codec):
+        decoder = FrameDecoder()
+        decoder.feed(message.to_frame(codec))
+        frame = next(decoder)
+        return type(message).from_bytes(frame.payload, ttl=frame.ttl, codec=frame.codec)
+
+    def test_compact_block_is_smaller(self):
+        compact_block = CompactBlock.from_block(self.block)
+        for codec in (CODEC_JSON, CODEC_BINARY):
+            decoded = self._round_trip(compact_block, codec)
+            self.assertEqual(decoded.block_hash, self.block.hash)
+            self.assertEqual(decoded.short_ids, compact_block.short_ids)
+            self.assertEqual(decoded.nonce, compact_block.nonce)
+            self.assertEqual(decoded.header.to_dict(), compact_block.header.to_dict())
+            self.assertLess(len(compact_block.to_frame(codec)) * 4, len(NewBlock(self.block).to_frame(codec)))
+
+    def test_rebuild_from_mempool(self):
+        for transaction in self.transactions:
+            self.receiver_chain.add_transaction(transaction)
+        node = StubNode()
+        self.assertIsNone(CompactBlock.from_block(self.block).process(self.receiver_chain, node))
+        self.assertEqual(node.compact_blocks.get_block(self.block.hash).to_dict(), self.block.to_dict())
+
+    def test_missing_transactions_requested(self):
+        for transaction in self.transactions[::2]:
+            self.receiver_chain.add_transaction(transaction)
+        sender_node, receiver_node = StubNode(), StubNode()
+        sender_node.compact_blocks.add_block(self.block)
+        compact_block = self._round_trip(CompactBlock.from_block(self.block), CODEC_BINARY)
+
+        request = compact_block.process(self.receiver_chain, receiver_node)
+        self.assertIsInstance(request, GetBlockTransactions)
+        self.assertEqual(request.indexes, [1, 3, 5, 7, 9])
+
+        reply = self._round_trip(request, CODEC_BINARY).process(self.sender_chain, sender_node)
+        self.assertIsInstance(reply, BlockTransactions)
+        reply = self._round_trip(reply, CODEC_BINARY)
+        self.assertIsNone(reply.process(self.receiver_chain, receiver_node))
+
+        block = receiver_node.compact_blocks.get_block(self.block.hash)
+        self.assertEqual(block.hash, self.block.hash)
+        self.assertEqual(receiver_node.broadcasted, [compact_block])  # relayed when completed
+        self.assertEqual(compact_block.ttl, 9)
+
+    def test_unknown_block_transactions(self):
+        reply = GetBlockTransactions(self.block.hash, [0]).process(self.sender_chain, StubNode())
+        self.assertEqual(reply.transactions, [])
+        node = StubNode()
+        node.compact_blocks.add_pending(CompactBlock.from_block(self.block), [None] * len(self.transactions))
+        self.assertIsNone(reply.process(self.receiver_chain, node))
+        self.assertIsNone(node.compact_blocks.get_block(self.block.hash))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+from base64 import b64decode
+
+from blockchain import Config
+from blockchain.key_cache import KeyCache
+from blockchain.verifier import Verifier
+from blockchain.wallet import Wallet
+
+
+class KeyCacheTester(unittest.TestCase):
+    def setUp(self) -> None:
+        self.wallets = [Wallet(secret_password=f"key-cache-{i}") for i in range(6)]
+        self.cache = KeyCache(
+            max_size=4, loader=Verifier.decode_verifying_key, protected_ratio=0.5
+        )
+
+    def test_hot_keys_survive_one_time_keys_flood(self):
+        hot = self.wallets[0].address
+        self.cache.get(hot)
+        self.cache.get(hot)  # promoted
+        for wallet in self.wallets[1:]:
+            self.cache.get(wallet.address)
+
+        self.assertIn(hot, self.cache)
+        self.assertEqual(len(self.cache), 4)
+        self.assertNotIn(self.wallets[1].address, self.cache)
+
+    def test_precomputed_key_verify_signature(self):
+        wallet = self.wallets[0]
+        signature = b64decode(wallet.sign("hash"))
+        for _ in range(3):
+            verifying_key = self.cache.get(wallet.address)
+
+        self.assertTrue(
+            verifying_key.verify(signature, b"hash", hashfunc=Config.hashfunc)
+        )
+        self.assertEqual((self.cache.hits, self.cache.misses), (2, 1))
@@ -1,6 +1,6 @@
 import unittest
 
-from blockchain.consensus import wallet_penalty, SumTree
+from blockchain.consensus import wallet_penalty, AddressIndex, SumTree, LotteryContext
 
 
 class LotteryTester(unittest.TestCase):
@@ -33,3 +33,63 @@ class LotteryTester(unittest.TestCase):
             wallets_sorted_by_address=sorted_wallets,
         )
         self.assertEqual(a_winning, 0)
+
+    def test_sum_tree_search_matches_linear_scan(self):
+        balances = [3, 0, 7, 1, 12, 5, 0, 2, 9]
+        sum_tree = SumTree(balances, list(range(len(balances))))
+        self.assertEqual(sum_tree.sum, sum(balances))
+        for value in range(sum(balances)):
+            winner = next(
+                i for i in range(len(balances)) if sum(balances[: i + 1]) > value
+            )
+            self.assertEqual(sum_tree.search(value), winner)
+
+    def test_sum_tree_update(self):
+        sum_tree = SumTree.from_dict({"a": 1, "b": 1, "c": 1})
+        sum_tree.update(2, 10)
+        self.assertEqual(sum_tree.sum, 12)
+        self.assertEqual(sum_tree.search(1.5), "b")
+        self.assertEqual(sum_tree.search(2.5), "c")
+        self.assertIsNone(sum_tree.search(12))
+
+    def test_single_wallet_sum_tree(self):
+        sum_tree = SumTree.from_dict({"a": 5})
+        self.assertEqual(sum_tree.sum, 5)
+        self.assertEqual(sum_tree.search(4), "a")
+
+    def test_address_index_lottery(self):
+        wallets = {"c": 1, "a": 1, "b": 100}
+        index = AddressIndex()
+        for address in wallets:
+            index.add(address)
+        index.add("a")
+
+        self.assertEqual(list(index), ["a", "b", "c"])
+        self.assertEqual((index.rank("c"), index.rank("d")), (2, -1))
+        self.assertEqual(index.address(1), "b")
+
+        sum_tree = SumTree.from_dict(wallets)
+        for address in wallets:
+            self.assertEqual(
+                wallet_penalty(sum_tree, address, 0.5, index),
+                wallet_penalty(sum_tree, address, 0.5, sorted(wallets)),
+            )
+
+    def test_lottery_context_matches_wallet_penalty(self):
+        balances = {f"wallet-{i:03}": (i * 7) % 13 for i in range(200)}
+        index = AddressIndex(balances)
+        sum_tree = SumTree.from_dict(balances)
+        for lottery_number in (0.001, 0.37, 0.999):
+            context = LotteryContext(sum_tree, lottery_number, index)
+            for address in [*balances, "unknown"]:
+                self.assertEqual(context.penalty(address), wallet_penalty(sum_tree, address, lottery_number, index))
+            self.assertTrue(context.is_current(sum_tree, lottery_number, index))
+
+        index.add("wallet-new")  # the ranks are changed by the new wallet
+        self.assertFalse(context.is_current(sum_tree, 0.999, index))
+
+        context = LotteryContext(sum_tree, 0.999, index)
+        index.remove("wallet-new")  # rolled back wallet replaced by another wallet, the count is the same
+        index.add("wallet-other")
+        self.assertFalse(context.is_current(sum_tree, 0.999, index))
+        self.assertFalse(context.is_current(SumTree.from_dict(balances), 0.999, AddressIndex(balances)))
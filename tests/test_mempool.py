@@ -0,0 +1,81 @@
+import unittest
+
+from blockchain.exceptions import MempoolFullError, ValidationError
+from blockchain.mempool import Mempool
+from blockchain.transaction import Transaction
+
+
+def transaction(sender: str, tx_counter: int, fee: float, signature: str = "signature") -> Transaction:
+    return Transaction(
+        sender=sender,
+        recipient="recipient",
+        amount=1,
+        fee=fee,
+        tx_counter=tx_counter,
+        signature=signature,
+    )
+
+
+class MempoolTester(unittest.TestCase):
+    def test_best_by_fee(self):
+        mempool = Mempool()
+        for sender, fee in [("a", 1), ("b", 5), ("c", 3)]:
+            mempool.add(transaction(sender, 1, fee))
+
+        self.assertEqual([t.sender for t in mempool.best(2)], ["b", "c"])
+        self.assertEqual(len(mempool.best(10)), 3)
+
+    def test_sender_tx_counter_order(self):
+        mempool = Mempool()
+        mempool.add(transaction("a", 5, fee=10))
+        mempool.add(transaction("a", 4, fee=1))
+        mempool.add(transaction("b", 1, fee=2))
+
+        best = mempool.best(2)
+        self.assertEqual([(t.sender, t.tx_counter) for t in best], [("b", 1), ("a", 4)])
+        best = mempool.best(3)
+        self.assertEqual(
+            [(t.sender, t.tx_counter) for t in best], [("b", 1), ("a", 4), ("a", 5)]
+        )
+
+    def test_remove_stale(self):
+        mempool = Mempool()
+        for tx_counter in range(1, 5):
+            mempool.add(transaction("a", tx_counter, fee=1))
+        mempool.remove_stale("a", 2)
+
+        self.assertEqual([t.tx_counter for t in mempool.best(10)], [3, 4])
+        self.assertEqual(len(mempool), 2)
+
+    def test_replace_by_fee(self):
+        mempool = Mempool()
+        mempool.add(transaction("a", 1, fee=1))
+        with self.assertRaises(ValidationError):
+            mempool.add(transaction("a", 1, fee=1.0))
+        mempool.add(transaction("a", 1, fee=2))
+
+        self.assertEqual([t.fee for t in mempool.best(10)], [2])
+
+    def test_evict_lowest_fee(self):
+        mempool = Mempool(max_transactions=2)
+        mempool.add(transaction("a", 1, fee=2))
+        mempool.add(transaction("b", 1, fee=3))
+        mempool.add(transaction("c", 1, fee=4))
+        with self.assertRaises(MempoolFullError):
+            mempool.add(transaction("d", 1, fee=1))
+
+        self.assertEqual(sorted(t.sender for t in mempool), ["b", "c"])
+
+    def test_evicted_replacement_keep_replaced(self):
+        replaced, cheap = transaction("a", 1, fee=4), transaction("b", 1, fee=0.1)
+        size = Mempool.transaction_size(replaced)
+        mempool = Mempool(max_bytes=2 * size + 10)
+        mempool.add(replaced)
+        mempool.add(cheap)
+        replacement = transaction("a", 1, fee=5, signature="s" * 10 * size)  # higher fee, lowest fee rate
+        with self.assertRaises(MempoolFullError):
+            mempool.add(replacement)
+
+        self.assertEqual({t.hash for t in mempool}, {replaced.hash, cheap.hash})
+        self.assertEqual(mempool.size_bytes, size + Mempool.transaction_size(cheap))
+        self.assertEqual([t.hash for t in mempool.best(10)], [replaced.hash, cheap.hash])
@@ -0,0 +1,299 @@
+import asyncio
+import time
+import unittest
+
+from blockchain import Chain, Actor, Config
+from netp2p import Node
+from netp2p.client import Client
+from blockchain.codec import CODEC_JSON
+from netp2p.config import SESSION_MAX_INVALID_MESSAGES
+from netp2p.messages import NewTransaction, NewTransactions, PeerInfo, BlocksRequest, BlocksResponse
+from netp2p.processor import Processor
+from netp2p.server import Server
+from netp2p.session import Session
+from netp2p.frame import Frame, FrameDecoder, FrameError, encode_frame, FRAME_HEADER
+from netp2p.send_queue import SendQueue, DROP, DISCONNECT
+
+
+class StubMessage:
+    def __init__(self, payload: bytes):
+        self.payload = payload
+
+    def to_frame(self, codec: int = 0, request_id: int = 0, flags: int = 0) -> bytes:
+        return encode_frame(codec, 0, 1, self.payload, request_id, flags)
+
+
+class StubProcessor:
+    def __init__(self):
+        self.processed = []
+
+    def process(self, frame):
+        payload = bytes(frame.payload)
+        self.processed.append(payload)
+        if payload.startswith(b"request"):
+            return StubMessage(b"response to " + payload)
+        return None
+
+
+class StubTransport:
+    def __init__(self):
+        self.aborted = False
+
+    def abort(self):
+        self.aborted = True
+
+
+class StubWriter:
+    """
+    Writer of peer that read only when it's allowed to
+    """
+
+    def __init__(self):
+        self.transport = StubTransport()
+        self.written = []
+        self.can_read = asyncio.Event()
+
+    def writelines(self, frames):
+        self.written.extend(frames)
+
+    async def drain(self):
+        await self.can_read.wait()
+
+
+class FrameDecoderTester(unittest.TestCase):
+    def test_frames_split_at_any_position(self):
+        payloads = [b"first", b"%99 old delimiter %99", b"", b"x" * 5000]
+        data = b"".join(encode_frame(0, i, 10 - i, p) for i, p in enumerate(payloads))
+        for chunk_size in (1, 3, 7, 100, len(data)):
+            decoder = FrameDecoder()
+            frames = []
+            for i in range(0, len(data), chunk_size):
+                decoder.feed(data[i: i + chunk_size])
+                frames.extend((f.typ_id, f.ttl, bytes(f.payload)) for f in decoder)
+            self.assertEqual(frames, [(i, 10 - i, p) for i, p in enumerate(payloads)])
+            self.assertEqual(decoder.pending, 0)
+
+    def test_payload_view_kept_while_feeding(self):
+        decoder = FrameDecoder()
+        next_frame = encode_frame(0, 2, 1, b"next")
+        decoder.feed(encode_frame(0, 1, 1, b"kept") + next_frame[:-2])
+        kept = next(decoder).payload
+        self.assertIsNone(decoder.next_frame())
+        decoder.feed(next_frame[-2:])
+        self.assertEqual(bytes(kept), b"kept")
+        self.assertEqual(bytes(next(decoder).payload), b"next")
+
+    def test_invalid_frames(self):
+        decoder = FrameDecoder(max_frame_size=10)
+        decoder.feed(encode_frame(0, 1, 1, b"y" * 11)[: FRAME_HEADER.size])
+        with self.assertRaises(FrameError):
+            next(decoder)
+        decoder = FrameDecoder()
+        decoder.feed(b"\xff" + encode_frame(0, 1, 1, b"payload")[1:])
+        with self.assertRaises(FrameError):
+            next(decoder)
+
+
+class SendQueueTester(unittest.TestCase):
+    def setUp(self) -> None:
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self) -> None:
+        self.loop.close()
+
+    def test_slow_peer_messages_dropped(self):
+        async def scenario():
+            writer = StubWriter()
+            queue = SendQueue(writer, 0, max_bytes=100, overflow_policy=DROP)
+            task = asyncio.ensure_future(queue.run())
+            self.assertTrue(queue.put(StubMessage(b"x" * 150)))  # bigger than the limit but the queue is empty
+            await asyncio.sleep(0)
+            self.assertEqual((len(queue), queue.pending_bytes), (1, 150 + FRAME_HEADER.size))
+            self.assertFalse(queue.put(StubMessage(b"y")))
+            self.assertEqual((queue.dropped_messages, queue.dropped_bytes), (1, 1 + FRAME_HEADER.size))
+
+            writer.can_read.set()
+            await asyncio.sleep(0)
+            self.assertTrue(queue.put(StubMessage(b"z")))
+            await asyncio.sleep(0)
+            self.assertEqual([bytes(f[FRAME_HEADER.size:]) for f in writer.written], [b"x" * 150, b"z"])
+            self.assertEqual(queue.metrics()["pending_bytes"], 0)
+            self.assertEqual(queue.metrics()["sent_messages"], 2)
+            queue.close()
+            await task
+            self.assertTrue(writer.transport.aborted)
+
+        self.loop.run_until_complete(scenario())
+
+    def test_slow_peer_disconnected(self):
+        async def scenario():
+            writer = StubWriter()
+            queue = SendQueue(writer, 0, max_bytes=100, overflow_policy=DISCONNECT)
+            queue.put(StubMessage(b"x" * 90))
+            self.assertFalse(queue.put(StubMessage(b"x" * 90)))
+            self.assertTrue(queue.closed)
+            self.assertTrue(writer.transport.aborted)
+
+            writer = StubWriter()
+            queue = SendQueue(writer, 0, stall_timeout=0.01)
+            self.assertFalse(queue.stalled(queue.last_progress + 1))
+            queue.put(StubMessage(b"x"))
+            self.assertTrue(queue.stalled(queue.last_progress + 1))
+
+        self.loop.run_until_complete(scenario())
+
+
+class NetworkTester(unittest.TestCase):
+    def setUp(self) -> None:
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self) -> None:
+        self.loop.close()
+
+    async def _wait_for(self, condition, timeout: float = 5):
+        for _ in range(int(timeout / 0.01)):
+            if condition():
+                return
+            await asyncio.sleep(0.01)
+        self.fail("condition was not met")
+
+    def test_request_and_relay(self):
+        async def scenario():
+            server_processor = StubProcessor()
+            server = Server(("127.0.0.1", 0), processor=server_processor)
+            await server.start()
+
+            requester_processor = StubProcessor()
+            requester = Client(server.address, StubMessage(b"request 1"), requester_processor, 0)
+            requester.start()
+            await self._wait_for(lambda: len(requester_processor.processed) == 1)
+            self.assertEqual(requester_processor.processed, [b"response to request 1"])
+
+            session = await requester.connected()  # the connection stay open for more requests
+            requests = [session.request(StubMessage(b"request %d" % i)) for i in range(2, 12)]
+            responses = await asyncio.gather(*requests)
+            self.assertEqual([bytes(f.payload) for f in responses], [b"response to request %d" % i for i in range(2, 12)])
+
+            peers = [StubProcessor() for _ in range(20)]
+            clients = [Client(server.address, StubMessage(b"peer-info"), p, 0) for p in peers]
+            for client in clients:
+                client.start()
+            await self._wait_for(lambda: len(server.sessions) == len(clients) + 1)
+            big_message = b"x" * 1000000
+            server.send([StubMessage(b"new block"), StubMessage(big_message)])
+            await self._wait_for(lambda: all(len(p.processed) == 2 for p in peers))
+            self.assertTrue(all(p.processed == [b"new block", big_message] for p in peers))
+            self.assertEqual(server_processor.processed.count(b"peer-info"), len(clients))
+            await self._wait_for(
+                lambda: all(m["pending_bytes"] == 0 and m["dropped_messages"] == 0 for m in server.metrics().values())
+            )
+
+            for client in clients + [requester]:
+                client.stop()
+            await asyncio.gather(*(client.task for client in clients + [requester]), return_exceptions=True)
+            await server.shutdown()
+
+        self.loop.run_until_complete(scenario())
+
+    def test_invalid_messages_dropped(self):
+        async def scenario():
+            Config.test_net = True
+            server = Server(("127.0.0.1", 0), processor=Processor(Chain(), node=None))
+            await server.start()
+            reader, writer = await asyncio.open_connection(*server.address)
+            session = Session(reader, writer)
+            task = asyncio.ensure_future(session.run())
+
+            session.queue.put_frame(encode_frame(CODEC_JSON, NewTransaction.typ_id, 1, b"not json"))
+            session.queue.put_frame(encode_frame(CODEC_JSON, NewTransaction.typ_id, 1, b'{"msg": {}}'))
+            response = await session.request(BlocksRequest(0, 1))  # the session still serve the peer
+            self.assertEqual(response.typ_id, BlocksResponse.typ_id)
+            server_session = next(iter(server.sessions.values()))
+            self.assertEqual(server_session.invalid_messages, 2)
+
+            for i in range(SESSION_MAX_INVALID_MESSAGES):  # different payloads (duplicates are dropped as seen)
+                session.queue.put_frame(encode_frame(CODEC_JSON, NewTransaction.typ_id, 1, b"not json %d" % i))
+            await asyncio.wait_for(task, 5)  # disconnected by the server
+            await server.shutdown()
+
+        self.loop.run_until_complete(scenario())
+
+
+class TransactionsBatchTester(unittest.TestCase):
+    def setUp(self) -> None:
+        Config.test_net = True
+        self.blockchain = Chain()
+        self.sender = Actor(secret_key="sender_key", blockchain=self.blockchain)
+        self.recipient = Actor(secret_key="recipient_key", blockchain=self.blockchain)
+
+    def test_flush_transactions_batched(self):
+        transactions = [self.sender.create_transaction(self.recipient.address, 1) for _ in range(5)]
+        peer_info = PeerInfo(["127.0.0.1", 1875])
+        messages = [
+            NewTransaction(transactions[0], ttl=5),
+            peer_info,
+            NewTransaction(transactions[1], ttl=5),
+            NewTransactions(transactions[2:4], ttl=5),
+            NewTransaction(transactions[4], ttl=3),
+        ]
+        batched = NewTransactions.batch(messages, max_transactions=3)
+        self.assertEqual([type(m) for m in batched], [NewTransactions, NewTransactions, peer_info.__class__, NewTransaction])
+        self.assertEqual(batched[0].transactions, transactions[:2] + transactions[2:3])
+        self.assertEqual(batched[1].transactions, transactions[3:4])
+        self.assertEqual([m.ttl for m in batched], [5, 5, 10, 3])
+        self.assertIs(batched[3], messages[4])  # single transaction message is relayed as it is
+
+    def test_only_added_transactions_relayed(self):
+        transactions = [self.sender.create_transaction(self.recipient.address, 1) for _ in range(3)]
+        self.blockchain.add_transaction(transactions[0])
+        processor = Processor(self.blockchain, None)
+        processor.process(Frame(0, NewTransactions.typ_id, 5, NewTransactions(transactions).to_bytes()))
+
+        processed = processor.relay_messages
+        decoder = FrameDecoder()
+        decoder.feed(processed[0].to_frame())  # the processed message is encoded again, not the received payload
+        relayed = NewTransactions.from_bytes(next(decoder).payload)
+        self.assertEqual([t.hash for t in relayed.transactions], [t.hash for t in transactions[1:]])
+
+        relay_messages = NewTransactions.batch(processed)
+        self.assertEqual(len(relay_messages), 1)
+        self.assertEqual(relay_messages[0].ttl, 4)
+        self.assertEqual([t.hash for t in relay_messages[0].transactions], [t.hash for t in transactions[1:]])
+        self.assertEqual(len(self.blockchain.mempool), 3)
+
+
+class NodeRelayTester(unittest.TestCase):
+    def _wait_for(self, condition, timeout: float = 5):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("condition was not met")
+            time.sleep(0.001)
+
+    def test_broadcast_sent_without_heartbeat_delay(self):
+        Config.test_net = True
+        blockchain = Chain()
+        sender = Actor(secret_key="sender_key", blockchain=blockchain)
+        node = Node(blockchain, port=0)
+        node.start()
+        self._wait_for(lambda: node.server._server is not None)
+
+        peer = StubProcessor()
+        client = Client(node.server.address, StubMessage(b"peer-info"), peer, 0)
+        node.loop.call_soon_threadsafe(client.start)
+        self._wait_for(lambda: len(node.server.sessions) == 1)
+
+        for counter in range(3):
+            start = time.monotonic()
+            node.broadcast(NewTransaction(sender.create_transaction(sender.address, 1)))
+            self._wait_for(lambda: len(peer.processed) == counter + 1)
+            self.assertLess(time.monotonic() - start, 0.5)
+
+        node.loop.call_soon_threadsafe(client.stop)
+        node.stop()
+        node.join(timeout=5)
+        self.assertFalse(node.is_alive())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import time
+import unittest
+
+from blockchain import Chain, Actor, Config
+from blockchain.exceptions import InvalidSignatureError
+
+
+class NextBlockChooserTester(unittest.TestCase):
+    def setUp(self) -> None:
+        Config.test_net = True
+        Config.test_net_wallet_initial_coins = 100
+        Config.new_block_interval = 1
+
+    def tearDown(self) -> None:
+        Config.new_block_interval = 1
+
+    def _wait_for(self, condition, timeout: float = 5):
+        deadline = time.monotonic() + timeout
+        while not condition():
+            if time.monotonic() > deadline:
+                self.fail("condition was not met")
+            time.sleep(0.01)
+
+    def test_best_block_linked_at_slot_deadline(self):
+        Config.new_block_interval = 0.2
+        blockchain = Chain()
+        chooser = blockchain.next_block_chooser
+        forgers = [Actor(secret_key=f"forger_{i}", blockchain=blockchain) for i in range(3)]
+        blocks = [forger.forge_block() for forger in forgers]
+        best = min(blocks, key=blockchain.block_penalty)
+
+        slots = chooser.slots
+        for block in blocks:
+            blockchain.add_block(block)
+        self._wait_for(lambda: blockchain.height() == 1)
+
+        self.assertEqual(blockchain.blocks[-1].hash, best.hash)
+        self.assertGreater(chooser.slots, slots)
+        metrics = chooser.metrics()
+        self.assertLess(metrics["max_jitter"], 0.1)
+        self.assertGreaterEqual(metrics["last_jitter"], 0)
+        blockchain.close()
+
+    def test_losing_candidates_not_validated(self):
+        Config.new_block_interval = 3600  # the slot doesn't end during the test
+        blockchain = Chain()
+        chooser = blockchain.next_block_chooser
+        forgers = [Actor(secret_key=f"forger_{i}", blockchain=blockchain) for i in range(20)]
+        blocks = sorted((forger.forge_block() for forger in forgers), key=blockchain.block_penalty)
+
+        blockchain.add_block(blocks[0])
+        self._wait_for(lambda: chooser.validated_candidates == 1)
+        for block in reversed(blocks):
+            blockchain.add_block(block)
+        self.assertEqual(chooser.validated_candidates, 1)
+        self.assertEqual(chooser.dropped_candidates, len(blocks) - 1)
+        blockchain.close()
+
+    def test_invalid_best_candidate_skipped(self):
+        Config.new_block_interval = 0.3
+        blockchain = Chain()
+        forgers = sorted(
+            (Actor(secret_key=f"forger_{i}", blockchain=blockchain) for i in range(5)),
+            key=lambda forger: blockchain.block_penalty(forger.forge_block()),
+        )
+        overspend = forgers[0].create_transaction(forgers[1].address, amount=1000)
+        unsigned_block = blockchain.create_unsigned_block(forger=forgers[0].address).replace(transactions=[overspend])
+        overspend_block = unsigned_block.add_signature(forgers[0].wallet.sign(unsigned_block.hash))
+        second_best = forgers[1].forge_block()
+
+        blockchain.add_block(second_best)
+        blockchain.add_block(overspend_block)  # the signatures are valid, the balance is checked in the background
+        self._wait_for(lambda: blockchain.height() == 1)
+        self.assertEqual(blockchain.blocks[-1].hash, second_best.hash)
+        blockchain.close()
+
+    def test_invalid_signature_rejected_before_scan_return(self):
+        Config.new_block_interval = 3600
+        blockchain = Chain()
+        chooser = blockchain.next_block_chooser
+        forgers = [Actor(secret_key=f"forger_{i}", blockchain=blockchain) for i in range(2)]
+        unsigned_block = blockchain.create_unsigned_block(forger=forgers[0].address)
+        bad_signature_block = unsigned_block.add_signature(forgers[1].wallet.sign(unsigned_block.hash))
+
+        with self.assertRaises(InvalidSignatureError):  # raised to the caller, so the block isn't relayed
+            blockchain.add_block(bad_signature_block)
+        self.assertEqual(chooser.validated_candidates, 0)
+        blockchain.close()
+
+    def test_validation_does_not_change_chain_state(self):
+        Config.new_block_interval = 3600
+        blockchain = Chain()
+        sender = Actor(secret_key="sender", blockchain=blockchain)
+        transaction = sender.create_transaction("unknown-recipient", amount=1)
+        unsigned_block = blockchain.create_unsigned_block(forger=sender.address).replace(transactions=[transaction])
+        block = unsigned_block.add_signature(sender.wallet.sign(unsigned_block.hash))
+        wallets = set(blockchain.chain_wallets)
+        version = blockchain.address_index.version
+
+        blockchain.add_block(block)
+        self._wait_for(lambda: blockchain.next_block_chooser.validated_candidates == 1)
+        self.assertEqual(set(blockchain.chain_wallets), wallets)
+        self.assertEqual(blockchain.address_index.version, version)
+        blockchain.close()
+
+    def test_idle_between_slots_and_stop(self):
+        Config.new_block_interval = 0.1
+        blockchain = Chain()
+        chooser = blockchain.next_block_chooser
+        slots = chooser.slots
+        time.sleep(0.55)
+        self.assertIn(chooser.slots - slots, range(4, 7))  # the chooser wake up once a slot
+        self.assertEqual(chooser.missed_slots, 0)
+
+        start = time.monotonic()
+        blockchain.close()
+        chooser.join(timeout=5)
+        self.assertFalse(chooser.is_alive())
+        self.assertLess(time.monotonic() - start, 0.1)  # stop wake the chooser before the deadline
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,87 @@
+import time
+import unittest
+
+from blockchain import Chain, Actor, Config
+from netp2p.frame import Frame
+from netp2p.messages import NewTransaction, BlocksRequest
+from netp2p.processor import Processor
+from netp2p.seen_cache import BloomFilter, SeenCache
+
+
+class SeenCacheTester(unittest.TestCase):
+    def setUp(self) -> None:
+        Config.test_net = True
+        Config.test_net_wallet_initial_coins = 100
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(capacity=1000, false_positive_rate=0.01)
+        keys = [SeenCache.key(1, str(i).encode()) for i in range(2000)]
+        for key in keys[:1000]:
+            bloom.add(key)
+        self.assertTrue(all(key in bloom for key in keys[:1000]))
+        false_positives = sum(key in bloom for key in keys[1000:])
+        self.assertLess(false_positives, 50)
+
+    def test_duplicates_counted(self):
+        cache = SeenCache(max_size=10, ttl=60)
+        self.assertFalse(cache.seen(1, b"block"))
+        self.assertFalse(cache.seen(2, b"block"))  # same payload of other message type
+        self.assertTrue(cache.seen(1, b"block"))
+        self.assertTrue(cache.seen(1, memoryview(b"block")))
+        self.assertEqual((cache.unique, cache.duplicates), (2, 2))
+
+    def test_least_recently_seen_evicted(self):
+        cache = SeenCache(max_size=2, ttl=60)
+        cache.seen(1, b"first")
+        cache.seen(1, b"second")
+        cache.seen(1, b"first")
+        cache.seen(1, b"third")
+        self.assertEqual(len(cache), 2)
+        self.assertTrue(cache.seen(1, b"first"))
+        self.assertFalse(cache.seen(1, b"second"))
+
+    def test_messages_expire(self):
+        cache = SeenCache(max_size=10, ttl=0.05)
+        cache.seen(1, b"tx")
+        time.sleep(0.06)
+        cache.seen(1, b"other")  # rotate the bloom filter generations
+        time.sleep(0.06)
+        self.assertFalse(cache.seen(1, b"tx"))
+        self.assertEqual(len(cache), 1)
+
+    def test_processor_drops_duplicates_before_decoding(self):
+        blockchain = Chain()
+        processor = Processor(blockchain, node=None)
+        sender = Actor(secret_key="sender_key", blockchain=blockchain)
+        recipient = Actor(secret_key="recipient_key", blockchain=blockchain)
+        message = NewTransaction(sender.create_transaction(recipient.address, 10))
+        frame = Frame(0, NewTransaction.typ_id, 5, message.to_bytes())
+
+        processor.process(frame)
+        self.assertEqual(len(blockchain.mempool), 1)
+        self.assertEqual(len(processor.relay_messages), 1)
+        processor.process(frame._replace(ttl=4))  # relayed by other peer
+        self.assertEqual(processor.relay_messages, [])
+        self.assertEqual(processor.seen.duplicates, 1)
+
+        invalid = Frame(0, NewTransaction.typ_id, 5, b"not json")
+        with self.assertRaises(ValueError):
+            processor.process(invalid)
+        self.assertIsNone(processor.process(invalid))  # dropped without decoding
+
+        request = Frame(0, BlocksRequest.typ_id, 1, BlocksRequest(0, 1).to_bytes())
+        self.assertIsNotNone(processor.process(request))
+        self.assertIsNotNone(processor.process(request))  # requests are not gossip
+
+    def test_own_broadcast_is_seen(self):
+        processor = Processor(Chain(), node=None)
+        sender = Actor(secret_key="sender_key", blockchain=processor.chain)
+        message = NewTransaction(sender.create_transaction(sender.address, 1))
+        processor.mark_seen(message)
+        frame = Frame(0, NewTransaction.typ_id, 9, message.to_bytes())
+        self.assertIsNone(processor.process(frame))
+        self.assertEqual(processor.seen.duplicates, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
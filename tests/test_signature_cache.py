@@ -0,0 +1,43 @@
+import unittest
+
+from blockchain import Chain, Actor, Config
+from blockchain.signature_cache import SignatureCache, signature_cache
+
+
+class SignatureCacheTester(unittest.TestCase):
+    def setUp(self) -> None:
+        Config.test_net = True
+        Config.test_net_wallet_initial_coins = 100
+
+    def test_transaction_verified_once(self):
+        blockchain = Chain()
+        sender = Actor(secret_key="sender_key", blockchain=blockchain)
+        recipient = Actor(secret_key="recipient_key", blockchain=blockchain)
+        tx = sender.create_transaction(recipient.address, 10)
+
+        self.assertTrue(tx.signature_verified())
+        hits = signature_cache.hits
+        self.assertTrue(tx.signature_verified())
+        self.assertEqual(signature_cache.hits, hits + 1)
+
+    def test_invalid_signature_not_cached(self):
+        blockchain = Chain()
+        sender = Actor(secret_key="sender_key", blockchain=blockchain)
+        recipient = Actor(secret_key="recipient_key", blockchain=blockchain)
+        tx = sender.create_transaction(recipient.address, 10)
+        tx = tx.add_signature(recipient.wallet.sign(tx.hash))
+
+        self.assertFalse(tx.signature_verified())
+        self.assertFalse(tx.signature_verified())
+
+    def test_least_recently_used_evicted(self):
+        cache = SignatureCache(max_size=2)
+        cache.add("key", "sig1", "hash1")
+        cache.add("key", "sig2", "hash2")
+        self.assertTrue(cache.lookup("key", "sig1", "hash1"))
+        cache.add("key", "sig3", "hash3")
+
+        self.assertEqual(len(cache), 2)
+        self.assertFalse(cache.lookup("key", "sig2", "hash2"))
+        self.assertTrue(cache.lookup("key", "sig1", "hash1"))
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
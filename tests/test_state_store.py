@@ -0,0 +1,103 @@
+import tempfile
+import unittest
+from unittest import mock
+
+from blockchain import Chain, Actor, Config
+
+
+class StateStoreTester(unittest.TestCase):
+    def setUp(self) -> None:
+        Config.test_net = True
+        Config.test_net_wallet_initial_coins = 100
+        Config.max_transactions_per_block = 100
+        self._epoch_size = Config.epoch_size
+        self._batch_size = Config.block_store_batch_size
+        Config.epoch_size = 2
+        self._directory = tempfile.TemporaryDirectory()
+        self.directory = self._directory.name
+
+    def tearDown(self) -> None:
+        Config.epoch_size = self._epoch_size
+        Config.block_store_batch_size = self._batch_size
+        self._directory.cleanup()
+
+    @staticmethod
+    def _link_blocks(blockchain, count: int):
+        forger = Actor(secret_key="forger_key", blockchain=blockchain)
+        sender = Actor(secret_key="sender_key", blockchain=blockchain)
+        for _ in range(count):
+            tx = sender.create_transaction(forger.address, 10)
+            blockchain.add_transaction(tx.to_dict())
+            blockchain.link_new_block(forger.forge_block(), _i_know_what_i_doing=True)
+        return forger, sender
+
+    @staticmethod
+    def _state(blockchain):
+        return (
+            blockchain.height(),
+            blockchain.blocks[-1].hash,
+            blockchain.epoch_random,
+            blockchain.penalty,
+            blockchain.sum_tree.sum,
+            [(w.address, w.balance, w.tx_counter) for w in blockchain.chain_wallets.values()],
+            list(blockchain.address_index),
+        )
+
+    def test_restart_without_replay(self):
+        blockchain = Chain(data_dir=self.directory)
+        self._link_blocks(blockchain, 3)
+        state = self._state(blockchain)
+        blockchain.close()
+
+        with mock.patch.object(Chain, "_apply_block") as apply_block:
+            restored = Chain(data_dir=self.directory)
+        apply_block.assert_not_called()
+        self.assertEqual(self._state(restored), state)
+        restored.close()
+
+    def test_restart_pruned_chain(self):
+        blockchain = Chain(save_all_blocks=False, data_dir=self.directory)
+        forger, sender = self._link_blocks(blockchain, 3)
+        state = self._state(blockchain)
+        blockchain.close()
+
+        restored = Chain(save_all_blocks=False, data_dir=self.directory)
+        self.assertEqual(self._state(restored), state)
+        self.assertEqual(len(restored.blocks), 1)
+        self.assertEqual(restored.get_chain_wallet(sender.address).tx_counter, 3)
+        restored.close()
+
+    def test_committed_branch_is_saved(self):
+        blockchain = Chain(data_dir=self.directory)
+        branch = blockchain.branch()
+        self._link_blocks(branch, 3)
+        branch.commit()
+        state = self._state(blockchain)
+        blockchain.close()
+
+        restored = Chain(data_dir=self.directory)
+        self.assertEqual(self._state(restored), state)
+        restored.close()
+
+    def test_restart_from_snapshot_when_blocks_were_not_written(self):
+        Config.block_store_batch_size = 2
+        blockchain = Chain(data_dir=self.directory)
+        self._link_blocks(blockchain, 2)
+        penalty = blockchain.block_tree.get(blockchain.blocks[1].hash).cumulative_penalty
+        blockchain.next_block_chooser.stop()
+        # crash: the state of block 2 was saved but the block store wrote only blocks 0-1
+        self.assertEqual(blockchain.height(), 2)
+        self.assertEqual(blockchain.blocks._flushed_count, 2)
+
+        restored = Chain(data_dir=self.directory)
+        self.assertEqual(restored.height(), 1)
+        self.assertEqual(restored.penalty, penalty)  # the blocks after the snapshot are replayed with their penalty
+        forger = Actor(secret_key="forger_key", blockchain=restored)
+        sender = Actor(secret_key="sender_key", blockchain=restored)
+        self.assertEqual(sender.balance, 89)
+        self.assertEqual(forger.balance, 111)
+        restored.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
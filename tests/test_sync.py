@@ -0,0 +1,334 @@
+import asyncio
+import json
+import socket
+import unittest
+from hashlib import sha256
+from unittest import mock
+
+from blockchain import Chain, Actor, Config
+from blockchain.codec import CODEC_JSON
+from netp2p.frame import Frame
+from netp2p.messages import BlocksRequest, BlocksResponse, HeadersRequest, HeadersResponse
+from netp2p.processor import Processor
+from netp2p.server import Server
+from netp2p.session import Session
+from netp2p.sync import BlockDownloader, HeadersFirstDownloader
+
+BLOCKS = 30
+
+
+class CountingProcessor(Processor):
+    def __init__(self, blockchain):
+        super().__init__(blockchain, node=None)
+        self.requests = 0
+
+    def process(self, frame):
+        self.requests += 1
+        return super().process(frame)
+
+
+class TamperingProcessor(CountingProcessor):
+    """
+    Serve the source headers with the blocks bodies of another chain
+    """
+
+    def __init__(self, blockchain, bodies_chain):
+        super().__init__(blockchain)
+        self.bodies_processor = Processor(bodies_chain, node=None)
+
+    def process(self, frame):
+        if frame.typ_id == BlocksRequest.typ_id:
+            self.requests += 1
+            return self.bodies_processor.process(frame)
+        return super().process(frame)
+
+
+class LyingHeadersProcessor(CountingProcessor):
+    """
+    Serve headers chain with false blocks hashes from the lie index (the blocks bodies are the real blocks)
+    """
+
+    def __init__(self, blockchain, lie_from: int):
+        super().__init__(blockchain)
+        self.lie_from = lie_from
+        self.headers_served = False
+
+    def process(self, frame):
+        reply = super().process(frame)
+        if frame.typ_id != HeadersRequest.typ_id:
+            return reply
+        headers, false_hash = [], None
+        for header, block_hash in reply.headers:
+            if header.index >= self.lie_from:
+                if false_hash is not None:
+                    header = header.replace(previous_hash=false_hash)
+                block_hash = false_hash = sha256(block_hash.encode()).hexdigest()
+            headers.append((header, block_hash))
+        self.headers_served = True
+        return HeadersResponse(headers)
+
+
+class LaggingHeadersProcessor(CountingProcessor):
+    """
+    Reply with unexpected message to headers requests until the liar served headers
+    """
+
+    def __init__(self, blockchain, liar: LyingHeadersProcessor):
+        super().__init__(blockchain)
+        self.liar = liar
+
+    def process(self, frame):
+        if frame.typ_id == HeadersRequest.typ_id and not self.liar.headers_served:
+            return BlocksResponse(blocks=[])
+        return super().process(frame)
+
+
+def closed_port_address():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()
+
+
+class BlockDownloaderTester(unittest.TestCase):
+    def setUp(self) -> None:
+        Config.test_net = True
+        Config.test_net_wallet_initial_coins = 100
+        self.source = Chain()
+        forger = Actor(secret_key="forger_key", blockchain=self.source)
+        for _ in range(BLOCKS):
+            self.source.link_new_block(forger.forge_block(), _i_know_what_i_doing=True)
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self) -> None:
+        self.loop.close()
+
+    def _run_with_peers(self, downloader_class, blockchain, peers, **kwargs):
+        """
+        Run download from fake peers without connections
+        :param peers: {peer address: function from request message to response frame (raise to fail)}
+        """
+
+        async def fake_request(addr, message):
+            return peers[addr](message)
+
+        async def scenario():
+            downloader = downloader_class(blockchain, list(peers), blockchain.height() + 1, request=fake_request, **kwargs)
+            return downloader, await asyncio.wait_for(downloader.run(), 10)
+
+        return self.loop.run_until_complete(scenario())
+
+    def _serve(self, message):
+        reply = Processor(self.source, node=None).process(Frame(CODEC_JSON, message.typ_id, 1, message.to_bytes()))
+        return Frame(CODEC_JSON, reply.typ_id, 1, reply.to_bytes())
+
+    def _download(self, blockchain, peers_count, dead_peers, downloader_class=BlockDownloader, processors=(), **kwargs):
+        async def scenario():
+            processors_ = [*processors, *(CountingProcessor(self.source) for _ in range(peers_count))]
+            servers = [Server(("127.0.0.1", 0), processor=p) for p in processors_]
+            for server in servers:
+                await server.start()
+            peers = [server.address for server in servers] + [closed_port_address() for _ in range(dead_peers)]
+            downloader = downloader_class(blockchain, peers, blockchain.height() + 1, **kwargs)
+            next_index = await downloader.run()
+            for server in servers:
+                await server.shutdown()
+            return downloader, next_index, processors_
+
+        return self.loop.run_until_complete(scenario())
+
+    def test_download_from_many_peers(self):
+        blockchain = Chain()
+        downloader, next_index, processors = self._download(
+            blockchain, peers_count=3, dead_peers=1, chunk_size=4, window=4, requests_per_peer=1, retries=2
+        )
+        self.assertFalse(downloader.failed)
+        self.assertEqual(next_index, BLOCKS + 1)
+        self.assertEqual(blockchain.height(), BLOCKS)
+        self.assertEqual(blockchain.blocks[-1].hash, self.source.blocks[-1].hash)
+        self.assertTrue(all(p.requests > 0 for p in processors))  # the first window is requested from all the peers
+
+    def test_download_on_persistent_sessions(self):
+        async def scenario():
+            servers = [Server(("127.0.0.1", 0), processor=CountingProcessor(self.source)) for _ in range(2)]
+            for server in servers:
+                await server.start()
+            sessions = {}
+
+            async def connect(addr):
+                reader, writer = await asyncio.open_connection(*addr)
+                session = Session(reader, writer)
+                asyncio.ensure_future(session.run())
+                return session
+
+            async def session_request(addr, message):
+                if addr not in sessions:
+                    sessions[addr] = asyncio.ensure_future(connect(addr))
+                session = await sessions[addr]
+                return await session.request(message)
+
+            blockchain = Chain()
+            downloader = BlockDownloader(
+                blockchain, [s.address for s in servers], 1, chunk_size=3, requests_per_peer=3, request=session_request
+            )
+            self.assertEqual(await downloader.run(), BLOCKS + 1)
+            self.assertEqual(blockchain.blocks[-1].hash, self.source.blocks[-1].hash)
+            self.assertTrue(all(len(server.sessions) == 1 for server in servers))  # one connection per peer
+            for session in sessions.values():
+                session.result().close()
+            for server in servers:
+                await server.shutdown()
+
+        self.loop.run_until_complete(scenario())
+
+    def test_resume_from_chain_tip(self):
+        blockchain = Chain()
+        for block in self.source.blocks[1:11]:
+            blockchain.link_new_block(block, _i_know_what_i_doing=True)
+        downloader, next_index, _ = self._download(blockchain, peers_count=1, dead_peers=0, chunk_size=BLOCKS)
+        self.assertEqual(next_index, BLOCKS + 1)
+        self.assertEqual(blockchain.blocks[-1].hash, self.source.blocks[-1].hash)
+
+    def test_headers_first_download(self):
+        blockchain = Chain()
+        for block in self.source.blocks[1:6]:
+            blockchain.link_new_block(block, _i_know_what_i_doing=True)
+        downloader, next_index, processors = self._download(
+            blockchain,
+            peers_count=3,
+            dead_peers=1,
+            downloader_class=HeadersFirstDownloader,
+            headers_chunk_size=8,
+            chunk_size=4,
+            requests_per_peer=1,
+            retries=2,
+        )
+        self.assertFalse(downloader.failed)
+        self.assertEqual(next_index, BLOCKS + 1)
+        self.assertEqual(len(downloader.header_downloader.headers), BLOCKS - 5)
+        self.assertEqual(blockchain.blocks[-1].hash, self.source.blocks[-1].hash)
+        self.assertEqual(len(downloader.peers), 3)  # the dead peer was dropped while downloading the headers
+
+    def test_headers_first_bad_bodies_peer_dropped(self):
+        other = Chain()
+        forger = Actor(secret_key="other_forger_key", blockchain=other)
+        for _ in range(BLOCKS):
+            other.link_new_block(forger.forge_block(), _i_know_what_i_doing=True)
+        tampering = TamperingProcessor(self.source, other)
+        blockchain = Chain()
+        downloader, next_index, _ = self._download(
+            blockchain,
+            peers_count=2,
+            dead_peers=0,
+            downloader_class=HeadersFirstDownloader,
+            processors=[tampering],
+            chunk_size=3,
+            requests_per_peer=1,
+            retries=2,
+        )
+        self.assertFalse(downloader.failed)
+        self.assertEqual(next_index, BLOCKS + 1)
+        self.assertEqual(blockchain.blocks[-1].hash, self.source.blocks[-1].hash)
+        self.assertEqual(len(downloader.peers), 2)  # the peer that sent blocks not matching the headers was dropped
+
+    def test_headers_first_false_headers_peer_dropped(self):
+        liar = LyingHeadersProcessor(self.source, lie_from=12)
+        lagging = LaggingHeadersProcessor(self.source, liar)
+        blockchain = Chain()
+        downloader, next_index, processors = self._download(
+            blockchain,
+            peers_count=0,
+            dead_peers=0,
+            downloader_class=HeadersFirstDownloader,
+            processors=[liar, lagging],
+            headers_chunk_size=BLOCKS,
+            chunk_size=4,
+            requests_per_peer=1,
+            retries=3,
+        )
+        self.assertFalse(downloader.failed)
+        self.assertEqual(next_index, BLOCKS + 1)
+        self.assertEqual(blockchain.blocks[-1].hash, self.source.blocks[-1].hash)
+        self.assertEqual(len(downloader.peers), 1)  # the headers peer was dropped, the bodies peer was kept
+        self.assertEqual(downloader.header_downloader.headers[0][0].index, 12)  # the headers were downloaded again
+
+    def test_malformed_headers_response(self):
+        def malformed_headers(message):
+            if not isinstance(message, HeadersRequest):
+                return self._serve(message)
+            response = HeadersResponse.from_blocks(self.source.blocks[1:3]).to_dict()
+            for header in response["headers"]:
+                del header["header"]["forger"]
+            return Frame(CODEC_JSON, HeadersResponse.typ_id, 1, json.dumps(response).encode())
+
+        blockchain = Chain()
+        bad_peer, good_peer = ("127.0.0.1", 1), ("127.0.0.1", 2)
+        downloader, next_index = self._run_with_peers(
+            HeadersFirstDownloader,
+            blockchain,
+            {bad_peer: malformed_headers, good_peer: self._serve},
+            headers_chunk_size=8,
+            chunk_size=4,
+            requests_per_peer=1,
+            retries=2,
+        )
+        self.assertFalse(downloader.failed)
+        self.assertEqual(next_index, BLOCKS + 1)
+        self.assertEqual(blockchain.blocks[-1].hash, self.source.blocks[-1].hash)
+        self.assertEqual(downloader.peers, {good_peer})
+
+    def test_unexpected_request_error_chunk_retried(self):
+        def broken(message):
+            raise RuntimeError("broken peer")
+
+        blockchain = Chain()
+        bad_peer, good_peer = ("127.0.0.1", 1), ("127.0.0.1", 2)
+        downloader, next_index = self._run_with_peers(
+            BlockDownloader, blockchain, {bad_peer: broken, good_peer: self._serve}, chunk_size=4, retries=2
+        )
+        self.assertFalse(downloader.failed)
+        self.assertEqual(next_index, BLOCKS + 1)
+        self.assertEqual(downloader.peers, {good_peer})
+
+    def test_malformed_blocks_response(self):
+        def malformed_blocks(message):
+            return Frame(CODEC_JSON, BlocksResponse.typ_id, 1, BlocksResponse([{"index": 1}]).to_bytes())
+
+        blockchain = Chain()
+        bad_peer, good_peer = ("127.0.0.1", 1), ("127.0.0.1", 2)
+        downloader, next_index = self._run_with_peers(
+            BlockDownloader, blockchain, {bad_peer: malformed_blocks, good_peer: self._serve}, chunk_size=4, retries=2
+        )
+        self.assertFalse(downloader.failed)
+        self.assertEqual(next_index, BLOCKS + 1)
+        self.assertEqual(downloader.peers, {good_peer})
+
+    def test_apply_error_chunk_requested_again(self):
+        apply = BlockDownloader._apply
+        calls = []
+
+        def apply_fail_once(downloader, response):
+            calls.append(response)
+            if len(calls) == 1:
+                raise RuntimeError("apply failed")
+            return apply(downloader, response)
+
+        blockchain = Chain()
+        with mock.patch.object(BlockDownloader, "_apply", apply_fail_once):
+            downloader, next_index = self._run_with_peers(
+                BlockDownloader, blockchain, {("127.0.0.1", 1): self._serve, ("127.0.0.1", 2): self._serve}, chunk_size=4
+            )
+        self.assertFalse(downloader.failed)
+        self.assertEqual(next_index, BLOCKS + 1)
+        self.assertEqual(blockchain.blocks[-1].hash, self.source.blocks[-1].hash)
+
+    def test_no_live_peers(self):
+        blockchain = Chain()
+        downloader, next_index, _ = self._download(blockchain, peers_count=0, dead_peers=2, retries=1)
+        self.assertTrue(downloader.failed)
+        self.assertEqual(downloader.peers, set())
+        self.assertEqual(next_index, 1)
+        self.assertEqual(blockchain.height(), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()